@@ -1,26 +1,86 @@
+import logging
 from flask import Flask
 from config import Config
 from services.data_service import DataService
+from services.metrics import LOG_MESSAGES
+from services.write_coordinator import DURABILITIES, flush_on_exit
 
 # Importer les blueprints
 from routes.pages import pages_bp
 from routes.cavaliers import cavaliers_bp
 from routes.assignments import assignments_bp
 from routes.stats import stats_bp
+from routes.system import system_bp
+from routes.changes import changes_bp
+from routes.calendar import calendar_bp
+from routes.export import export_bp
+from routes.imports import import_bp
+from routes.recurrences import recurrences_bp
+from routes.history import history_bp
+from routes.horses import horses_bp, register_horse_routes
+from routes.metrics import register_metrics
+from routes.compression import register_compression
+from routes.assets import register_assets
+
+LOG_FORMAT = '%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s'
+
+
+class _CountingHandler(logging.Handler):
+    """Compter avertissements et erreurs pour /metrics, même journalisation coupée"""
+
+    def emit(self, record):
+        LOG_MESSAGES.inc(level=record.levelname.lower())
+
+
+_output_handler = logging.StreamHandler()
+_output_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+_counting_handler = _CountingHandler(logging.WARNING)
+
+
+def configure_logging(level):
+    """Journaliser sur la sortie d'erreur à partir de `level` (OFF : rien)"""
+    _output_handler.setLevel(logging.CRITICAL + 1 if level == 'OFF' else level)
+    root = logging.getLogger()
+    # create_app() peut être appelé plusieurs fois : handlers ajoutés une fois
+    for handler in (_output_handler, _counting_handler):
+        if handler not in root.handlers:
+            root.addHandler(handler)
+    root.setLevel(min(_output_handler.level, logging.WARNING))
+
 
 def create_app():
     """Créer et configurer l'application Flask"""
+    configure_logging(Config.LOG_LEVEL)
     app = Flask(__name__)
 
     # Initialiser les dossiers et fichiers
     Config.init_directories()
     DataService.init_files()
 
+    # Écritures différées (Config.DURABILITY) enregistrées à l'arrêt
+    if Config.DURABILITY not in DURABILITIES:
+        raise ValueError(f"DURABILITY inconnu : {Config.DURABILITY} ({', '.join(DURABILITIES)})")
+    if Config.DURABILITY != 'sync':
+        flush_on_exit(DataService.flush)
+
     # Enregistrer les blueprints
     app.register_blueprint(pages_bp)
     app.register_blueprint(cavaliers_bp)
-    app.register_blueprint(assignments_bp)
-    app.register_blueprint(stats_bp)
+    app.register_blueprint(system_bp)
+    app.register_blueprint(horses_bp)
+
+    # Données d'un cheval : /api/... (cheval par défaut) et /api/<cheval>/...
+    register_horse_routes(app, [
+        assignments_bp, stats_bp, changes_bp, calendar_bp,
+        export_bp, import_bp, recurrences_bp, history_bp,
+    ])
+
+    # Durée des requêtes et /metrics
+    register_metrics(app)
+
+    # Réponses compressées, fichiers statiques empreintés (si build)
+    register_compression(app)
+    register_assets(app)
 
     return app
 
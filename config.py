@@ -1,13 +1,96 @@
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 class Config:
     # Chemins absolus pour PythonAnywhere
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     DATA_DIR = os.path.join(BASE_DIR, 'data')
 
-    ASSIGNMENTS_FILE = os.path.join(DATA_DIR, 'assignments.json')
+    # Cavaliers, partagés par tous les chevaux de l'écurie
     CAVALIERS_FILE = os.path.join(DATA_DIR, 'cavaliers.json')
 
+    # Un dossier par cheval : journées découpées par année, règles de
+    # récurrence. Les routes /api/... servent DEFAULT_HORSE, /api/<cheval>/...
+    # les autres chevaux (créés par POST /api/horses)
+    HORSES_DIR = os.path.join(DATA_DIR, 'horses')
+    DEFAULT_HORSE = os.environ.get('DEFAULT_HORSE', 'cheval')
+    DEFAULT_HORSE_NAME = os.environ.get('DEFAULT_HORSE_NAME', 'Mon cheval')
+
+    # Fichiers d'avant les chevaux (un seul cheval), repris par DEFAULT_HORSE
+    # au premier démarrage puis laissés tels quels
+    ASSIGNMENTS_FILE = os.path.join(DATA_DIR, 'assignments.json')
+    ASSIGNMENTS_JOURNAL_FILE = os.path.join(DATA_DIR, 'assignments.journal.jsonl')
+    RECURRENCES_FILE = os.path.join(DATA_DIR, 'recurrences.json')
+
+    # Moteur de stockage : 'json' (fichiers ci-dessus) ou 'sqlite'
+    # Migration des fichiers JSON : python -m services.migration
+    # (SQLITE_FILE pour DEFAULT_HORSE, HORSES_DIR/<cheval>/planning.sqlite3 sinon)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+    SQLITE_FILE = os.environ.get('SQLITE_FILE', os.path.join(DATA_DIR, 'planning.sqlite3'))
+
+    # Moteur json : journal des modifications de chaque année, replié dans
+    # l'instantané de l'année au démarrage et dès qu'il dépasse cette taille (octets)
+    JOURNAL_COMPACT_BYTES = int(os.environ.get('JOURNAL_COMPACT_BYTES', 256 * 1024))
+
+    # Moteur json : à chaque compactage, instantané binaire de l'année
+    # projeté en mémoire (mmap) par les workers au lieu de parser le JSON.
+    # Avec gunicorn --preload, le maître le projette une fois pour tous.
+    SHARED_SNAPSHOT = os.environ.get('SHARED_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+
+    # Enregistrement des journées modifiées : 'sync' (la requête attend
+    # l'écriture sur disque), 'batched' (écritures regroupées par un thread
+    # du worker toutes les FLUSH_INTERVAL secondes, la requête attend le
+    # groupe) ou 'async' (la requête n'attend pas ; écritures en attente
+    # enregistrées à l'arrêt, perdues si le processus est tué)
+    DURABILITY = os.environ.get('DURABILITY', 'sync').lower()
+    FLUSH_INTERVAL = float(os.environ.get('FLUSH_INTERVAL', 0.05))
+
+    # Historique des modifications des assignments (HORSES_DIR/<cheval>/history,
+    # ?as_of= et /api/history) : point de reprise de l'année dès que les
+    # modifications ajoutées depuis le précédent dépassent cette taille (octets)
+    HISTORY_CHECKPOINT_BYTES = int(os.environ.get('HISTORY_CHECKPOINT_BYTES', 64 * 1024))
+
+    # Flux des modifications (/api/changes) : fichier partagé par les workers
+    # et nombre de modifications récentes gardées en mémoire par chacun
+    CHANGES_LOG_FILE = os.path.join(DATA_DIR, 'changes.jsonl')
+    CHANGES_BUFFER_SIZE = int(os.environ.get('CHANGES_BUFFER_SIZE', 1000))
+
+    # Flux SSE (/api/changes/stream) : chacun occupe un thread du worker
+    # (gunicorn gthread : --threads par worker). Un flux est fermé au bout de
+    # CHANGES_STREAM_SECONDS (le navigateur se reconnecte) ; au-delà de
+    # CHANGES_STREAM_MAX flux ouverts dans un worker, les suivants ne
+    # transmettent que les modifications en attente et se ferment aussitôt
+    # (le navigateur revient plus tard). Garder CHANGES_STREAM_MAX nettement
+    # sous --threads pour laisser des threads aux autres requêtes.
+    CHANGES_STREAM_SECONDS = float(os.environ.get('CHANGES_STREAM_SECONDS', 25))
+    CHANGES_STREAM_MAX = int(os.environ.get('CHANGES_STREAM_MAX', 4))
+
+    # Vue mensuelle (/api/calendar) : nombre de mois gardés en cache par worker
+    CALENDAR_CACHE_MONTHS = int(os.environ.get('CALENDAR_CACHE_MONTHS', 24))
+
+    # Import (/api/import) : lignes validées puis enregistrées par lot (une
+    # écriture par lot), et nombre d'erreurs détaillées dans le rapport
+    IMPORT_BATCH_ROWS = int(os.environ.get('IMPORT_BATCH_ROWS', 1000))
+    IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 100))
+
+    # Réponses compressées (gzip, ou brotli si le module est installé) à
+    # partir de cette taille en octets ; -1 : jamais
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+    # Fichiers statiques empreintés et précompressés par python -m tools.build_static
+    # (servis en cache « immutable » ; sans build, static/ est servi tel quel)
+    STATIC_BUILD_DIR = os.path.join(BASE_DIR, 'static', 'dist')
+
+    # Journalisation : DEBUG, INFO, WARNING, ERROR ou OFF
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+    # Métriques (/metrics) : valeurs de chaque worker écrites dans ce dossier
+    # toutes les METRICS_FLUSH_SECONDS secondes, puis additionnées
+    METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(DATA_DIR, 'metrics'))
+    METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 1))
+
     # Configuration serveur
     DEBUG = False  # ⚠️ Mettre False en production sur PythonAnywhere
     HOST = '0.0.0.0'
@@ -17,4 +100,4 @@ class Config:
     def init_directories():
         """Créer les dossiers nécessaires s'ils n'existent pas"""
         os.makedirs(Config.DATA_DIR, exist_ok=True)
-        print(f"✅ Dossier data créé/vérifié : {Config.DATA_DIR}")
+        logger.info("✅ Dossier data créé/vérifié : %s", Config.DATA_DIR)
@@ -0,0 +1,73 @@
+import json
+import logging
+import mimetypes
+import os
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+from config import Config
+from services.compression import SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+# Le nom d'un fichier empreinté change avec son contenu : cache d'un an, sans revalidation
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Précompressions cherchées à côté du fichier, par ordre de préférence
+PRECOMPRESSED = ('br', 'gzip')
+
+
+def load_manifest(build_dir):
+    """{fichier de static/: chemin empreinté} écrit par tools.build_static, {} sans build"""
+    path = os.path.join(build_dir, 'manifest.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ Manifeste des fichiers statiques ignoré (%s): %s", path, e)
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _send_built(build_dir, filename):
+    path = safe_join(build_dir, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    # Version précompressée au build, si le client l'accepte
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding in PRECOMPRESSED:
+        if request.accept_encodings[encoding] > 0 and os.path.isfile(path + SUFFIXES[encoding]):
+            response = send_file(path + SUFFIXES[encoding], mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True)
+
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def register_assets(app):
+    """Servir les fichiers statiques du build (python -m tools.build_static).
+
+    url_for('static', filename=...) des templates pointe vers le nom empreinté
+    du manifeste : les références sont réécrites au rendu, les templates
+    sources restent inchangés. Sans build, rien ne change.
+    """
+    build_dir = Config.STATIC_BUILD_DIR
+    manifest = load_manifest(build_dir)
+    if not manifest:
+        return
+
+    def fingerprint(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    app.url_defaults(fingerprint)
+    app.add_url_rule(
+        f"{app.static_url_path}/{os.path.basename(build_dir)}/<path:filename>", 'static_build',
+        lambda filename: _send_built(build_dir, filename)
+    )
+    logger.info("✅ Fichiers statiques empreintés : %d (%s)", len(manifest), build_dir)
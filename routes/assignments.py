@@ -1,53 +1,178 @@
+import logging
 from flask import Blueprint, jsonify, request
+from routes.http_cache import conditional_json, make_etag
 from services.data_service import DataService
+from services.history import parse_timestamp
+from services.indexes import content_digest
+from services.validation import ValidationService
+
+logger = logging.getLogger(__name__)
 
 assignments_bp = Blueprint('assignments', __name__, url_prefix='/api/assignments')
 
+
+def months_between(start, end):
+    """Mois YYYY-MM de la date `start` à la date `end` incluses"""
+    year, month = int(start[:4]), int(start[5:7])
+    while f"{year:04d}-{month:02d}" <= end[:7]:
+        yield f"{year:04d}-{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
 @assignments_bp.route('', methods=['GET'])
 def get_assignments():
-    """Récupérer tous les assignments"""
+    """Récupérer les assignments (tous, ou filtrés par ?from=&to= / ?month=YYYY-MM),
+    ou tels qu'ils étaient à l'instant ?as_of= (secondes depuis l'epoch ou
+    date/heure ISO 8601), reconstruits depuis l'historique"""
     try:
-        assignments = DataService.read_assignments()
-        return jsonify(assignments)
+        start = request.args.get('from', '')
+        end = request.args.get('to', '')
+        month = request.args.get('month', '')
+
+        if month:
+            valid, error = ValidationService.validate_month(month)
+            if not valid:
+                return jsonify({'error': error}), 400
+            start, end = month + '-01', month + '-31'
+        else:
+            # Bornes découpées par position (mois) : format exact exigé
+            for date_str in (start, end):
+                valid, error = ValidationService.validate_iso_date(date_str)
+                if not valid:
+                    return jsonify({'error': error}), 400
+
+        as_of = request.args.get('as_of')
+        if as_of:
+            try:
+                instant = parse_timestamp(as_of)
+            except (ValueError, OverflowError, OSError):
+                return jsonify({'error': f'Instant invalide : {as_of}'}), 400
+            assignments = DataService.assignments_as_of(instant, start or None, end or None)
+            return conditional_json(f"{content_digest(assignments):032x}", lambda: assignments)
+
+        if not start and not end:
+            return conditional_json(DataService.data_version('assignments'), DataService.read_assignments)
+        if start and end:
+            # Empreintes des seuls mois demandés : les autres années ne sont pas lues
+            table = DataService.assignments_table()
+            etag = make_etag(*(table.month_digest(m) for m in months_between(start, end)))
+        else:
+            etag = DataService.data_version('assignments')
+        return conditional_json(etag, lambda: DataService.read_assignments_range(start, end))
     except Exception as e:
-        print(f"Erreur get_assignments: {e}")
+        logger.exception("Erreur get_assignments: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def parse_assignment_change(data, cavaliers_table):
+    """Lire une modification {date, cavaliers, comment, work_type}.
+
+    Les cavaliers sont désignés par leur identifiant (ou, pour les anciens
+    clients, par leur nom) et enregistrés par identifiant.
+    Retourne (date, entrée ou None pour supprimer, erreur).
+    """
+    if not isinstance(data, dict):
+        return None, None, 'Modification invalide'
+
+    date = data.get('date')
+    cavaliers = data.get('cavaliers', [])
+    comment = data.get('comment', '') or ''
+    work_type = data.get('work_type', '')
+
+    if not date:
+        return None, None, 'La date est requise'
+
+    if not isinstance(comment, str):
+        return None, None, 'comment doit être une chaîne'
+
+    # Date exacte : elle devient une clé triée et découpée par année
+    valid, error = ValidationService.validate_iso_date(date)
+    if not valid:
+        return None, None, error
+
+    valid, error = ValidationService.validate_work_type(work_type)
+    if not valid:
+        return None, None, error
+
+    if not isinstance(cavaliers, list):
+        return None, None, 'cavaliers doit être une liste'
+
+    ids = []
+    for cavalier in cavaliers:
+        cavalier_id = cavaliers_table.resolve(cavalier)
+        if cavalier_id is None:
+            return None, None, f'Cavalier inconnu : {cavalier}'
+        ids.append(cavalier_id)
+
+    # Si aucun cavalier et pas de commentaire/type, supprimer l'entrée
+    if (not cavaliers or len(cavaliers) == 0) and not comment and not work_type:
+        return date, None, None
+
+    return date, {
+        'cavaliers': ids,
+        'comment': comment,
+        'work_type': work_type
+    }, None
+
 @assignments_bp.route('', methods=['POST'])
 def save_assignment():
-    """Sauvegarder un assignment"""
+    """Sauvegarder un assignment (?return=entry : ne renvoyer que la journée modifiée)"""
     try:
-        data = request.get_json()
-        date = data.get('date')
-        cavaliers = data.get('cavaliers', [])
-        comment = data.get('comment', '')
-        work_type = data.get('work_type', '')
+        date, entry, error = parse_assignment_change(request.get_json(), DataService.cavaliers_table())
+        if error:
+            return jsonify({'error': error}), 400
 
-        if not date:
-            return jsonify({'error': 'La date est requise'}), 400
+        if entry is None:
+            logger.debug("Suppression de l'entrée pour %s", date)
+        else:
+            logger.debug("Sauvegarde pour %s: %s", date, entry)
 
-        if not isinstance(cavaliers, list):
-            return jsonify({'error': 'cavaliers doit être une liste'}), 400
+        # Seule la journée modifiée est écrite
+        if not DataService.save_assignment(date, entry):
+            return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
+
+        if request.args.get('return') == 'entry':
+            return jsonify({'success': True, 'date': date, 'entry': entry})
 
         assignments = DataService.read_assignments()
+        return jsonify({'success': True, 'assignments': assignments})
+    except Exception as e:
+        logger.exception("Erreur save_assignment: %s", e)
+        return jsonify({'error': str(e)}), 500
 
-        # Si aucun cavalier et pas de commentaire/type, supprimer l'entrée
-        if (not cavaliers or len(cavaliers) == 0) and not comment and not work_type:
-            if date in assignments:
-                del assignments[date]
-                print(f"Suppression de l'entrée pour {date}")
-        else:
-            assignments[date] = {
-                'cavaliers': cavaliers,
-                'comment': comment,
-                'work_type': work_type
-            }
-            print(f"Sauvegarde pour {date}: {assignments[date]}")
-
-        if not DataService.write_assignments(assignments):
+@assignments_bp.route('/batch', methods=['POST'])
+def save_assignments_batch():
+    """Sauvegarder plusieurs journées en une fois.
+
+    Corps : liste (ou {"changes": liste}) de modifications au format de
+    POST /api/assignments. Le lot est validé en entier puis écrit en une
+    seule fois : rien n'est enregistré si une modification est invalide.
+    """
+    try:
+        data = request.get_json()
+        items = data.get('changes') if isinstance(data, dict) else data
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Une liste de modifications est requise'}), 400
+
+        cavaliers_table = DataService.cavaliers_table()
+        changes = {}
+        errors = []
+        for index, item in enumerate(items):
+            date, entry, error = parse_assignment_change(item, cavaliers_table)
+            if error:
+                errors.append({'index': index, 'error': error})
+            else:
+                # Une date répétée : la dernière modification l'emporte
+                changes[date] = entry
+
+        if errors:
+            return jsonify({'error': 'Lot invalide, rien n\'a été enregistré', 'errors': errors}), 400
+
+        if not DataService.save_assignments(changes):
             return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
 
-        return jsonify({'success': True, 'assignments': assignments})
+        logger.debug("Lot enregistré : %d dates", len(changes))
+        return jsonify({'success': True, 'changes': changes})
     except Exception as e:
-        print(f"Erreur save_assignment: {e}")
+        logger.exception("Erreur save_assignments_batch: %s", e)
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,32 @@
+import logging
+from flask import Blueprint, jsonify
+from routes.http_cache import conditional_body, make_etag
+from services.calendar import CalendarService
+from services.validation import ValidationService
+
+logger = logging.getLogger(__name__)
+
+calendar_bp = Blueprint('calendar', __name__, url_prefix='/api/calendar')
+
+@calendar_bp.route('/<int:year>/<int:month>', methods=['GET'])
+def get_month(year, month):
+    """Vue d'un mois en une requête : cavaliers, journées et cavaliers actifs
+    de la grille (6 semaines à partir du lundi de la semaine du 1er), et
+    statistiques du mois"""
+    try:
+        if not 1 <= month <= 12:
+            return jsonify({'error': 'Le mois doit être compris entre 1 et 12'}), 400
+        # Années du reste de l'application : la grille reste dans le calendrier
+        valid, error = ValidationService.validate_date(f"{year:04d}-{month:02d}-01")
+        if not valid:
+            return jsonify({'error': error}), 400
+
+        versions = CalendarService.month_versions(year, month)
+
+        return conditional_body(
+            make_etag(*versions),
+            lambda: CalendarService.month_body(year, month, versions)
+        )
+    except Exception as e:
+        logger.exception("Erreur get_month: %s", e)
+        return jsonify({'error': str(e)}), 500
@@ -1,66 +1,79 @@
+import logging
+from datetime import date
 from flask import Blueprint, jsonify, request
+from routes.http_cache import conditional_json
 from services.data_service import DataService
+from services.indexes import next_cavalier_id
 from services.validation import ValidationService
+from services.write_coordinator import WriteRejected
+
+logger = logging.getLogger(__name__)
 
 cavaliers_bp = Blueprint('cavaliers', __name__, url_prefix='/api/cavaliers')
 
+# Taille maximale d'une plage pour /active?from=&to=
+MAX_ACTIVE_RANGE_DAYS = 366
+
 @cavaliers_bp.route('', methods=['GET'])
 def get_cavaliers():
-    """Récupérer tous les cavaliers"""
+    """Récupérer tous les cavaliers (les supprimés restent, marqués "archived",
+    pour afficher l'historique)"""
     try:
-        cavaliers = DataService.read_cavaliers()
-        return jsonify(cavaliers)
+        etag = DataService.data_version('cavaliers')
+        return conditional_json(etag, DataService.read_cavaliers)
     except Exception as e:
-        print(f"Erreur get_cavaliers: {e}")
+        logger.exception("Erreur get_cavaliers: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
 @cavaliers_bp.route('/active', methods=['GET'])
 def get_active_cavaliers():
-    """Récupérer les cavaliers actifs pour une date donnée"""
+    """Récupérer les cavaliers actifs pour une date (?date=) ou pour chaque jour
+    d'une plage (?from=&to=, un mois en une seule requête)"""
     try:
         date_str = request.args.get('date', '')  # Format: YYYY-MM-DD
-        cavaliers = DataService.read_cavaliers()
-
-        if not isinstance(cavaliers, list):
-            return jsonify({'error': 'Format de données invalide'}), 500
+        table = DataService.cavaliers_table()
+        # La réponse ne dépend que des cavaliers et des paramètres de l'URL
+        etag = table.digest
+
+        if request.args.get('from') or request.args.get('to'):
+            try:
+                start = date.fromisoformat(request.args.get('from', ''))
+                end = date.fromisoformat(request.args.get('to', ''))
+            except ValueError:
+                return jsonify({'error': 'Format de date invalide (YYYY-MM-DD attendu)'}), 400
+
+            if not (0 <= (end - start).days < MAX_ACTIVE_RANGE_DAYS):
+                return jsonify({'error': f'La plage doit couvrir 1 à {MAX_ACTIVE_RANGE_DAYS} jours'}), 400
+
+            return conditional_json(etag, lambda: {
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'cavaliers': table.current(),
+                'days': table.active_between(start, end)
+            })
 
         if not date_str:
-            # Si pas de date, retourner tous les cavaliers
-            return jsonify(cavaliers)
-
-        # Filtrer par date
-        active_cavaliers = []
-        for c in cavaliers:
-            if not isinstance(c, dict):
-                continue
-
-            start_date = c.get('start_date', '')
-            end_date = c.get('end_date', '')
-
-            # Si pas de dates définies, le cavalier est toujours actif
-            if not start_date and not end_date:
-                active_cavaliers.append(c)
-                continue
-
-            # Vérifier si la date est dans la plage
-            is_active = True
-
-            if start_date and date_str < start_date:
-                is_active = False
+            # Si pas de date, retourner tous les cavaliers non archivés
+            return conditional_json(etag, table.current)
 
-            if end_date and date_str > end_date:
-                is_active = False
-
-            if is_active:
-                active_cavaliers.append(c)
-
-        return jsonify(active_cavaliers)
+        # Index d'intervalles sur les dates de début/fin
+        return conditional_json(etag, lambda: table.active_on(date_str))
     except Exception as e:
-        print(f"Erreur get_active_cavaliers: {e}")
+        logger.exception("Erreur get_active_cavaliers: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
+def find_cavalier(cavaliers, cavalier_id):
+    """Cavalier (non archivé) d'identifiant donné, dans la liste relue sous verrou"""
+    for c in cavaliers:
+        if not isinstance(c, dict):
+            raise WriteRejected('Format de données cavaliers invalide', 500)
+        if c.get('id') == cavalier_id and not c.get('archived'):
+            return c
+    raise WriteRejected('Cavalier introuvable', 404)
+
+
 @cavaliers_bp.route('', methods=['POST'])
 def add_cavalier():
     """Ajouter un nouveau cavalier"""
@@ -72,123 +85,131 @@ def add_cavalier():
         if not valid:
             return jsonify({'error': error}), 400
 
-        cavaliers = DataService.read_cavaliers()
-
-        if not isinstance(cavaliers, list):
-            return jsonify({'error': 'Format de données invalide'}), 500
-
-        # Vérifier si le cavalier existe déjà
         name = data['name'].strip()
-        for c in cavaliers:
-            if not isinstance(c, dict) or 'name' not in c:
-                return jsonify({'error': 'Format de données cavaliers invalide'}), 500
-            if c['name'].lower() == name.lower():
-                return jsonify({'error': 'Ce cavalier existe déjà'}), 400
-
-        # Ajouter le nouveau cavalier
         new_cavalier = {
             'name': name,
             'color': data.get('color', '#667eea'),
             'start_date': data.get('start_date', ''),
             'end_date': data.get('end_date', '')
         }
-        cavaliers.append(new_cavalier)
 
-        # Sauvegarder
-        if not DataService.write_cavaliers(cavaliers):
+        def add(cavaliers):
+            # Vérifier si le cavalier existe déjà (les archivés ne comptent pas)
+            for c in cavaliers:
+                if not isinstance(c, dict) or 'name' not in c:
+                    raise WriteRejected('Format de données cavaliers invalide', 500)
+                if c['name'].lower() == name.lower() and not c.get('archived'):
+                    raise WriteRejected('Ce cavalier existe déjà')
+
+            # Ajouter le nouveau cavalier, avec un identifiant jamais utilisé
+            new_cavalier['id'] = next_cavalier_id(cavaliers)
+            cavaliers.append(new_cavalier)
+
+        # Sauvegarder (liste relue sous verrou)
+        cavaliers = DataService.update_cavaliers(add)
+        if cavaliers is None:
             return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
 
-        print(f"Cavalier ajouté: {new_cavalier}")
+        logger.debug("Cavalier ajouté: %s", new_cavalier)
         return jsonify({'success': True, 'cavaliers': cavaliers})
+    except WriteRejected as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
-        print(f"Erreur add_cavalier: {e}")
+        logger.exception("Erreur add_cavalier: %s", e)
         return jsonify({'error': str(e)}), 500
 
-@cavaliers_bp.route('/<int:index>', methods=['DELETE'])
-def delete_cavalier(index):
-    """Supprimer un cavalier"""
-    try:
-        cavaliers = DataService.read_cavaliers()
+@cavaliers_bp.route('/<int:cavalier_id>', methods=['DELETE'])
+def delete_cavalier(cavalier_id):
+    """Supprimer un cavalier.
 
-        if not isinstance(cavaliers, list):
-            return jsonify({'error': 'Format de données invalide'}), 500
+    Le cavalier est archivé : les journées passées gardent son nom.
+    """
+    try:
+        deleted = []
 
-        if 0 <= index < len(cavaliers):
-            deleted = cavaliers.pop(index)
+        def delete(cavaliers):
+            cavalier = find_cavalier(cavaliers, cavalier_id)
+            cavalier['archived'] = True
+            deleted.append(cavalier)
 
-            if not DataService.write_cavaliers(cavaliers):
-                return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
+        cavaliers = DataService.update_cavaliers(delete)
+        if cavaliers is None:
+            return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
 
-            print(f"Cavalier supprimé: {deleted}")
-            return jsonify({'success': True, 'cavaliers': cavaliers})
-        else:
-            return jsonify({'error': 'Index invalide'}), 400
+        logger.debug("Cavalier supprimé: %s", deleted[0])
+        return jsonify({'success': True, 'cavaliers': cavaliers})
+    except WriteRejected as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
-        print(f"Erreur delete_cavalier: {e}")
+        logger.exception("Erreur delete_cavalier: %s", e)
         return jsonify({'error': str(e)}), 500
 
-@cavaliers_bp.route('/<int:index>', methods=['PUT'])
-def update_cavalier(index):
+@cavaliers_bp.route('/<int:cavalier_id>', methods=['PUT'])
+def update_cavalier(cavalier_id):
     """Mettre à jour un cavalier"""
     try:
         data = request.get_json()
-        cavaliers = DataService.read_cavaliers()
-
-        if not isinstance(cavaliers, list):
-            return jsonify({'error': 'Format de données invalide'}), 500
 
-        if not (0 <= index < len(cavaliers)):
-            return jsonify({'error': 'Index invalide'}), 400
-
-        if not isinstance(cavaliers[index], dict):
-            return jsonify({'error': 'Format de cavalier invalide'}), 500
-
-        # Mettre à jour les champs fournis
+        # Valider les champs fournis
         if 'color' in data:
             valid, error = ValidationService.validate_color(data['color'])
             if not valid:
                 return jsonify({'error': error}), 400
-            cavaliers[index]['color'] = data['color']
 
         if 'name' in data:
             valid, error = ValidationService.validate_cavalier_name(data['name'])
             if not valid:
                 return jsonify({'error': error}), 400
 
-            name = data['name'].strip()
-            # Vérifier que le nouveau nom n'existe pas déjà
-            for i, c in enumerate(cavaliers):
-                if i != index and isinstance(c, dict) and c.get('name', '').lower() == name.lower():
-                    return jsonify({'error': 'Ce nom existe déjà'}), 400
-
-            cavaliers[index]['name'] = name
-
-        if 'start_date' in data:
-            valid, error = ValidationService.validate_date(data['start_date'])
+        for field in ('start_date', 'end_date'):
+            if field in data:
+                valid, error = ValidationService.validate_date(data[field])
+                if not valid:
+                    return jsonify({'error': error}), 400
+
+        updated = []
+
+        def update(cavaliers):
+            cavalier = find_cavalier(cavaliers, cavalier_id)
+
+            # Mettre à jour les champs fournis
+            if 'color' in data:
+                cavalier['color'] = data['color']
+
+            if 'name' in data:
+                name = data['name'].strip()
+                # Vérifier que le nouveau nom n'existe pas déjà
+                for c in cavaliers:
+                    if (c is not cavalier and isinstance(c, dict) and not c.get('archived')
+                            and c.get('name', '').lower() == name.lower()):
+                        raise WriteRejected('Ce nom existe déjà')
+                # Les journées référencent l'identifiant : rien d'autre à modifier
+                cavalier['name'] = name
+
+            if 'start_date' in data:
+                cavalier['start_date'] = data['start_date']
+
+            if 'end_date' in data:
+                cavalier['end_date'] = data['end_date']
+
+            # Validation des dates après mise à jour
+            valid, error = ValidationService.validate_date_range(
+                cavalier.get('start_date', ''),
+                cavalier.get('end_date', '')
+            )
             if not valid:
-                return jsonify({'error': error}), 400
-            cavaliers[index]['start_date'] = data['start_date']
-
-        if 'end_date' in data:
-            valid, error = ValidationService.validate_date(data['end_date'])
-            if not valid:
-                return jsonify({'error': error}), 400
-            cavaliers[index]['end_date'] = data['end_date']
-
-        # Validation des dates après mise à jour
-        valid, error = ValidationService.validate_date_range(
-            cavaliers[index].get('start_date', ''),
-            cavaliers[index].get('end_date', '')
-        )
-        if not valid:
-            return jsonify({'error': error}), 400
+                raise WriteRejected(error)
+            updated.append(cavalier)
 
-        # Sauvegarder
-        if not DataService.write_cavaliers(cavaliers):
+        # Sauvegarder (liste relue sous verrou)
+        cavaliers = DataService.update_cavaliers(update)
+        if cavaliers is None:
             return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
 
-        print(f"Cavalier mis à jour: {cavaliers[index]}")
+        logger.debug("Cavalier mis à jour: %s", updated[0])
         return jsonify({'success': True, 'cavaliers': cavaliers})
+    except WriteRejected as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
-        print(f"Erreur update_cavalier: {e}")
+        logger.exception("Erreur update_cavalier: %s", e)
         return jsonify({'error': str(e)}), 500
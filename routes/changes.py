@@ -0,0 +1,159 @@
+import json
+import logging
+import threading
+import time
+from flask import Blueprint, Response, jsonify, request
+from config import Config
+from services.data_service import DataService
+from services.horses import current_horse
+
+logger = logging.getLogger(__name__)
+
+changes_bp = Blueprint('changes', __name__, url_prefix='/api/changes')
+
+# Un flux SSE occupe un thread du worker : il est fermé au bout de
+# Config.CHANGES_STREAM_SECONDS et le navigateur se reconnecte (en-tête
+# Last-Event-ID) ; au plus Config.CHANGES_STREAM_MAX flux ouverts par worker
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_RETRY_MS = 3000
+# Flux refusé (limite atteinte) : reconnexion plus tardive
+STREAM_BUSY_RETRY_MS = 10000
+
+_open_streams = 0
+_streams_lock = threading.Lock()
+
+
+def _open_stream():
+    """Réserver un flux du worker ; False si la limite est atteinte"""
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= Config.CHANGES_STREAM_MAX:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _close_stream():
+    global _open_streams
+    with _streams_lock:
+        _open_streams -= 1
+
+
+def concerns(horse):
+    """Filtre des modifications d'un cheval : les siennes et celles des
+    cavaliers, partagés par l'écurie (sans cheval : d'avant les chevaux)"""
+    return lambda record: record.get('dataset') == 'cavaliers' or \
+        record.get('horse', Config.DEFAULT_HORSE) == horse
+
+
+def parse_version(value):
+    """Version transmise par le client, ou None si absente/invalide"""
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        return None
+    return version if version >= 0 else None
+
+
+@changes_bp.route('', methods=['GET'])
+def get_changes():
+    """Modifications du cheval (et des cavaliers) depuis la version ?since=N.
+
+    Retourne {"version": V, "changes": [...]} ou, si N est trop ancien (ou
+    absent), {"version": V, "snapshot": {"assignments": ..., "cavaliers": ...,
+    "recurrences": ...}}.
+    """
+    try:
+        since = request.args.get('since')
+        version = parse_version(since)
+        if since is not None and version is None:
+            return jsonify({'error': 'since doit être un entier positif'}), 400
+
+        changes = DataService.changes()
+        if version is not None:
+            current, records = changes.since(version, concerns(current_horse()))
+            if records is not None:
+                return jsonify({'version': current, 'changes': records})
+
+        # Version lue avant les données : les modifications suivantes
+        # peuvent être réappliquées sans risque (état complet par date)
+        current = changes.refresh()
+        return jsonify({
+            'version': current,
+            'snapshot': {
+                'assignments': DataService.read_assignments(),
+                'cavaliers': DataService.read_cavaliers(),
+                'recurrences': DataService.read_recurrences()
+            }
+        })
+    except Exception as e:
+        logger.exception("Erreur get_changes: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+def _event(event, data, version=None):
+    lines = [f"id: {version}"] if version is not None else []
+    lines.append(f"event: {event}")
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _resume(version):
+    # Sans données : aucun événement, mais le navigateur reprendra après
+    # cette version (Last-Event-ID) à sa reconnexion
+    return f"id: {version}\n\n"
+
+
+@changes_bp.route('/stream', methods=['GET'])
+def stream_changes():
+    """Flux SSE des modifications enregistrées.
+
+    Événements : "change" (une modification, id = sa version) et "reset"
+    (modifications manquées : le client doit tout recharger). Reprend après
+    la version Last-Event-ID ou ?since=, sinon à partir de maintenant.
+    Au-delà de Config.CHANGES_STREAM_MAX flux dans le worker : modifications
+    en attente seulement, puis fermeture.
+    """
+    changes = DataService.changes()
+    accept = concerns(current_horse())
+    version = parse_version(request.headers.get('Last-Event-ID'))
+    if version is None:
+        version = parse_version(request.args.get('since'))
+    if version is None:
+        version = changes.refresh()
+
+    def pending(version):
+        current, records = changes.since(version, accept)
+        if records is None:
+            yield _event('reset', {'version': current}, current)
+        else:
+            for record in records:
+                yield _event('change', record, record['version'])
+        return current
+
+    def generate(version):
+        # Réservé à la première lecture : un flux jamais lu ne compte pas
+        if not _open_stream():
+            yield f"retry: {STREAM_BUSY_RETRY_MS}\n\n"
+            version = yield from pending(version)
+            yield _resume(version)
+            return
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            deadline = time.monotonic() + Config.CHANGES_STREAM_SECONDS
+            while True:
+                version = yield from pending(version)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield _resume(version)
+                    break
+                if changes.wait(version, min(STREAM_HEARTBEAT_SECONDS, remaining)) == version:
+                    # Commentaire : garde la connexion ouverte à travers les proxys
+                    yield ': ping\n\n'
+        finally:
+            _close_stream()
+
+    return Response(generate(version), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,49 @@
+from flask import request
+from config import Config
+from services.compression import compress, negotiate
+
+# Réponses compressées à l'envoi (les fichiers statiques du build sont
+# déjà précompressés, voir routes/assets.py)
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/plain', 'text/csv', 'text/calendar',
+    'text/css', 'application/javascript', 'text/javascript',
+}
+
+
+def _compress_response(response):
+    # Réponses en streaming (exports, SSE) et fichiers envoyés tels quels exclus
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESS_MIN_BYTES:
+        return response
+
+    # La réponse dépend d'Accept-Encoding, compressée ou non
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # Autres octets, même contenu : ETag faible (les 304 restent possibles,
+    # If-None-Match est comparé faiblement)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def register_compression(app):
+    """Compresser (brotli ou gzip, selon Accept-Encoding) les réponses
+    textuelles de plus de Config.COMPRESS_MIN_BYTES octets.
+
+    À enregistrer après register_metrics : la compression est alors
+    comprise dans la durée mesurée des requêtes.
+    """
+    if Config.COMPRESS_MIN_BYTES >= 0:
+        app.after_request(_compress_response)
@@ -0,0 +1,70 @@
+import logging
+from flask import Blueprint, jsonify, request
+from routes.http_cache import conditional_stream, make_etag
+from services.data_service import DataService
+from services.export import ExportService
+from services.validation import ValidationService
+
+logger = logging.getLogger(__name__)
+
+export_bp = Blueprint('export', __name__, url_prefix='/api')
+
+FORMATS = {
+    'csv': (ExportService.csv_chunks, 'text/csv'),
+    'ics': (ExportService.ics_chunks, 'text/calendar'),
+}
+
+
+def _export(extension):
+    """Export filtré par ?from=&to= (dates incluses) et ?cavalier= (identifiant
+    ou nom), envoyé en streaming"""
+    start = request.args.get('from', '')
+    end = request.args.get('to', '')
+    for date_str in (start, end):
+        valid, error = ValidationService.validate_date(date_str)
+        if not valid:
+            return jsonify({'error': error}), 400
+    valid, error = ValidationService.validate_date_range(start, end)
+    if not valid:
+        return jsonify({'error': error}), 400
+
+    # Table et cavaliers lus avant l'envoi : le générateur ne dépend pas de la requête
+    table = DataService.schedule()
+    riders = DataService.cavaliers_table()
+    cavalier = request.args.get('cavalier', '')
+    cavalier_id = None
+    if cavalier:
+        cavalier_id = riders.resolve(int(cavalier) if cavalier.isdigit() else cavalier)
+        if cavalier_id is None:
+            return jsonify({'error': f'Cavalier inconnu : {cavalier}'}), 404
+
+    generate, mimetype = FORMATS[extension]
+    by_id = riders.by_id()
+    response = conditional_stream(
+        make_etag(table.digest, riders.digest, extension, start, end, str(cavalier_id or '')),
+        lambda: generate(table, by_id, start or None, end or None, cavalier_id),
+        mimetype
+    )
+    filename = f"planning-{cavalier_id}.{extension}" if cavalier_id is not None else f"planning.{extension}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@export_bp.route('/export.csv', methods=['GET'])
+def export_csv():
+    """Journées au format CSV (date, type, noms et identifiants des cavaliers, commentaire)"""
+    try:
+        return _export('csv')
+    except Exception as e:
+        logger.exception("Erreur export_csv: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@export_bp.route('/export.ics', methods=['GET'])
+def export_ics():
+    """Journées au format iCalendar, à importer ou à suivre depuis un agenda"""
+    try:
+        return _export('ics')
+    except Exception as e:
+        logger.exception("Erreur export_ics: %s", e)
+        return jsonify({'error': str(e)}), 500
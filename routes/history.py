@@ -0,0 +1,51 @@
+import logging
+from flask import Blueprint, jsonify, request
+from services.data_service import DataService
+from services.history import format_timestamp, parse_timestamp
+from services.validation import ValidationService
+
+logger = logging.getLogger(__name__)
+
+history_bp = Blueprint('history', __name__, url_prefix='/api/history')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+
+@history_bp.route('', methods=['GET'])
+def get_history():
+    """Modifications d'une journée ?date=YYYY-MM-DD, de la plus récente à la
+    plus ancienne (?limit=N, 50 par défaut), ou sa valeur à un instant
+    ?as_of= (secondes depuis l'epoch ou date/heure ISO 8601)"""
+    try:
+        date = request.args.get('date', '')
+        if not date:
+            return jsonify({'error': 'La date est requise'}), 400
+        valid, error = ValidationService.validate_iso_date(date)
+        if not valid:
+            return jsonify({'error': error}), 400
+
+        as_of = request.args.get('as_of')
+        if as_of:
+            try:
+                instant = parse_timestamp(as_of)
+            except (ValueError, OverflowError, OSError):
+                return jsonify({'error': f'Instant invalide : {as_of}'}), 400
+            entry = DataService.assignments_as_of(instant, date, date).get(date)
+            return jsonify({'date': date, 'as_of': format_timestamp(instant * 1000), 'entry': entry})
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({'error': 'limit doit être un entier'}), 400
+        if not 1 <= limit <= MAX_LIMIT:
+            return jsonify({'error': f'limit doit être compris entre 1 et {MAX_LIMIT}'}), 400
+
+        history = [
+            {'at': format_timestamp(ts), 'ts': ts, 'entry': entry}
+            for ts, entry in DataService.assignment_history(date, limit)
+        ]
+        return jsonify({'date': date, 'history': history})
+    except Exception as e:
+        logger.exception("Erreur get_history: %s", e)
+        return jsonify({'error': str(e)}), 500
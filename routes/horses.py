@@ -0,0 +1,139 @@
+import logging
+from datetime import date
+from flask import Blueprint, abort, current_app, jsonify, make_response, request
+from routes.assignments import months_between
+from routes.http_cache import conditional_json, make_etag
+from services.data_service import DataService
+from services.horses import select_horse
+from services.indexes import content_digest
+from services.validation import ValidationService
+from services.write_coordinator import WriteRejected
+
+logger = logging.getLogger(__name__)
+
+horses_bp = Blueprint('horses', __name__, url_prefix='/api/horses')
+
+
+def register_horse_routes(app, blueprints):
+    """Servir chaque blueprint pour le cheval par défaut (/api/assignments...)
+    et pour chaque cheval (/api/<cheval>/assignments...).
+
+    Le cheval de l'URL est retiré des arguments de la vue et choisi pour les
+    accès aux données de la requête (`services/horses.py`) : les vues n'ont
+    pas à le connaître.
+    """
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint)
+        app.register_blueprint(
+            blueprint, name=f"horse_{blueprint.name}",
+            url_prefix=blueprint.url_prefix.replace('/api', '/api/<horse>', 1)
+        )
+    app.url_value_preprocessor(_select_horse)
+
+
+def _select_horse(endpoint, values):
+    horse = values.pop('horse', None) if values else None
+    if horse is not None and not DataService.horse_exists(horse):
+        abort(make_response(jsonify({'error': f'Cheval inconnu : {horse}'}), 404))
+    select_horse(horse)
+
+
+def _reserved():
+    """Premiers segments des routes /api/... : pas de cheval de ce nom"""
+    return {rule.rule.split('/')[2] for rule in current_app.url_map.iter_rules() if rule.rule.startswith('/api/')}
+
+
+@horses_bp.route('', methods=['GET'])
+def get_horses():
+    """Chevaux de l'écurie [{id, name}]"""
+    try:
+        horses = DataService.horses()
+        return conditional_json(f"{content_digest(horses):032x}", lambda: horses)
+    except Exception as e:
+        logger.exception("Erreur get_horses: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@horses_bp.route('', methods=['POST'])
+def add_horse():
+    """Ajouter un cheval {id, name} ; ses données sont ensuite sous /api/<id>/..."""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Cheval invalide'}), 400
+
+        horse = data.get('id')
+        valid, error = ValidationService.validate_horse_id(horse)
+        if not valid:
+            return jsonify({'error': error}), 400
+        if horse in _reserved():
+            return jsonify({'error': f'Identifiant réservé : {horse}'}), 400
+
+        name = data.get('name') or horse
+        valid, error = ValidationService.validate_cavalier_name(name)
+        if not valid:
+            return jsonify({'error': error}), 400
+
+        entry = DataService.create_horse(horse, name.strip())
+        return jsonify({'success': True, 'horse': entry, 'horses': DataService.horses()}), 201
+    except WriteRejected as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        logger.exception("Erreur add_horse: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@horses_bp.route('/load', methods=['GET'])
+def get_rider_load():
+    """Séances de chaque cavalier sur tous les chevaux entre ?from= et ?to=
+    (par défaut l'année en cours), avec le détail par cheval.
+
+    Chaque cheval répond par les sommes cumulées des seules années de la
+    plage (occurrences des règles de récurrence comprises) ; l'ETag ne
+    dépend que des mois de la plage.
+    """
+    try:
+        year = date.today().year
+        start_str = request.args.get('from') or f"{year}-01-01"
+        end_str = request.args.get('to') or f"{year}-12-31"
+        for date_str in (start_str, end_str):
+            valid, error = ValidationService.validate_iso_date(date_str)
+            if not valid:
+                return jsonify({'error': error}), 400
+        start, end = date.fromisoformat(start_str), date.fromisoformat(end_str)
+
+        valid, error = ValidationService.validate_date_range(start.isoformat(), end.isoformat())
+        if not valid:
+            return jsonify({'error': error}), 400
+
+        horses = DataService.horses()
+        schedules = {horse['id']: DataService.schedule(horse['id']) for horse in horses}
+        months = list(months_between(start.isoformat(), end.isoformat()))
+        versions = [DataService.data_version('cavaliers'), start.isoformat(), end.isoformat()]
+        for horse in horses:
+            versions.append(horse['id'])
+            versions.extend(schedules[horse['id']].month_digest(m) for m in months)
+
+        def build():
+            cavaliers = {}
+            summary = []
+            for horse in horses:
+                counts, _ = schedules[horse['id']].daily_counts(start, end).totals(start, end)
+                for cavalier_id, n in counts.items():
+                    load = cavaliers.setdefault(cavalier_id, {'total': 0, 'horses': {}})
+                    load['total'] += n
+                    load['horses'][horse['id']] = n
+                summary.append({**horse, 'cavalier_sessions': sum(counts.values())})
+
+            return {
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'horses': summary,
+                'cavaliers': cavaliers,
+                'cavaliers_data': DataService.read_cavaliers()
+            }
+
+        return conditional_json(make_etag(*versions), build)
+    except Exception as e:
+        logger.exception("Erreur get_rider_load: %s", e)
+        return jsonify({'error': str(e)}), 500
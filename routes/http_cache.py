@@ -0,0 +1,44 @@
+import hashlib
+from flask import current_app, jsonify, request
+
+# Les clients peuvent garder les réponses mais doivent les revalider
+# (If-None-Match) à chaque fois : une revalidation sans changement coûte un 304.
+CACHE_CONTROL = 'no-cache'
+
+
+def make_etag(*versions):
+    """ETag fort à partir d'une ou plusieurs versions de données"""
+    if len(versions) == 1:
+        return versions[0]
+    return hashlib.blake2b('-'.join(versions).encode(), digest_size=16).hexdigest()
+
+
+def conditional_json(etag, build):
+    """Réponse JSON avec ETag, ou 304 si le client a déjà cette version.
+
+    `build()` n'est appelé (et le résultat sérialisé) que si la réponse
+    doit être envoyée.
+    """
+    return _conditional(etag, lambda: jsonify(build()))
+
+
+def conditional_body(etag, build):
+    """Comme `conditional_json`, `build()` retournant le JSON déjà sérialisé"""
+    return _conditional(etag, lambda: current_app.response_class(build(), mimetype='application/json'))
+
+
+def conditional_stream(etag, generate, mimetype):
+    """Comme `conditional_json`, `generate()` retournant un générateur de
+    morceaux envoyés au fil de l'eau (sans Content-Length)"""
+    return _conditional(etag, lambda: current_app.response_class(generate(), mimetype=mimetype))
+
+
+def _conditional(etag, respond):
+    # Comparaison faible (RFC 7232) : un proxy qui compresse peut affaiblir l'ETag
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = respond()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,113 @@
+import logging
+from itertools import islice
+from flask import Blueprint, jsonify, request
+from config import Config
+from routes.assignments import parse_assignment_change
+from services.data_service import DataService
+from services.importer import READERS, ImportFormatError, detect_format
+
+logger = logging.getLogger(__name__)
+
+import_bp = Blueprint('import', __name__, url_prefix='/api')
+
+# Exemples de modifications détaillés par un essai (?dry_run=1)
+DRY_RUN_SAMPLE = 50
+
+
+class _Import:
+    """Lignes validées et enregistrées par lots de Config.IMPORT_BATCH_ROWS.
+
+    Chaque lot valide est écrit en une seule fois (une écriture, donc un
+    enregistrement du journal ou une transaction SQLite) ; les lignes qui ne
+    changent rien ne sont pas écrites. Un essai n'écrit rien : les lots
+    restent en attente pour comparer les lignes suivantes au résultat.
+    """
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.cavaliers_table = DataService.cavaliers_table()
+        self.table = DataService.assignments_table()
+        self.pending = {}
+        self.report = {
+            'dry_run': dry_run, 'rows': 0, 'created': 0, 'updated': 0, 'deleted': 0,
+            'unchanged': 0, 'batches': 0, 'error_count': 0, 'errors': []
+        }
+        if dry_run:
+            self.report['changes'] = []
+
+    def error(self, line, message):
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < Config.IMPORT_MAX_ERRORS:
+            self.report['errors'].append({'line': line, 'error': message})
+
+    def _current(self, date):
+        return self.pending[date] if date in self.pending else self.table.get(date)
+
+    def validate(self, batch):
+        """Valider un lot de (ligne, modification, erreur de lecture)"""
+        for line, item, error in batch:
+            self.report['rows'] += 1
+            if error is None:
+                date, entry, error = parse_assignment_change(item, self.cavaliers_table)
+            if error is not None:
+                self.error(line, error)
+                continue
+
+            before = self._current(date)
+            if before == entry:
+                self.report['unchanged'] += 1
+                continue
+            kind = 'deleted' if entry is None else 'created' if before is None else 'updated'
+            self.report[kind] += 1
+            self.pending[date] = entry
+            if self.dry_run and len(self.report['changes']) < DRY_RUN_SAMPLE:
+                self.report['changes'].append({'line': line, 'date': date, 'before': before, 'after': entry})
+
+    def commit(self):
+        """Écrire le lot en attente ; False si l'écriture a échoué"""
+        if self.dry_run or not self.pending:
+            return True
+        if not DataService.save_assignments(self.pending):
+            return False
+        self.report['batches'] += 1
+        self.pending = {}
+        self.table = DataService.assignments_table()
+        return True
+
+
+@import_bp.route('/import', methods=['POST'])
+def import_assignments():
+    """Importer des journées depuis un fichier CSV (colonnes de /api/export.csv)
+    ou JSON lines (une modification de POST /api/assignments par ligne).
+
+    Format : ?format=csv|jsonl, sinon d'après le Content-Type. Le corps est
+    lu au fil de l'eau ; les lignes invalides sont signalées (numéro de
+    ligne) et ignorées, les autres enregistrées par lots. ?dry_run=1 : ne
+    rien écrire, décrire ce qui changerait.
+    """
+    try:
+        fmt = detect_format(request.args.get('format'), request.content_type)
+        if fmt is None:
+            return jsonify({'error': 'Format attendu : csv ou jsonl (?format= ou Content-Type)'}), 415
+
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        job = _Import(dry_run)
+        rows = READERS[fmt](request.stream)
+        try:
+            while True:
+                batch = list(islice(rows, Config.IMPORT_BATCH_ROWS))
+                if not batch:
+                    break
+                job.validate(batch)
+                if not job.commit():
+                    return jsonify(dict(job.report, error='Erreur lors de la sauvegarde')), 500
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            # Lots précédents déjà enregistrés : le rapport les décrit
+            return jsonify(dict(job.report, error=f'Fichier illisible : {e}')), 400
+
+        logger.info("✅ Import %s : %d lignes, %d lots%s", fmt, job.report['rows'],
+                    job.report['batches'], ' (essai)' if dry_run else '')
+        return jsonify(dict(job.report, success=True))
+    except Exception as e:
+        logger.exception("Erreur import_assignments: %s", e)
+        return jsonify({'error': str(e)}), 500
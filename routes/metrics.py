@@ -0,0 +1,70 @@
+import logging
+import time
+from flask import Blueprint, Response, g, request
+from flask.json.provider import DefaultJSONProvider
+from config import Config
+from services.metrics import (
+    REGISTRY, REQUEST_DURATION, REQUEST_ERRORS, REQUESTS, timed_json
+)
+
+logger = logging.getLogger(__name__)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON des requêtes et réponses, avec mesure du temps de (dé)sérialisation"""
+
+    # Sans indentation, même en mode debug
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        with timed_json('serialize', 'http'):
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        with timed_json('parse', 'http'):
+            return super().loads(s, **kwargs)
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+
+    # Routes inconnues (404) regroupées pour ne pas multiplier les séries
+    endpoint = request.endpoint or 'unknown'
+    blueprint = request.blueprint or ''
+    REQUEST_DURATION.observe(time.perf_counter() - started,
+                             blueprint=blueprint, endpoint=endpoint, method=request.method)
+    REQUESTS.inc(blueprint=blueprint, endpoint=endpoint, method=request.method, status=response.status_code)
+    if response.status_code >= 500:
+        REQUEST_ERRORS.inc(blueprint=blueprint, endpoint=endpoint)
+
+    # Écriture périodique des valeurs : thread démarré par processus (fork)
+    REGISTRY.start(Config.METRICS_DIR, Config.METRICS_FLUSH_SECONDS)
+    return response
+
+
+def register_metrics(app):
+    """Mesurer chaque requête (durée par blueprint et endpoint, codes de
+    réponse, temps JSON) et exposer /metrics"""
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.register_blueprint(metrics_bp)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métriques de tous les workers au format texte Prometheus"""
+    try:
+        body = REGISTRY.collect(Config.METRICS_DIR)
+        return Response(body, mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logger.exception("Erreur get_metrics: %s", e)
+        return Response(f"# erreur : {e}\n", status=500, mimetype='text/plain')
@@ -0,0 +1,191 @@
+import logging
+from datetime import date
+from flask import Blueprint, jsonify, request
+from routes.http_cache import conditional_json
+from services.data_service import DataService
+from services.recurrence import FREQUENCIES
+from services.validation import ValidationService
+from services.write_coordinator import WriteRejected
+
+logger = logging.getLogger(__name__)
+
+recurrences_bp = Blueprint('recurrences', __name__, url_prefix='/api/recurrences')
+
+MAX_INTERVAL = 366
+
+
+def _strict_date(value, field):
+    """Date réelle écrite YYYY-MM-DD (validate_date accepte le 31 de chaque
+    mois et 2025-1-5)"""
+    valid, error = ValidationService.validate_iso_date(value)
+    return None if valid else f'{field} : {error}'
+
+
+def parse_recurrence(data, cavaliers_table):
+    """Lire une règle {frequency, interval, weekdays, start_date, end_date,
+    exceptions, cavaliers, comment, work_type}.
+
+    frequency : 'weekly' (jours `weekdays`, 0 = lundi, toutes les `interval`
+    semaines) ou 'daily' (tous les `interval` jours). Les cavaliers sont
+    désignés par identifiant ou par nom, enregistrés par identifiant.
+    Retourne (règle sans identifiant, erreur).
+    """
+    if not isinstance(data, dict):
+        return None, 'Règle invalide'
+
+    frequency = data.get('frequency', 'weekly')
+    if frequency not in FREQUENCIES:
+        return None, 'frequency doit valoir weekly ou daily'
+
+    interval = data.get('interval', 1)
+    if not isinstance(interval, int) or isinstance(interval, bool) or not 1 <= interval <= MAX_INTERVAL:
+        return None, f'interval doit être un entier entre 1 et {MAX_INTERVAL}'
+
+    start_date = data.get('start_date')
+    if not start_date:
+        return None, 'start_date est requise'
+    end_date = data.get('end_date', '') or ''
+    for field, value in (('start_date', start_date), ('end_date', end_date)):
+        if value:
+            error = _strict_date(value, field)
+            if error:
+                return None, error
+    valid, error = ValidationService.validate_date_range(start_date, end_date)
+    if not valid:
+        return None, error
+
+    weekdays = data.get('weekdays') or []
+    if frequency == 'weekly':
+        if not isinstance(weekdays, list) or not all(
+                isinstance(d, int) and not isinstance(d, bool) and 0 <= d <= 6 for d in weekdays):
+            return None, 'weekdays doit être une liste de jours de 0 (lundi) à 6 (dimanche)'
+        weekdays = sorted(set(weekdays)) or [date.fromisoformat(start_date).weekday()]
+    else:
+        weekdays = []
+
+    exceptions = data.get('exceptions') or []
+    if not isinstance(exceptions, list):
+        return None, 'exceptions doit être une liste de dates'
+    for value in exceptions:
+        error = _strict_date(value, 'exceptions') if isinstance(value, str) else 'exceptions doit être une liste de dates'
+        if error:
+            return None, error
+
+    cavaliers = data.get('cavaliers', [])
+    if not isinstance(cavaliers, list):
+        return None, 'cavaliers doit être une liste'
+    ids = []
+    for cavalier in cavaliers:
+        cavalier_id = cavaliers_table.resolve(cavalier)
+        if cavalier_id is None:
+            return None, f'Cavalier inconnu : {cavalier}'
+        ids.append(cavalier_id)
+
+    comment = data.get('comment', '') or ''
+    work_type = data.get('work_type', '') or ''
+    if not isinstance(comment, str):
+        return None, 'comment doit être une chaîne'
+    valid, error = ValidationService.validate_work_type(work_type)
+    if not valid:
+        return None, error
+    if not ids and not comment and not work_type:
+        return None, 'Une règle doit indiquer des cavaliers, un commentaire ou un type de travail'
+
+    return {
+        'frequency': frequency,
+        'interval': interval,
+        'weekdays': weekdays,
+        'start_date': start_date,
+        'end_date': end_date,
+        'exceptions': sorted(set(exceptions)),
+        'cavaliers': ids,
+        'comment': comment,
+        'work_type': work_type,
+    }, None
+
+
+def _find(recurrences, recurrence_id):
+    for index, rule in enumerate(recurrences):
+        if isinstance(rule, dict) and rule.get('id') == recurrence_id:
+            return index
+    raise WriteRejected('Règle introuvable', 404)
+
+
+@recurrences_bp.route('', methods=['GET'])
+def get_recurrences():
+    """Règles de récurrence, dans l'ordre de création"""
+    try:
+        return conditional_json(DataService.data_version('recurrences'), DataService.read_recurrences)
+    except Exception as e:
+        logger.exception("Erreur get_recurrences: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@recurrences_bp.route('', methods=['POST'])
+def add_recurrence():
+    """Ajouter une règle ; les journées enregistrées aux mêmes dates l'emportent"""
+    try:
+        rule, error = parse_recurrence(request.get_json(), DataService.cavaliers_table())
+        if error:
+            return jsonify({'error': error}), 400
+
+        def add(recurrences):
+            rule['id'] = max((r.get('id', 0) for r in recurrences if isinstance(r, dict)), default=0) + 1
+            recurrences.append(rule)
+
+        recurrences = DataService.update_recurrences(add)
+        if recurrences is None:
+            return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
+
+        logger.debug("Règle ajoutée: %s", rule)
+        return jsonify({'success': True, 'recurrence': rule, 'recurrences': recurrences}), 201
+    except WriteRejected as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        logger.exception("Erreur add_recurrence: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@recurrences_bp.route('/<int:recurrence_id>', methods=['PUT'])
+def update_recurrence(recurrence_id):
+    """Remplacer une règle (corps complet, comme pour POST)"""
+    try:
+        rule, error = parse_recurrence(request.get_json(), DataService.cavaliers_table())
+        if error:
+            return jsonify({'error': error}), 400
+        rule['id'] = recurrence_id
+
+        def update(recurrences):
+            recurrences[_find(recurrences, recurrence_id)] = rule
+
+        recurrences = DataService.update_recurrences(update)
+        if recurrences is None:
+            return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
+
+        logger.debug("Règle mise à jour: %s", rule)
+        return jsonify({'success': True, 'recurrence': rule, 'recurrences': recurrences})
+    except WriteRejected as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        logger.exception("Erreur update_recurrence: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@recurrences_bp.route('/<int:recurrence_id>', methods=['DELETE'])
+def delete_recurrence(recurrence_id):
+    """Supprimer une règle (les journées enregistrées ne changent pas)"""
+    try:
+        def delete(recurrences):
+            del recurrences[_find(recurrences, recurrence_id)]
+
+        recurrences = DataService.update_recurrences(delete)
+        if recurrences is None:
+            return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
+
+        logger.debug("Règle supprimée: %d", recurrence_id)
+        return jsonify({'success': True, 'recurrences': recurrences})
+    except WriteRejected as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        logger.exception("Erreur delete_recurrence: %s", e)
+        return jsonify({'error': str(e)}), 500
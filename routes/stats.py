@@ -1,47 +1,102 @@
+import logging
+from datetime import date
 from flask import Blueprint, jsonify, request
+from routes.assignments import months_between
+from routes.http_cache import conditional_json, make_etag
 from services.data_service import DataService
+from services.indexes import GRANULARITIES, period_edges
+from services.validation import ValidationService
+
+logger = logging.getLogger(__name__)
 
 stats_bp = Blueprint('stats', __name__, url_prefix='/api/stats')
 
 @stats_bp.route('', methods=['GET'])
 def get_stats():
-    """Récupérer les statistiques"""
+    """Récupérer les statistiques (cavalier_stats par identifiant de cavalier,
+    cavaliers_data pour les noms et couleurs), occurrences des règles de
+    récurrence comprises"""
     try:
         month = request.args.get('month')
         year = request.args.get('year')
 
-        assignments = DataService.read_assignments()
-        cavaliers_data = DataService.read_cavaliers()
-
-        stats = {}
-        work_types_count = {}
+        schedule = DataService.schedule()
+        # Un mois : son empreinte seule (les autres années ne sont pas lues)
+        version = schedule.month_digest(f"{year}-{month}") if month and year else schedule.digest
+        etag = make_etag(version, DataService.data_version('cavaliers'))
 
-        for date_key, data in assignments.items():
-            # Filtrer par mois/année si spécifié
+        def build():
+            # Compteurs mensuels tenus à jour par la table des assignments,
+            # plus les occurrences des règles sur le mois (ou jusqu'à l'horizon)
             if month and year:
-                date_parts = date_key.split('-')
-                if len(date_parts) == 3:
-                    if date_parts[0] != year or date_parts[1] != month:
-                        continue
-
-            cavaliers = data.get('cavaliers', [])
-            work_type = data.get('work_type', '')
-
-            for cavalier in cavaliers:
-                if cavalier not in stats:
-                    stats[cavalier] = 0
-                stats[cavalier] += 1
-
-            if work_type:
-                if work_type not in work_types_count:
-                    work_types_count[work_type] = 0
-                work_types_count[work_type] += 1
-
-        return jsonify({
-            'cavalier_stats': stats,
-            'work_types': work_types_count,
-            'cavaliers_data': cavaliers_data
-        })
+                stats, work_types_count = schedule.stats(f"{year}-{month}")
+            else:
+                stats, work_types_count = schedule.stats()
+
+            cavaliers_data = DataService.read_cavaliers()
+
+            return {
+                'cavalier_stats': stats,
+                'work_types': work_types_count,
+                'cavaliers_data': cavaliers_data
+            }
+
+        return conditional_json(etag, build)
+    except Exception as e:
+        logger.exception("Erreur get_stats: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@stats_bp.route('/range', methods=['GET'])
+def get_range_stats():
+    """Statistiques sur une plage quelconque (?from=&to=) avec une série par période
+    (?granularity=day|week|month)"""
+    try:
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': 'granularity doit valoir day, week ou month'}), 400
+
+        start_arg, end_arg = request.args.get('from'), request.args.get('to')
+        for value in (start_arg, end_arg):
+            valid, error = ValidationService.validate_iso_date(value)
+            if not valid:
+                return jsonify({'error': error}), 400
+
+        # Par défaut : de la première à la dernière date enregistrée (ou
+        # développée à partir d'une règle de récurrence)
+        schedule = DataService.schedule()
+        today = date.today()
+        first, last = schedule.day_bounds() or (today, today)
+        start = date.fromisoformat(start_arg) if start_arg else first
+        end = date.fromisoformat(end_arg) if end_arg else last
+
+        valid, error = ValidationService.validate_date_range(start.isoformat(), end.isoformat())
+        if not valid:
+            return jsonify({'error': error}), 400
+
+        def build():
+            counts = schedule.daily_counts(start, end)
+            stats, work_types_count = counts.totals(start, end)
+            periods, edges = period_edges(start, end, granularity)
+            cavaliers_series, work_types_series = counts.series(edges)
+
+            return {
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'granularity': granularity,
+                'cavalier_stats': stats,
+                'work_types': work_types_count,
+                'series': {
+                    'periods': periods,
+                    'cavaliers': cavaliers_series,
+                    'work_types': work_types_series
+                }
+            }
+
+        # Empreintes des mois de la plage ; les bornes par défaut dépendent
+        # des données : elles font aussi partie de l'ETag
+        months = months_between(start.isoformat(), end.isoformat())
+        versions = [schedule.month_digest(m) for m in months]
+        return conditional_json(make_etag(*versions, start.isoformat(), end.isoformat()), build)
     except Exception as e:
-        print(f"Erreur get_stats: {e}")
+        logger.exception("Erreur get_range_stats: %s", e)
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,33 @@
+import logging
+import os
+from flask import Blueprint, jsonify
+from services.calendar import CalendarService
+from services.data_service import DataService
+
+logger = logging.getLogger(__name__)
+
+system_bp = Blueprint('system', __name__, url_prefix='/api/system')
+
+@system_bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    """Récupérer les compteurs du cache de lecture du worker courant"""
+    try:
+        stats = DataService.get_cache_stats()
+        stats['calendar'] = CalendarService.get_cache_stats()
+        stats['pid'] = os.getpid()
+        return jsonify(stats)
+    except Exception as e:
+        logger.exception("Erreur get_cache_stats: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@system_bp.route('/writes', methods=['GET'])
+def get_write_stats():
+    """Récupérer les compteurs d'écriture (regroupement) du worker courant"""
+    try:
+        stats = DataService.get_write_stats()
+        stats['pid'] = os.getpid()
+        return jsonify(stats)
+    except Exception as e:
+        logger.exception("Erreur get_write_stats: %s", e)
+        return jsonify({'error': str(e)}), 500
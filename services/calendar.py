@@ -0,0 +1,138 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from config import Config
+from services.data_service import DataService
+from services.horses import current_horse
+from services.metrics import CACHE_REQUESTS, timed_json
+
+# La grille affiche 6 semaines complètes, à partir du lundi de la semaine du 1er
+GRID_DAYS = 42
+
+
+class PayloadCache:
+    """Réponses sérialisées par clé, avec éviction LRU.
+
+    Une entrée est valide tant que ses versions (empreintes des données
+    utilisées) sont inchangées : une écriture n'invalide que les clés dont
+    une version change.
+    """
+
+    def __init__(self, max_entries, metric_name='payload'):
+        self.metric_name = metric_name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(self, key, versions, build):
+        """Réponse de `key` si elle a été construite pour `versions`, sinon
+        `build()` -> (versions des données lues, réponse)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result = 'hits'
+            elif entry is None:
+                self.misses += 1
+                result = 'misses'
+            else:
+                self.reloads += 1
+                result = 'reloads'
+        CACHE_REQUESTS.inc(cache=self.metric_name, result=result)
+        if result == 'hits':
+            return entry[1]
+
+        built_versions, body = build()
+        with self._lock:
+            self._entries[key] = (built_versions, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+            }
+
+
+def grid_range(year, month):
+    """Premier et dernier jour de la grille d'un mois"""
+    first = date(year, month, 1)
+    start = first - timedelta(days=first.weekday())
+    return start, start + timedelta(days=GRID_DAYS - 1)
+
+
+def _month_key(day):
+    return day.strftime('%Y-%m')
+
+
+class CalendarService:
+    """Vue mensuelle du calendrier d'un cheval : cavaliers, journées et
+    cavaliers actifs de la grille, statistiques du mois, en une seule réponse
+    mise en cache"""
+
+    _cache = PayloadCache(Config.CALENDAR_CACHE_MONTHS, 'calendar')
+
+    @staticmethod
+    def _versions(assignments, cavaliers, year, month):
+        start, end = grid_range(year, month)
+        months = sorted({_month_key(start), f"{year:04d}-{month:02d}", _month_key(end)})
+        return tuple(assignments.month_digest(m) for m in months) + (cavaliers.digest,)
+
+    @staticmethod
+    def month_versions(year, month):
+        """Versions des données de la vue d'un mois : empreintes des mois
+        couverts par la grille et des cavaliers.
+
+        Lève ValueError si le mois (ou sa grille) sort du calendrier.
+        """
+        return CalendarService._versions(
+            DataService.schedule(), DataService.cavaliers_table(), year, month)
+
+    @staticmethod
+    def month_body(year, month, versions):
+        """JSON sérialisé de la vue d'un mois, depuis le cache si `versions`
+        n'ont pas changé"""
+        def build():
+            start, end = grid_range(year, month)
+            # Journées enregistrées et occurrences des règles de récurrence
+            assignments = DataService.schedule()
+            cavaliers = DataService.cavaliers_table()
+            # Versions et données lues ensemble : l'entrée du cache
+            # correspond exactement à ce qu'elle contient
+            with assignments.lock:
+                built_versions = CalendarService._versions(assignments, cavaliers, year, month)
+                stats, work_types = assignments.stats(f"{year:04d}-{month:02d}")
+                days = assignments.range(start.isoformat(), end.isoformat())
+            payload = {
+                'year': year,
+                'month': month,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'cavaliers': cavaliers.cavaliers,
+                'assignments': days,
+                'active': cavaliers.active_between(start, end),
+                'stats': {'cavalier_stats': stats, 'work_types': work_types},
+            }
+            with timed_json('serialize', 'calendar'):
+                body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            return built_versions, body
+
+        return CalendarService._cache.get((current_horse(), year, month), versions, build)
+
+    @staticmethod
+    def get_cache_stats():
+        return CalendarService._cache.stats()
@@ -0,0 +1,154 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from services.metrics import STORAGE_READ_BYTES, STORAGE_WRITTEN_BYTES, timed_json
+from services.storage import _replace_file
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeLog:
+    """Flux des modifications, numérotées par une version globale croissante.
+
+    Chaque écriture enregistrée ajoute une ligne au fichier JSON-lines partagé
+    par les workers : {"version": N, "dataset": "assignments", "horse": cheval,
+    "changes": {date: entrée|null}} ou {"version": N, "dataset": "cavaliers",
+    "cavaliers": [...]} (une ligne "reset": true quand tout a été remplacé). L'ajout se fait sous
+    verrou fcntl exclusif : la version suivante est lue puis écrite sans que
+    deux workers puissent prendre le même numéro.
+
+    Chaque worker relit la fin du fichier (incrémentalement) dans un tampon
+    circulaire des `buffer_size` dernières modifications. Quand le fichier
+    atteint deux fois cette taille, il est réécrit avec les seules dernières
+    lignes (fichier temporaire renommé) ; les numéros de version continuent.
+    """
+
+    def __init__(self, path, buffer_size, poll_interval=0.5):
+        self.path = path
+        self.lock_file = path + '.lock'
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._ino = None
+        self._offset = 0
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, mode):
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            yield
+        finally:
+            os.close(fd)
+
+    def refresh(self):
+        """Lire les lignes ajoutées depuis le dernier appel ; retourne la version courante"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return self.version
+
+        with f, self._lock:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._ino or st.st_size < self._offset:
+                # Fichier réécrit (ou recréé) : tout relire
+                self._buffer.clear()
+                self._ino, self._offset, self._lines = st.st_ino, 0, 0
+            if st.st_size == self._offset:
+                return self.version
+
+            f.seek(self._offset)
+            tail = f.read()
+            STORAGE_READ_BYTES.inc(len(tail), file=os.path.basename(self.path))
+            for line in tail.splitlines(keepends=True):
+                # Ligne incomplète : un ajout est en cours
+                if not line.endswith(b'\n'):
+                    break
+                self._offset += len(line)
+                self._lines += 1
+                try:
+                    record = json.loads(line)
+                    self._buffer.append(record)
+                    self.version = max(self.version, record['version'])
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning("⚠️ Ligne ignorée (%s): %s", self.path, e)
+            return self.version
+
+    def append(self, dataset, payload):
+        """Enregistrer une modification ; retourne sa version"""
+        with self._locked(fcntl.LOCK_EX):
+            version = self.refresh() + 1
+            record = {'version': version, 'dataset': dataset, **payload}
+            with timed_json('serialize', os.path.basename(self.path)):
+                line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                # Une version perdue au redémarrage serait réattribuée à une autre modification
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            STORAGE_WRITTEN_BYTES.inc(len(line), file=os.path.basename(self.path))
+            self.refresh()
+
+            if self._lines >= 2 * self.buffer_size:
+                self._truncate()
+        return version
+
+    def _truncate(self):
+        # Appelé sous verrou exclusif
+        with self._lock:
+            kept = list(self._buffer)
+        raw = b''.join(
+            json.dumps(r, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            for r in kept
+        )
+        _replace_file(self.path, raw)
+        self.refresh()
+
+    def since(self, version, accept=None):
+        """Modifications postérieures à `version`, dans l'ordre (celles pour
+        lesquelles `accept(modification)` est vrai, si indiqué).
+
+        Retourne (version courante, liste), la liste valant None quand les
+        modifications demandées ne sont plus (ou pas) dans le tampon, ou
+        qu'un remplacement complet est intervenu : il faut alors tout relire.
+        """
+        current = self.refresh()
+        with self._lock:
+            if version == current:
+                return current, []
+            if version > current or not self._buffer or version < self._buffer[0]['version'] - 1:
+                return current, None
+            records = [r for r in self._buffer if r['version'] > version and (accept is None or accept(r))]
+        if any(r.get('reset') for r in records):
+            return current, None
+        return current, records
+
+    def wait(self, version, timeout):
+        """Attendre qu'une version postérieure à `version` soit enregistrée
+        (ou `timeout` secondes) ; retourne la version courante"""
+        deadline = time.monotonic() + timeout
+        current = self.refresh()
+        while current <= version and time.monotonic() < deadline:
+            time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+            current = self.refresh()
+        return current
+
+    def stats(self):
+        self.refresh()
+        with self._lock:
+            return {
+                'version': self.version,
+                'buffered': len(self._buffer),
+                'oldest': self._buffer[0]['version'] if self._buffer else None,
+            }
@@ -0,0 +1,33 @@
+import gzip
+
+try:
+    # Dépendance facultative (pip install brotli) : gzip seul sinon
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encodages proposés, par ordre de préférence
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+# Extension des fichiers précompressés par encodage
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Niveaux pour les réponses (compressées à chaque envoi) et pour les
+# fichiers statiques (compressés une fois, au build)
+RESPONSE_LEVELS = {'br': 4, 'gzip': 6}
+BUILD_LEVELS = {'br': 11, 'gzip': 9}
+
+
+def negotiate(accept_encodings, available=ENCODINGS):
+    """Encodage à utiliser d'après Accept-Encoding (`request.accept_encodings`),
+    ou None pour envoyer le contenu tel quel"""
+    for encoding in available:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, levels=RESPONSE_LEVELS):
+    if encoding == 'br':
+        return brotli.compress(data, quality=levels['br'])
+    # mtime fixe : même contenu, mêmes octets (fichiers du build reproductibles)
+    return gzip.compress(data, compresslevel=levels['gzip'], mtime=0)
@@ -1,142 +1,508 @@
+import copy
 import json
+import logging
 import os
+import threading
+from contextlib import ExitStack, contextmanager
 from config import Config
+from services.changes import ChangeLog
+from services.history import EditHistory
+from services.horses import current_horse, horse_dir, horse_exists, list_horses, write_horse
+from services.indexes import AssignmentTable, CavalierTable, copy_cavaliers
+from services.partitions import partition_key
+from services.recurrence import RecurrenceTable, Schedule, add_exceptions
+from services.storage import create_storage
+from services.write_coordinator import WriteCoordinator, WriteRejected
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAVALIERS = [
+    {"id": 1, "name": "Alice", "color": "#FF6B6B", "active_from": "2020-01-01"},
+    {"id": 2, "name": "Bob", "color": "#4ECDC4", "active_from": "2021-06-15"},
+    {"id": 3, "name": "Charlie", "color": "#45B7D1", "active_from": "2022-03-10"}
+]
+
+
+def _apply_cavaliers_mutation(cavaliers, mutation):
+    # Travailler sur une copie : une modification refusée ne touche pas l'état
+    working = copy_cavaliers(cavaliers)
+    mutation(working)
+    cavaliers[:] = working
+    return copy_cavaliers(working)
+
+
+def _apply_recurrences_mutation(recurrences, mutation):
+    # Comme les cavaliers ; les règles contiennent des listes : copie profonde
+    working = copy.deepcopy(recurrences)
+    mutation(working)
+    recurrences[:] = working
+    return copy.deepcopy(working)
+
+
+def _merge_assignment_changes(pending, changes):
+    pending.update(changes)
+
+
+class _HorseData:
+    """Stockage d'un cheval et ses chemins d'écriture : un pour les règles
+    de récurrence, un par partition des assignments (créé à la première
+    écriture), chacun avec son propre verrou. Les modifications des
+    assignments sont aussi ajoutées à l'historique du cheval, sous ce verrou."""
+
+    def __init__(self, horse, storage, changes):
+        self.horse = horse
+        self.storage = storage
+        self.changes = changes
+        self.history = EditHistory(os.path.join(horse_dir(Config, horse), 'history'), Config.HISTORY_CHECKPOINT_BYTES)
+        self.coordinators = {
+            'recurrences': WriteCoordinator(
+                storage.write_lock_file('recurrences'),
+                storage.read_recurrences, _apply_recurrences_mutation, storage.write_recurrences,
+                lambda recurrences: changes.append('recurrences', {'horse': horse, 'recurrences': recurrences})
+            ),
+        }
+        self._lock = threading.Lock()
+
+    def assignments(self, partition):
+        """Coordinateur des écritures d'une partition"""
+        name = 'assignments' if partition is None else f"assignments/{partition}"
+        with self._lock:
+            coordinator = self.coordinators.get(name)
+            if coordinator is None:
+                coordinator = self.coordinators[name] = WriteCoordinator(
+                    self.storage.write_lock_file('assignments', partition),
+                    dict, _merge_assignment_changes, self.save_assignments,
+                    lambda merged: self.changes.append('assignments', {'horse': self.horse, 'changes': merged}),
+                    Config.DURABILITY, Config.FLUSH_INTERVAL
+                )
+            return coordinator
+
+    def flush(self):
+        """Enregistrer les écritures différées de ce worker (voir Config.DURABILITY)"""
+        with self._lock:
+            coordinators = list(self.coordinators.values())
+        for coordinator in coordinators:
+            coordinator.flush()
+
+    def _year(self, year):
+        # État d'une année avant sa première modification historisée
+        return self.storage.read_assignments_range(f"{year}-01-01", f"{year}-12-31")
+
+    def _historize(self, changes, persist):
+        # Un échec de l'historique n'annule pas l'enregistrement
+        try:
+            self.history.begin(changes, self._year)
+        except Exception as e:
+            logger.warning("⚠️ Point de reprise de l'historique non écrit (%s): %s", self.horse, e)
+        persist()
+        try:
+            self.history.record(changes)
+        except Exception as e:
+            logger.warning("⚠️ Modification enregistrée mais non historisée (%s): %s", self.horse, e)
+
+    def save_assignments(self, changes):
+        """Enregistrer des modifications {date: entrée|None} et les ajouter à
+        l'historique (appelé sous le verrou de leur partition)"""
+        self._historize(changes, lambda: self.storage.save_assignments(changes))
+
+    def write_assignments(self, assignments):
+        """Remplacer tous les assignments (appelé sous le verrou de toutes les
+        partitions) ; l'historique ne reçoit que les dates qui changent"""
+        current = self.storage.read_assignments()
+        changes = {date: None for date in current if date not in assignments}
+        changes.update((date, entry) for date, entry in assignments.items() if current.get(date) != entry)
+        self._historize(changes, lambda: self.storage.write_assignments(assignments))
+
+    @contextmanager
+    def exclusive(self, partitions):
+        """Verrous des partitions, pris dans l'ordre (pas d'interblocage entre workers)"""
+        with ExitStack() as stack:
+            for partition in sorted(partitions):
+                stack.enter_context(self.assignments(partition).exclusive())
+            yield
+
 
 class DataService:
-    """Service pour gérer la lecture/écriture des fichiers JSON"""
+    """Service pour gérer la lecture/écriture des données.
+
+    Les accès passent par le moteur de stockage choisi dans `Config`
+    (fichiers JSON ou SQLite), voir `services/storage.py`, un par cheval :
+    celui de la requête en cours (`services/horses.py`), sauf pour les
+    cavaliers, partagés par l'écurie et lus dans le stockage du cheval par
+    défaut. Les écritures passent par un `WriteCoordinator` par jeu de
+    données (et par année pour les assignments).
+    """
+
+    _horses = None
+    _cavaliers = None
+    _changes = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _horse(horse=None):
+        """Stockage et coordinateurs d'un cheval (créés au premier appel)"""
+        horse = horse or current_horse()
+        with DataService._lock:
+            if DataService._horses is None:
+                changes = ChangeLog(Config.CHANGES_LOG_FILE, Config.CHANGES_BUFFER_SIZE)
+                stable = create_storage(Config, Config.DEFAULT_HORSE)
+                DataService._cavaliers = WriteCoordinator(
+                    stable.write_lock_file('cavaliers'),
+                    stable.read_cavaliers, _apply_cavaliers_mutation, stable.write_cavaliers,
+                    lambda cavaliers: changes.append('cavaliers', {'cavaliers': cavaliers})
+                )
+                DataService._changes = changes
+                DataService._horses = {Config.DEFAULT_HORSE: _HorseData(Config.DEFAULT_HORSE, stable, changes)}
+
+            data = DataService._horses.get(horse)
+            if data is None:
+                data = DataService._horses[horse] = _HorseData(
+                    horse, create_storage(Config, horse), DataService._changes)
+            return data
+
+    @staticmethod
+    def storage(horse=None):
+        """Moteur de stockage du cheval (créé au premier appel dans le worker)"""
+        return DataService._horse(horse).storage
+
+    @staticmethod
+    def _assignments(horse=None):
+        # Une lecture voit les écritures différées du worker : elles sont
+        # d'abord enregistrées
+        data = DataService._horse(horse)
+        if Config.DURABILITY != 'sync':
+            data.flush()
+        return data
+
+    @staticmethod
+    def flush():
+        """Enregistrer les écritures différées de tous les chevaux (arrêt du worker)"""
+        with DataService._lock:
+            horses = list(DataService._horses.values()) if DataService._horses else []
+        for data in horses:
+            data.flush()
+
+    @staticmethod
+    def _stable():
+        # Stockage des cavaliers
+        return DataService.storage(Config.DEFAULT_HORSE)
 
     @staticmethod
     def init_files():
-        """Initialiser les fichiers de données s'ils n'existent pas"""
-
-        # Créer cavaliers.json avec des données par défaut si nécessaire
-        if not os.path.exists(Config.CAVALIERS_FILE):
-            default_cavaliers = [
-                {"name": "Alice", "color": "#FF6B6B", "active_from": "2020-01-01"},
-                {"name": "Bob", "color": "#4ECDC4", "active_from": "2021-06-15"},
-                {"name": "Charlie", "color": "#45B7D1", "active_from": "2022-03-10"}
-            ]
-            with open(Config.CAVALIERS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(default_cavaliers, f, ensure_ascii=False, indent=2)
-            print(f"✅ Fichier créé : {Config.CAVALIERS_FILE}")
-
-        # Créer assignments.json vide
-        if not os.path.exists(Config.ASSIGNMENTS_FILE):
-            with open(Config.ASSIGNMENTS_FILE, 'w', encoding='utf-8') as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
-            print(f"✅ Fichier créé : {Config.ASSIGNMENTS_FILE}")
+        """Initialiser les fichiers de données s'ils n'existent pas (et convertir
+        les noms de cavaliers des journées en identifiants), pour chaque cheval"""
+        if not horse_exists(Config, Config.DEFAULT_HORSE):
+            write_horse(Config, Config.DEFAULT_HORSE, Config.DEFAULT_HORSE_NAME)
+        # Le cheval par défaut d'abord : il crée les cavaliers par défaut
+        DataService._initialize(Config.DEFAULT_HORSE)
+        for horse in DataService.horses():
+            if horse['id'] != Config.DEFAULT_HORSE:
+                DataService._initialize(horse['id'])
 
         # Vérifier les permissions (important pour PythonAnywhere)
         try:
             # Tester l'écriture
             DataService.read_cavaliers()
             DataService.read_assignments()
-            print(f"✅ Permissions fichiers OK")
+            logger.info("✅ Permissions fichiers OK (%s)", DataService._stable().name)
         except Exception as e:
-            print(f"⚠️ Problème de permissions : {e}")
+            logger.warning("⚠️ Problème de permissions : %s", e)
 
     @staticmethod
-    def read_cavaliers():
-        """Lire le fichier cavaliers.json"""
+    def _initialize(horse):
+        data = DataService._horse(horse)
+        default_cavaliers = DEFAULT_CAVALIERS if horse == Config.DEFAULT_HORSE else []
+        with DataService._cavaliers.exclusive(), \
+                data.coordinators['recurrences'].exclusive(), \
+                data.exclusive(data.storage.partition_keys()):
+            if data.storage.initialize(default_cavaliers):
+                DataService._changes.append('cavaliers', {'reset': True})
+
+    @staticmethod
+    def horses():
+        """Chevaux de l'écurie [{id, name}], triés par identifiant"""
+        return list_horses(Config)
+
+    @staticmethod
+    def horse_exists(horse):
+        return horse_exists(Config, horse)
+
+    @staticmethod
+    def create_horse(horse, name):
+        """Enregistrer un cheval et créer ses fichiers.
+
+        Lève WriteRejected (409) si l'identifiant est déjà pris.
+        """
+        os.makedirs(Config.HORSES_DIR, exist_ok=True)
         try:
-            if not os.path.exists(Config.CAVALIERS_FILE):
-                print(f"⚠️ Fichier non trouvé : {Config.CAVALIERS_FILE}")
-                return []
+            # Création du dossier atomique : un seul worker l'obtient
+            os.mkdir(horse_dir(Config, horse))
+        except FileExistsError:
+            raise WriteRejected(f'Le cheval {horse} existe déjà', 409)
+        DataService._horse(horse)
+        DataService._initialize(horse)
+        entry = write_horse(Config, horse, name)
+        logger.info("✅ Cheval créé : %s", horse)
+        return entry
 
-            with open(Config.CAVALIERS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
+    @staticmethod
+    def read_cavaliers():
+        """Lire la liste des cavaliers (via le cache du worker)"""
+        try:
+            return DataService._stable().read_cavaliers()
         except json.JSONDecodeError as e:
-            print(f"❌ Erreur JSON cavaliers: {e}")
+            logger.error("❌ Erreur JSON cavaliers: %s", e)
             return []
         except Exception as e:
-            print(f"❌ Erreur lecture cavaliers: {e}")
+            logger.exception("❌ Erreur lecture cavaliers: %s", e)
             return []
 
+    @staticmethod
+    def cavaliers_table():
+        """Table des cavaliers en cache et son index d'activité (ne pas modifier)"""
+        try:
+            return DataService._stable().cavaliers_table()
+        except Exception as e:
+            logger.exception("❌ Erreur lecture cavaliers: %s", e)
+            return CavalierTable([])
+
+    @staticmethod
+    def update_cavaliers(mutation):
+        """Modifier la liste des cavaliers, relue sous verrou.
+
+        `mutation(cavaliers)` modifie la liste en place, ou lève WriteRejected
+        pour refuser la modification (l'exception est propagée).
+        Retourne la liste enregistrée, ou None si l'enregistrement a échoué.
+        """
+        try:
+            DataService._horse()
+            cavaliers = DataService._cavaliers.submit(mutation)
+        except WriteRejected:
+            raise
+        except Exception as e:
+            logger.exception("❌ Erreur écriture cavaliers: %s", e)
+            return None
+
+        logger.debug("✅ Cavaliers sauvegardés : %d entrées", len(cavaliers))
+        return cavaliers
+
     @staticmethod
     def write_cavaliers(cavaliers):
-        """Écrire dans le fichier cavaliers.json"""
+        """Remplacer la liste des cavaliers"""
+        def replace(current):
+            current[:] = cavaliers
+        return DataService.update_cavaliers(replace) is not None
+
+    @staticmethod
+    def recurrences_table(horse=None):
+        """Règles de récurrence en cache (ne pas modifier)"""
         try:
-            # Créer le dossier parent si nécessaire
-            os.makedirs(os.path.dirname(Config.CAVALIERS_FILE), exist_ok=True)
-
-            # Écrire avec permissions explicites
-            with open(Config.CAVALIERS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(cavaliers, f, ensure_ascii=False, indent=2)
-
-            # Vérifier que l'écriture a réussi
-            if os.path.exists(Config.CAVALIERS_FILE):
-                print(f"✅ Cavaliers sauvegardés : {len(cavaliers)} entrées")
-                return True
-            else:
-                print(f"❌ Échec sauvegarde cavaliers")
-                return False
+            return DataService.storage(horse).recurrences_table()
+        except Exception as e:
+            logger.exception("❌ Erreur lecture récurrences: %s", e)
+            return RecurrenceTable([])
+
+    @staticmethod
+    def read_recurrences():
+        """Lire la liste des règles de récurrence"""
+        return DataService.recurrences_table().copy()
+
+    @staticmethod
+    def update_recurrences(mutation):
+        """Modifier la liste des règles, relue sous verrou (comme `update_cavaliers`).
 
+        Retourne la liste enregistrée, ou None si l'enregistrement a échoué.
+        """
+        try:
+            recurrences = DataService._horse().coordinators['recurrences'].submit(mutation)
+        except WriteRejected:
+            raise
         except Exception as e:
-            print(f"❌ Erreur écriture cavaliers: {e}")
-            return False
+            logger.exception("❌ Erreur écriture récurrences: %s", e)
+            return None
+
+        logger.debug("✅ Récurrences sauvegardées : %d règles", len(recurrences))
+        return recurrences
+
+    @staticmethod
+    def schedule(horse=None):
+        """Journées effectives : table des assignments et occurrences des
+        règles de récurrence (calendrier, statistiques, exports)"""
+        return Schedule(DataService.assignments_table(horse), DataService.recurrences_table(horse))
 
     @staticmethod
     def read_assignments():
-        """Lire le fichier assignments.json"""
+        """Lire tous les assignments (via le cache du worker)"""
         try:
-            if not os.path.exists(Config.ASSIGNMENTS_FILE):
-                print(f"⚠️ Fichier non trouvé : {Config.ASSIGNMENTS_FILE}")
-                return {}
-
-            with open(Config.ASSIGNMENTS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data if isinstance(data, dict) else {}
+            return DataService._assignments().storage.read_assignments()
         except json.JSONDecodeError as e:
-            print(f"❌ Erreur JSON assignments: {e}")
+            logger.error("❌ Erreur JSON assignments: %s", e)
             return {}
         except Exception as e:
-            print(f"❌ Erreur lecture assignments: {e}")
+            logger.exception("❌ Erreur lecture assignments: %s", e)
+            return {}
+
+    @staticmethod
+    def assignments_table(horse=None):
+        """Table des assignments en cache et ses index (ne pas modifier)"""
+        try:
+            return DataService._assignments(horse).storage.assignments_table()
+        except Exception as e:
+            logger.exception("❌ Erreur lecture assignments: %s", e)
+            return AssignmentTable()
+
+    @staticmethod
+    def read_assignments_range(start, end):
+        """Lire les assignments entre deux dates incluses (bornes optionnelles)"""
+        try:
+            return DataService._assignments().storage.read_assignments_range(start, end)
+        except Exception as e:
+            logger.exception("❌ Erreur lecture assignments: %s", e)
             return {}
 
     @staticmethod
     def write_assignments(assignments):
-        """Écrire dans le fichier assignments.json"""
+        """Remplacer tous les assignments"""
         try:
-            # Créer le dossier parent si nécessaire
-            os.makedirs(os.path.dirname(Config.ASSIGNMENTS_FILE), exist_ok=True)
-
-            # Écrire avec permissions explicites
-            with open(Config.ASSIGNMENTS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(assignments, f, ensure_ascii=False, indent=2)
-
-            # Vérifier que l'écriture a réussi
-            if os.path.exists(Config.ASSIGNMENTS_FILE):
-                print(f"✅ Assignments sauvegardés : {len(assignments)} dates")
-                return True
-            else:
-                print(f"❌ Échec sauvegarde assignments")
-                return False
+            data = DataService._horse()
+            # Les écritures différées précèdent le remplacement
+            data.flush()
+            partitions = set(data.storage.partition_keys()) | {data.storage.partition(d) for d in assignments}
+            with data.exclusive(partitions):
+                data.write_assignments(assignments)
+                DataService._changes.append('assignments', {'horse': data.horse, 'reset': True})
+            logger.info("✅ Assignments sauvegardés : %d dates", len(assignments))
+            return True
+        except Exception as e:
+            logger.exception("❌ Erreur écriture assignments: %s", e)
+            return False
+
+    @staticmethod
+    def assignments_as_of(as_of, start=None, end=None):
+        """Assignments tels qu'ils étaient à l'instant `as_of` (secondes depuis
+        l'epoch), entre deux dates incluses (bornes optionnelles).
+
+        Chaque année modifiée depuis le début de l'historique est reconstruite
+        depuis son point de reprise le plus proche ; les autres sont lues telles
+        quelles. Avant le début de l'historique : l'état le plus ancien connu.
+        """
+        history = DataService._assignments().history
+        assignments = {}
+        rebuilt = set()
+        for year in history.years():
+            if (start and year < start[:4]) or (end and year > end[:4]):
+                continue
+            state = history.state(year, as_of)
+            if state is None:
+                continue
+            rebuilt.add(year)
+            assignments.update(
+                (date, entry) for date, entry in state.items()
+                if (not start or date >= start) and (not end or date <= end)
+            )
+        for date, entry in DataService.read_assignments_range(start, end).items():
+            if partition_key(date) not in rebuilt:
+                assignments[date] = entry
+        return dict(sorted(assignments.items()))
+
+    @staticmethod
+    def assignment_history(date, limit):
+        """Valeurs successives d'une journée, de la plus récente à la plus
+        ancienne [(ts en millisecondes, entrée|None)]"""
+        return DataService._assignments().history.entries(date, limit)
+
+    @staticmethod
+    def save_assignment(date, entry):
+        """Enregistrer une seule journée (`entry` à None pour la supprimer)"""
+        return DataService.save_assignments({date: entry})
+
+    @staticmethod
+    def save_assignments(changes):
+        """Enregistrer plusieurs journées {date: entrée ou None} en une seule écriture.
 
+        Les sauvegardes concurrentes du worker sont regroupées en un seul
+        enregistrement (la dernière arrivée l'emporte pour une même date).
+        Selon Config.DURABILITY, l'enregistrement peut être différé ; une
+        lecture du même worker le voit toujours.
+        Chaque partition (année) est écrite sous son seul verrou : un lot qui
+        couvre plusieurs années est enregistré année par année. Une journée
+        supprimée qu'une règle de récurrence remplit devient une exception de
+        cette règle.
+        """
+        if not changes:
+            return True
+        try:
+            data = DataService._horse()
+            partitions = {}
+            for date, entry in changes.items():
+                partitions.setdefault(data.storage.partition(date), {})[date] = entry
+            # Toutes les partitions en file avant d'attendre (écritures différées)
+            tickets = [(data.assignments(p), data.assignments(p).enqueue(partitions[p])) for p in sorted(partitions)]
+            for coordinator, ticket in tickets:
+                coordinator.result(ticket)
         except Exception as e:
-            print(f"❌ Erreur écriture assignments: {e}")
+            logger.exception("❌ Erreur écriture assignments (%d dates): %s", len(changes), e)
             return False
 
+        # Journée vidée qu'une règle de récurrence remplit : sans exception
+        # ajoutée à la règle, son occurrence réapparaîtrait
+        cleared = DataService.recurrences_table().covering(
+            [date for date, entry in changes.items() if entry is None])
+        if cleared:
+            recurrences = DataService.update_recurrences(lambda recurrences: add_exceptions(recurrences, cleared))
+            if recurrences is None:
+                return False
+            logger.debug("✅ Exceptions ajoutées aux récurrences : %s", cleared)
+        return True
+
+    @staticmethod
+    def changes():
+        """Flux des modifications (`ChangeLog`) partagé par les workers et les chevaux"""
+        DataService._horse()
+        return DataService._changes
+
+    @staticmethod
+    def data_version(dataset):
+        """Empreinte du contenu de 'cavaliers', 'recurrences' ou 'assignments'
+        (ETag des lectures).
+
+        Identique pour un même contenu dans tous les workers ; à lire avant
+        les données pour qu'une réponse ne soit jamais plus ancienne que son ETag.
+        """
+        if dataset == 'cavaliers':
+            return DataService.cavaliers_table().digest
+        if dataset == 'recurrences':
+            return DataService.recurrences_table().digest
+        return DataService.assignments_table().digest
+
+    @staticmethod
+    def get_cache_stats():
+        """Compteurs du cache de lecture de ce worker pour le cheval (monitoring)"""
+        data = DataService._horse()
+        stats = data.storage.cache_stats()
+        stats['backend'] = data.storage.name
+        stats['horse'] = data.horse
+        return stats
+
+    @staticmethod
+    def get_write_stats():
+        """Enregistrements et écritures regroupées de ce worker pour le cheval (monitoring)"""
+        data = DataService._horse()
+        with data._lock:
+            stats = {dataset: c.stats() for dataset, c in data.coordinators.items()}
+        stats['cavaliers'] = DataService._cavaliers.stats()
+        stats['changes'] = DataService._changes.stats()
+        stats['history'] = data.history.stats()
+        stats['horse'] = data.horse
+        return stats
+
     @staticmethod
     def get_file_info():
         """Obtenir des informations sur les fichiers (debug)"""
-        info = {
-            'cavaliers': {
-                'exists': os.path.exists(Config.CAVALIERS_FILE),
-                'path': Config.CAVALIERS_FILE,
-                'readable': os.access(Config.CAVALIERS_FILE, os.R_OK) if os.path.exists(Config.CAVALIERS_FILE) else False,
-                'writable': os.access(Config.CAVALIERS_FILE, os.W_OK) if os.path.exists(Config.CAVALIERS_FILE) else False,
-            },
-            'assignments': {
-                'exists': os.path.exists(Config.ASSIGNMENTS_FILE),
-                'path': Config.ASSIGNMENTS_FILE,
-                'readable': os.access(Config.ASSIGNMENTS_FILE, os.R_OK) if os.path.exists(Config.ASSIGNMENTS_FILE) else False,
-                'writable': os.access(Config.ASSIGNMENTS_FILE, os.W_OK) if os.path.exists(Config.ASSIGNMENTS_FILE) else False,
-            },
-            'data_dir': {
-                'exists': os.path.exists(Config.DATA_DIR),
-                'path': Config.DATA_DIR,
-                'writable': os.access(Config.DATA_DIR, os.W_OK) if os.path.exists(Config.DATA_DIR) else False,
-            }
+        info = DataService.storage().file_info()
+        info['data_dir'] = {
+            'exists': os.path.exists(Config.DATA_DIR),
+            'path': Config.DATA_DIR,
+            'writable': os.access(Config.DATA_DIR, os.W_OK) if os.path.exists(Config.DATA_DIR) else False,
         }
         return info
@@ -0,0 +1,137 @@
+import csv
+import io
+from datetime import date, datetime, timedelta, timezone
+
+# Libellés affichés par l'interface (static/script.js)
+WORK_TYPE_LABELS = {
+    'longe': 'Longe',
+    'liberte': 'Liberté',
+    'repos': 'Repos',
+    'plat': 'Dressage',
+    'cso': 'CSO',
+    'balade': 'Balade',
+    'tap': 'TAP',
+}
+
+CSV_COLUMNS = ['date', 'work_type', 'cavaliers', 'cavalier_ids', 'comment']
+# Lignes CSV / événements regroupés par morceau envoyé
+BATCH_ROWS = 256
+ICS_PRODID = '-//horse-calendar//Planning//FR'
+# RFC 5545 : lignes de 75 octets au plus, suite précédée d'une espace
+ICS_LINE_OCTETS = 75
+
+
+def work_type_label(work_type):
+    return WORK_TYPE_LABELS.get(work_type, work_type)
+
+
+def _rider_names(ids, riders):
+    return [riders[i]['name'] if i in riders else f'#{i}' for i in ids]
+
+
+def _ics_text(value):
+    """Échapper un texte iCalendar (TEXT, RFC 5545 3.3.11)"""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_fold(line):
+    """Ligne iCalendar terminée par CRLF, repliée sans couper un caractère UTF-8"""
+    raw = line.encode('utf-8')
+    if len(raw) <= ICS_LINE_OCTETS:
+        return line + '\r\n'
+    parts, start, limit = [], 0, ICS_LINE_OCTETS
+    while len(raw) - start > limit:
+        end = start + limit
+        while raw[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode('utf-8'))
+        # La suite commence par une espace : un octet de moins
+        start, limit = end, ICS_LINE_OCTETS - 1
+    parts.append(raw[start:].decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+class ExportService:
+    """Exports CSV et iCalendar des journées, produits par morceaux.
+
+    Les générateurs parcourent la table triée un mois à la fois
+    (`AssignmentTable.iter_items`) : la mémoire utilisée ne dépend pas de la
+    longueur de l'historique et le premier morceau part immédiatement.
+    """
+
+    @staticmethod
+    def _entries(table, start, end, cavalier_id):
+        for date_str, entry in table.iter_items(start, end):
+            if cavalier_id is None or cavalier_id in entry.cavaliers:
+                yield date_str, entry
+
+    @staticmethod
+    def csv_chunks(table, riders, start=None, end=None, cavalier_id=None):
+        """Lignes CSV (en-tête compris), par paquets de BATCH_ROWS.
+
+        `riders` : {identifiant: cavalier} pour les noms."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\r\n')
+        writer.writerow(CSV_COLUMNS)
+        rows = 0
+        for date_str, entry in ExportService._entries(table, start, end, cavalier_id):
+            writer.writerow([
+                date_str,
+                entry.work_type,
+                ';'.join(_rider_names(entry.cavaliers, riders)),
+                ';'.join(str(i) for i in entry.cavaliers),
+                entry.comment,
+            ])
+            rows += 1
+            if rows % BATCH_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    @staticmethod
+    def ics_chunks(table, riders, start=None, end=None, cavalier_id=None):
+        """Calendrier iCalendar : un événement « journée entière » par date.
+
+        Pour un cavalier, le résumé ne reprend que le type de travail."""
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        name = 'Planning'
+        if cavalier_id is not None:
+            name += ' - ' + _rider_names([cavalier_id], riders)[0]
+
+        yield ''.join(_ics_fold(line) for line in [
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            f'PRODID:{ICS_PRODID}',
+            'CALSCALE:GREGORIAN',
+            f'X-WR-CALNAME:{_ics_text(name)}',
+        ])
+
+        suffix = f'-{cavalier_id}' if cavalier_id is not None else ''
+        events = []
+        for date_str, entry in ExportService._entries(table, start, end, cavalier_id):
+            day = date.fromisoformat(date_str)
+            summary = work_type_label(entry.work_type) or 'Séance'
+            if cavalier_id is None and entry.cavaliers:
+                summary += ' : ' + ', '.join(_rider_names(entry.cavaliers, riders))
+
+            lines = [
+                'BEGIN:VEVENT',
+                f'UID:{date_str}{suffix}@horse-calendar',
+                f'DTSTAMP:{stamp}',
+                f'DTSTART;VALUE=DATE:{day:%Y%m%d}',
+                f'DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}',
+                f'SUMMARY:{_ics_text(summary)}',
+            ]
+            if entry.comment:
+                lines.append(f'DESCRIPTION:{_ics_text(entry.comment)}')
+            lines.append('TRANSP:TRANSPARENT')
+            lines.append('END:VEVENT')
+            events.append(''.join(_ics_fold(line) for line in lines))
+            if len(events) == BATCH_ROWS:
+                yield ''.join(events)
+                events = []
+
+        events.append(_ics_fold('END:VCALENDAR'))
+        yield ''.join(events)
@@ -0,0 +1,241 @@
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from services.metrics import STORAGE_READ_BYTES, STORAGE_WRITTEN_BYTES, timed_json
+from services.partitions import partition_key, split_by_partition
+from services.storage import _journal_record, _read_file, _replace_file
+
+logger = logging.getLogger(__name__)
+
+
+def parse_timestamp(value):
+    """Instant de ?as_of= en secondes depuis l'epoch : nombre de secondes, ou
+    date/heure ISO 8601 (heure locale sans fuseau). Lève ValueError."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = datetime.fromisoformat(value).timestamp()
+    if not math.isfinite(seconds):
+        raise ValueError(f"Instant invalide : {value}")
+    return seconds
+
+
+def format_timestamp(ts_ms):
+    """Date/heure ISO 8601 locale d'un instant de l'historique (millisecondes)"""
+    return datetime.fromtimestamp(ts_ms / 1000).astimezone().isoformat(timespec='milliseconds')
+
+
+def _record_changes(record):
+    """{date: entrée|None} d'une ligne au format du journal"""
+    op = record.get('op')
+    if op == 'put':
+        return {record['date']: record['entry']}
+    if op == 'del':
+        return {record['date']: None}
+    return record.get('changes') or {}
+
+
+def _apply(state, record):
+    for date, entry in _record_changes(record).items():
+        if entry is None:
+            state.pop(date, None)
+        else:
+            state[date] = entry
+
+
+class EditHistory:
+    """Historique des modifications des assignments d'un cheval, en ajout seul.
+
+    Chaque enregistrement ajoute une ligne au fichier de son année
+    (<année>.jsonl) : {"ts": millisecondes, "op": ...} au format du journal
+    (`_journal_record`), avec les seules dates modifiées. Un point de reprise
+    (<année>/<position>-<ts>.json : état complet de l'année à cette position
+    du fichier) est écrit avant la première modification de l'année, puis dès
+    que les lignes ajoutées depuis le dernier dépassent `checkpoint_bytes` ou
+    la taille de ce point de reprise (les points de reprise pèsent donc au
+    plus autant que les modifications). Retrouver un état passé ne relit
+    qu'un point de reprise et les lignes qui le suivent, quelle que soit la
+    longueur de l'historique.
+
+    Les ajouts se font sous le verrou d'écriture de l'année (voir
+    `DataService`) ; les lectures n'en prennent pas : une ligne incomplète
+    (ajout en cours) est ignorée.
+    """
+
+    HISTORY_FILE = re.compile(r'^(\d{4})\.jsonl$')
+    CHECKPOINT_FILE = re.compile(r'^(\d{12})-(\d+)\.json$')
+
+    def __init__(self, directory, checkpoint_bytes):
+        self.directory = directory
+        self.checkpoint_bytes = checkpoint_bytes
+        self.records = 0
+        self.checkpoints_written = 0
+        # Dernier point de reprise connu de chaque année : (position, ts, taille)
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def _file(self, year):
+        return os.path.join(self.directory, f"{year}.jsonl")
+
+    def _checkpoint_file(self, year, offset, ts):
+        return os.path.join(self.directory, year, f"{offset:012d}-{ts}.json")
+
+    def years(self):
+        """Années ayant un historique, triées"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(m.group(1) for m in map(self.HISTORY_FILE.match, names) if m)
+
+    def checkpoints(self, year):
+        """Points de reprise de l'année [(position, ts)], dans l'ordre"""
+        try:
+            names = os.listdir(os.path.join(self.directory, year))
+        except FileNotFoundError:
+            return []
+        return sorted((int(m.group(1)), int(m.group(2))) for m in map(self.CHECKPOINT_FILE.match, names) if m)
+
+    def _read_checkpoint(self, year, offset, ts):
+        raw = _read_file(self._checkpoint_file(year, offset, ts))
+        with timed_json('parse', f"{year}.checkpoint"):
+            return json.loads(raw)
+
+    def _write_checkpoint(self, year, offset, ts, state):
+        with timed_json('serialize', f"{year}.checkpoint"):
+            raw = json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        path = self._checkpoint_file(year, offset, ts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _replace_file(path, raw)
+        with self._lock:
+            self._last[year] = (offset, ts, len(raw))
+            self.checkpoints_written += 1
+
+    def _last_checkpoint(self, year):
+        with self._lock:
+            last = self._last.get(year)
+        if last is None:
+            checkpoints = self.checkpoints(year)
+            if checkpoints:
+                offset, ts = checkpoints[-1]
+                last = (offset, ts, os.path.getsize(self._checkpoint_file(year, offset, ts)))
+                with self._lock:
+                    self._last[year] = last
+        return last
+
+    def _records(self, year, start, end=None):
+        """Lignes de l'année entre deux positions du fichier"""
+        path = self._file(year)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(start)
+            raw = f.read() if end is None else f.read(end - start)
+        STORAGE_READ_BYTES.inc(len(raw), file=os.path.basename(path))
+
+        for line in raw.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                logger.warning("⚠️ Ligne d'historique ignorée (%s): %s", path, e)
+
+    def begin(self, changes, baseline):
+        """Écrire le point de reprise initial des années de `changes` qui n'en
+        ont pas encore ; `baseline(année)` : état de l'année avant la modification"""
+        for year in sorted(split_by_partition(changes)):
+            if self._last_checkpoint(year) is None:
+                try:
+                    offset = os.path.getsize(self._file(year))
+                except FileNotFoundError:
+                    offset = 0
+                self._write_checkpoint(year, offset, round(time.time() * 1000), baseline(year))
+
+    def record(self, changes):
+        """Ajouter une modification {date: entrée|None} (une ligne par année)"""
+        ts = round(time.time() * 1000)
+        os.makedirs(self.directory, exist_ok=True)
+        for year, part in sorted(split_by_partition(changes).items()):
+            path = self._file(year)
+            line = json.dumps({'ts': ts, **_journal_record(part)}, ensure_ascii=False,
+                              separators=(',', ':')).encode('utf-8') + b'\n'
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            STORAGE_WRITTEN_BYTES.inc(len(line), file=os.path.basename(path))
+            with self._lock:
+                self.records += 1
+
+            last = self._last_checkpoint(year)
+            if last is not None and size - last[0] >= max(self.checkpoint_bytes, last[2]):
+                # Un autre worker a pu en écrire un depuis : relire le dossier
+                with self._lock:
+                    self._last.pop(year, None)
+                last = self._last_checkpoint(year)
+            if last is not None and size - last[0] >= max(self.checkpoint_bytes, last[2]):
+                # Point de reprise suivant : le précédent et les lignes qui le suivent
+                state = self._read_checkpoint(year, last[0], last[1])
+                for record in self._records(year, last[0], size):
+                    _apply(state, record)
+                self._write_checkpoint(year, size, ts, state)
+
+    def state(self, year, as_of):
+        """État de l'année à l'instant `as_of` (secondes depuis l'epoch), ou None
+        sans historique. Avant le premier point de reprise : l'état le plus
+        ancien connu."""
+        checkpoints = self.checkpoints(year)
+        if not checkpoints:
+            return None
+        as_of_ms = as_of * 1000
+        i = max(bisect.bisect_right([ts for _, ts in checkpoints], as_of_ms) - 1, 0)
+        offset, ts = checkpoints[i]
+        end = checkpoints[i + 1][0] if i + 1 < len(checkpoints) else None
+
+        state = self._read_checkpoint(year, offset, ts)
+        for record in self._records(year, offset, end):
+            if record['ts'] <= as_of_ms:
+                _apply(state, record)
+        return state
+
+    def entries(self, date, limit):
+        """Valeurs successives d'une date, de la plus récente à la plus
+        ancienne [(ts, entrée|None)] ; l'historique est relu par segments
+        (d'un point de reprise au suivant) jusqu'à en avoir `limit`. La plus
+        ancienne est la valeur au début de l'historique, si la date en avait une."""
+        year = partition_key(date)
+        checkpoints = self.checkpoints(year)
+        ends = [offset for offset, _ in checkpoints[1:]] + [None]
+        result = []
+        for (offset, _), end in reversed(list(zip(checkpoints, ends))):
+            segment = []
+            for record in self._records(year, offset, end):
+                changes = _record_changes(record)
+                if date in changes:
+                    segment.append((record['ts'], changes[date]))
+            result.extend(reversed(segment))
+            if len(result) >= limit:
+                return result[:limit]
+
+        if checkpoints:
+            offset, ts = checkpoints[0]
+            initial = self._read_checkpoint(year, offset, ts).get(date)
+            if initial is not None:
+                result.append((ts, initial))
+        return result[:limit]
+
+    def stats(self):
+        with self._lock:
+            return {'records': self.records, 'checkpoints_written': self.checkpoints_written}
@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import Config
+from services.storage import _replace_file
+
+logger = logging.getLogger(__name__)
+
+# Description d'un cheval dans son dossier : {"id": ..., "name": ...}
+HORSE_FILE = 'horse.json'
+
+# Cheval des accès aux données en cours (choisi par la route, voir
+# routes/horses.py) ; None : Config.DEFAULT_HORSE
+_current = ContextVar('horse', default=None)
+
+
+def current_horse():
+    """Cheval des accès en cours"""
+    return _current.get() or Config.DEFAULT_HORSE
+
+
+def select_horse(horse):
+    """Choisir le cheval des accès suivants du thread (None : cheval par défaut)"""
+    _current.set(horse)
+
+
+@contextmanager
+def using_horse(horse):
+    """Accéder aux données de `horse` le temps du bloc"""
+    token = _current.set(horse)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def horse_dir(config, horse):
+    return os.path.join(config.HORSES_DIR, horse)
+
+
+def read_horse(config, horse):
+    """Description d'un cheval, ou None s'il n'existe pas"""
+    try:
+        with open(os.path.join(horse_dir(config, horse), HORSE_FILE), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ Description du cheval illisible (%s): %s", horse, e)
+        data = {}
+    name = data.get('name') if isinstance(data, dict) else None
+    return {'id': horse, 'name': name or horse}
+
+
+def horse_exists(config, horse):
+    return os.path.isfile(os.path.join(horse_dir(config, horse), HORSE_FILE))
+
+
+def list_horses(config):
+    """Chevaux enregistrés, triés par identifiant"""
+    try:
+        names = sorted(os.listdir(config.HORSES_DIR))
+    except FileNotFoundError:
+        return []
+    return [horse for horse in (read_horse(config, name) for name in names) if horse is not None]
+
+
+def write_horse(config, horse, name):
+    """Enregistrer la description d'un cheval (dossier créé au besoin)"""
+    path = os.path.join(horse_dir(config, horse), HORSE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _replace_file(path, json.dumps({'id': horse, 'name': name}, ensure_ascii=False, indent=2).encode('utf-8'))
+    return {'id': horse, 'name': name}
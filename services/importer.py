@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from services.export import WORK_TYPE_LABELS
+from services.validation import ValidationService
+
+FORMATS = ('csv', 'jsonl')
+# Type de contenu -> format, si ?format= n'est pas indiqué
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/x-jsonlines': 'jsonl',
+}
+
+# Libellés d'un tableur (« Dressage ») acceptés à la place des types
+_WORK_TYPES_BY_LABEL = {label.lower(): key for key, label in WORK_TYPE_LABELS.items()}
+
+
+class ImportFormatError(ValueError):
+    """Fichier illisible dans son ensemble (format, en-tête, encodage)"""
+
+
+def detect_format(requested, content_type):
+    """Format demandé (?format=) ou déduit du type de contenu, sinon None"""
+    if requested:
+        return requested if requested in FORMATS else None
+    return CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+
+
+def _split(value):
+    return [part.strip() for part in (value or '').split(';') if part.strip()]
+
+
+def _csv_change(row):
+    """Modification au format de POST /api/assignments à partir d'une ligne
+    d'export CSV (cavalier_ids prioritaire sur les noms)"""
+    ids = _split(row.get('cavalier_ids'))
+    if ids:
+        if not all(value.isdigit() for value in ids):
+            return None, 'cavalier_ids doit contenir des identifiants séparés par ;'
+        cavaliers = [int(value) for value in ids]
+    else:
+        cavaliers = _split(row.get('cavaliers'))
+        for name in cavaliers:
+            valid, error = ValidationService.validate_cavalier_name(name)
+            if not valid:
+                return None, error
+
+    work_type = (row.get('work_type') or '').strip()
+    return {
+        'date': (row.get('date') or '').strip(),
+        'cavaliers': cavaliers,
+        'comment': row.get('comment') or '',
+        'work_type': _WORK_TYPES_BY_LABEL.get(work_type.lower(), work_type),
+    }, None
+
+
+def _text(stream):
+    # utf-8-sig : fichiers enregistrés par un tableur (BOM en tête)
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def read_csv(stream):
+    """Générateur de (numéro de ligne, modification, erreur) lues au fil de
+    l'eau. Colonnes de l'export : date, work_type, cavaliers, cavalier_ids, comment"""
+    reader = csv.DictReader(_text(stream))
+    if not reader.fieldnames or 'date' not in reader.fieldnames:
+        raise ImportFormatError("Colonne date absente de l'en-tête CSV")
+    for row in reader:
+        yield (reader.line_num,) + _csv_change(row)
+
+
+def read_jsonl(stream):
+    """Générateur de (numéro de ligne, modification, erreur) : un objet JSON
+    par ligne, au format de POST /api/assignments"""
+    for number, line in enumerate(_text(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError as e:
+            yield number, None, f'JSON invalide : {e}'
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
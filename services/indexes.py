@@ -0,0 +1,583 @@
+import bisect
+import hashlib
+import json
+import sys
+import threading
+from array import array
+from collections import Counter
+from datetime import date, timedelta
+from itertools import accumulate
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Les empreintes de contenu sont des entiers de 128 bits
+_DIGEST_BITS = 128
+_DIGEST_MASK = (1 << _DIGEST_BITS) - 1
+
+# Journées modifiées depuis le calcul des sommes cumulées par jour au-delà
+# desquelles celles-ci sont recalculées (sinon : corrigées jour par jour)
+DAILY_CORRECTIONS_MAX = 512
+
+
+def content_digest(data):
+    """Empreinte stable d'une donnée JSON (identique d'un worker à l'autre)"""
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=_DIGEST_BITS // 8).digest(), 'big')
+
+
+class Assignment:
+    """Une journée en mémoire : identifiants des cavaliers (tuple d'entiers),
+    commentaire et type de travail (chaîne internée, partagée par toutes les
+    journées du même type). Sans dictionnaire par instance."""
+
+    __slots__ = ('cavaliers', 'comment', 'work_type')
+
+    def __init__(self, cavaliers=(), comment='', work_type=''):
+        self.cavaliers = tuple(cavaliers)
+        self.comment = comment
+        self.work_type = sys.intern(work_type) if work_type else ''
+
+    @classmethod
+    def from_dict(cls, entry):
+        """Journée au format JSON, ou None si l'entrée est invalide"""
+        if isinstance(entry, cls):
+            return entry
+        if not isinstance(entry, dict):
+            return None
+        cavaliers = entry.get('cavaliers', [])
+        return cls(
+            cavaliers if isinstance(cavaliers, (list, tuple)) else (),
+            entry.get('comment', '') or '',
+            entry.get('work_type', '') or ''
+        )
+
+    def to_dict(self):
+        return {'cavaliers': list(self.cavaliers), 'comment': self.comment, 'work_type': self.work_type}
+
+
+class AssignmentTable:
+    """Assignments en mémoire et index dérivés.
+
+    La table est l'état mis en cache par les moteurs de stockage ; chaque
+    journée y est un `Assignment` compact, converti en dict à la lecture
+    (`get`, `copy`, `range`). Toutes les
+    modifications passent par `put`/`delete`, qui tiennent les index à jour
+    sans tout reconstruire :
+    - `dates` : liste triée des dates, une plage se résout par bisection.
+    - `monthly` : compteurs par mois (YYYY-MM) des séances par identifiant de
+      cavalier et par type de travail ; une modification retire l'ancienne entrée et
+      ajoute la nouvelle.
+    - `daily_counts()` : sommes cumulées par jour (`DailyCounts`), construites
+      à la demande ; une modification y ajoute l'écart de sa journée, et elles
+      ne sont recalculées qu'au-delà de DAILY_CORRECTIONS_MAX journées.
+    - `digest` : empreinte du contenu, somme (modulo 2^128) des empreintes de
+      chaque (date, entrée). Elle ne dépend pas de l'ordre des modifications,
+      donc deux workers qui ont le même contenu ont la même empreinte.
+      `month_digest(mois)` est la même somme restreinte à un mois.
+    """
+
+    def __init__(self, assignments=None):
+        self.lock = threading.RLock()
+        self.replace(assignments or {})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, date):
+        return date in self.entries
+
+    def get(self, date):
+        record = self.entries.get(date)
+        return record.to_dict() if record is not None else None
+
+    def put(self, date, entry):
+        entry = Assignment.from_dict(entry)
+        if entry is None:
+            return
+        with self.lock:
+            previous = self.entries.get(date)
+            if previous is not None:
+                self._count(date, previous, -1)
+                self._hash(date, previous, -1)
+            else:
+                bisect.insort(self.dates, date)
+            self.entries[date] = entry
+            self._count(date, entry, 1)
+            self._hash(date, entry, 1)
+            self._correct(date, previous, entry)
+
+    def delete(self, date):
+        with self.lock:
+            if date not in self.entries:
+                return
+            entry = self.entries.pop(date)
+            self._count(date, entry, -1)
+            self._hash(date, entry, -1)
+            del self.dates[bisect.bisect_left(self.dates, date)]
+            self._correct(date, entry, None)
+
+    def apply(self, changes):
+        """Appliquer {date: entrée, ou None pour supprimer}"""
+        with self.lock:
+            for date, entry in changes.items():
+                if entry is None:
+                    self.delete(date)
+                else:
+                    self.put(date, entry)
+
+    def replace(self, assignments):
+        with self.lock:
+            self.entries = {}
+            for date, entry in assignments.items():
+                record = Assignment.from_dict(entry)
+                if record is not None:
+                    self.entries[date] = record
+            self.dates = sorted(self.entries)
+            self.monthly = {}
+            self._digest = 0
+            self._month_digests = {}
+            for date, entry in self.entries.items():
+                self._count(date, entry, 1)
+                self._hash(date, entry, 1)
+            self._daily = None
+            self._daily_view = None
+            self._corrections = {}
+
+    def _count(self, date, entry, delta):
+        month = self.monthly.get(date[:7])
+        if month is None:
+            month = self.monthly[date[:7]] = {'cavaliers': Counter(), 'work_types': Counter()}
+
+        keys = [('cavaliers', cavalier) for cavalier in entry.cavaliers]
+        if entry.work_type:
+            keys.append(('work_types', entry.work_type))
+
+        for counter, key in keys:
+            month[counter][key] += delta
+            if month[counter][key] <= 0:
+                del month[counter][key]
+
+        if not month['cavaliers'] and not month['work_types']:
+            del self.monthly[date[:7]]
+
+    def _hash(self, date, entry, sign):
+        h = sign * content_digest([date, entry.to_dict()])
+        self._digest = (self._digest + h) & _DIGEST_MASK
+        month = (self._month_digests.get(date[:7], 0) + h) & _DIGEST_MASK
+        if month:
+            self._month_digests[date[:7]] = month
+        else:
+            self._month_digests.pop(date[:7], None)
+
+    def _correct(self, date_str, old, new):
+        # Écart d'une journée sur les sommes cumulées déjà calculées. Chaque
+        # jour reçoit de nouveaux compteurs : une vue déjà retournée ne change pas.
+        if self._daily is None:
+            return
+        try:
+            ordinal = date.fromisoformat(date_str).toordinal()
+        except (TypeError, ValueError):
+            # Date ignorée par les sommes cumulées aussi
+            return
+        cavaliers, work_types = (Counter(c) for c in self._corrections.get(ordinal, ((), ())))
+        for record, sign in ((old, -1), (new, 1)):
+            if record is None:
+                continue
+            for cavalier in record.cavaliers:
+                cavaliers[cavalier] += sign
+            if record.work_type:
+                work_types[record.work_type] += sign
+        self._corrections[ordinal] = (cavaliers, work_types)
+        self._daily_view = None
+        if len(self._corrections) > DAILY_CORRECTIONS_MAX:
+            self._daily = None
+
+    @property
+    def digest(self):
+        """Empreinte hexadécimale du contenu (change à chaque modification)"""
+        with self.lock:
+            return f"{self._digest:032x}"
+
+    def month_digest(self, month):
+        """Empreinte hexadécimale des journées d'un mois (YYYY-MM)"""
+        with self.lock:
+            return f"{self._month_digests.get(month, 0):032x}"
+
+    def months(self):
+        """Mois (YYYY-MM) ayant au moins une journée, triés"""
+        with self.lock:
+            return sorted(set(self.monthly) | set(self._month_digests))
+
+    def copy(self):
+        """Toutes les journées au format JSON {date: entrée}"""
+        with self.lock:
+            return {date: entry.to_dict() for date, entry in self.entries.items()}
+
+    def date_bounds(self):
+        """Première et dernière date enregistrées, ou None si la table est vide"""
+        with self.lock:
+            return (self.dates[0], self.dates[-1]) if self.dates else None
+
+    def items(self, start=None, end=None):
+        """Liste triée des (date, `Assignment`) entre deux dates incluses"""
+        with self.lock:
+            return [(date, self.entries[date]) for date in self.date_slice(start, end)]
+
+    def iter_items(self, start=None, end=None):
+        """Générateur des (date, `Assignment`) triés entre deux dates incluses,
+        lus un mois à la fois : la plage n'est jamais copiée en entier
+        (exports en streaming). Une écriture concurrente peut être vue à
+        partir du mois suivant."""
+        for month in self.months():
+            if (start and month < start[:7]) or (end and month > end[:7]):
+                continue
+            lo, hi = month + '-01', month + '-31'
+            yield from self.items(max(start, lo) if start else lo, min(end, hi) if end else hi)
+
+    def date_slice(self, start=None, end=None):
+        """Dates triées comprises entre `start` et `end` inclus (bornes optionnelles)"""
+        with self.lock:
+            lo = bisect.bisect_left(self.dates, start) if start else 0
+            hi = bisect.bisect_right(self.dates, end) if end else len(self.dates)
+            return self.dates[lo:hi]
+
+    def range(self, start=None, end=None):
+        """Assignments entre deux dates incluses, dans l'ordre chronologique"""
+        with self.lock:
+            return {date: self.entries[date].to_dict() for date in self.date_slice(start, end)}
+
+    def stats(self, month=None):
+        """Séances par identifiant de cavalier et par type de travail, pour un mois
+        (YYYY-MM) ou au total"""
+        with self.lock:
+            if month is not None:
+                counts = self.monthly.get(month, {})
+                return dict(counts.get('cavaliers', {})), dict(counts.get('work_types', {}))
+
+            cavaliers, work_types = Counter(), Counter()
+            for counts in self.monthly.values():
+                cavaliers.update(counts['cavaliers'])
+                work_types.update(counts['work_types'])
+            return dict(cavaliers), dict(work_types)
+
+    def daily_counts(self):
+        """Sommes cumulées par jour, corrigées des journées modifiées depuis leur calcul"""
+        with self.lock:
+            if self._daily is None:
+                self._daily = DailyCounts(self.entries)
+                self._daily_view = None
+                self._corrections = {}
+            if self._daily_view is None:
+                self._daily_view = CorrectedDailyCounts(self._daily, dict(self._corrections)) \
+                    if self._corrections else self._daily
+            return self._daily_view
+
+
+class DailyCounts:
+    """Sommes cumulées par jour des séances de chaque cavalier et type de travail.
+
+    `cavaliers[identifiant][k]` est le nombre de séances du cavalier entre le premier
+    jour indexé (inclus) et ce jour + k (exclu). Le total d'une plage est donc
+    une soustraction, quelle que soit sa longueur, et une série temporelle ne
+    coûte qu'une soustraction par période.
+    """
+
+    @classmethod
+    def from_arrays(cls, first, length, cavaliers, work_types):
+        """Sommes cumulées déjà calculées (tableaux indexables d'entiers)"""
+        counts = cls.__new__(cls)
+        counts.first, counts.length = first, length
+        counts.cavaliers, counts.work_types = cavaliers, work_types
+        return counts
+
+    def __init__(self, entries):
+        days = []
+        for date_str, entry in entries.items():
+            try:
+                days.append((date.fromisoformat(date_str).toordinal(), entry))
+            except (TypeError, ValueError):
+                continue
+
+        self.first = min((day for day, _ in days), default=0)
+        self.length = (max(day for day, _ in days) - self.first + 1) if days else 0
+
+        cavaliers, work_types = {}, {}
+        for day, entry in days:
+            k = day - self.first
+            for cavalier in entry.cavaliers:
+                self._daily_array(cavaliers, cavalier)[k] += 1
+            if entry.work_type:
+                self._daily_array(work_types, entry.work_type)[k] += 1
+
+        self.cavaliers = {name: self._cumulate(counts) for name, counts in cavaliers.items()}
+        self.work_types = {name: self._cumulate(counts) for name, counts in work_types.items()}
+
+    def _daily_array(self, arrays, key):
+        if key not in arrays:
+            arrays[key] = array('i', bytes(4 * self.length))
+        return arrays[key]
+
+    @staticmethod
+    def _cumulate(counts):
+        return array('i', accumulate(counts, initial=0))
+
+    def _offset(self, day):
+        """Position d'un jour (ordinal) dans les sommes cumulées, bornée à l'index"""
+        return min(max(day - self.first, 0), self.length)
+
+    def totals(self, start, end):
+        """Séances par cavalier et par type de travail du jour `start` au jour `end` inclus"""
+        lo, hi = self._offset(start.toordinal()), self._offset(end.toordinal() + 1)
+        return (
+            {name: cum[hi] - cum[lo] for name, cum in self.cavaliers.items() if cum[hi] - cum[lo]},
+            {name: cum[hi] - cum[lo] for name, cum in self.work_types.items() if cum[hi] - cum[lo]},
+        )
+
+    def series(self, edges):
+        """Séances par période, les périodes étant délimitées par `edges` (ordinaux)"""
+        offsets = [self._offset(day) for day in edges]
+        bounds = list(zip(offsets, offsets[1:]))
+
+        def diff(cumulated):
+            series = {}
+            for name, cum in cumulated.items():
+                values = [cum[hi] - cum[lo] for lo, hi in bounds]
+                if any(values):
+                    series[name] = values
+            return series
+
+        return diff(self.cavaliers), diff(self.work_types)
+
+
+class CorrectedDailyCounts:
+    """`DailyCounts` plus des écarts par jour ({ordinal: (Counter cavaliers,
+    Counter types)}), même interface : journal d'un instantané projeté,
+    occurrences des règles de récurrence"""
+
+    def __init__(self, base, corrections):
+        self.base = base
+        self.days = sorted(corrections)
+        self.corrections = corrections
+
+    def totals(self, start, end):
+        cavaliers, work_types = (Counter(t) for t in self.base.totals(start, end))
+        lo = bisect.bisect_left(self.days, start.toordinal())
+        hi = bisect.bisect_right(self.days, end.toordinal())
+        for day in self.days[lo:hi]:
+            delta_cavaliers, delta_work_types = self.corrections[day]
+            cavaliers.update(delta_cavaliers)
+            work_types.update(delta_work_types)
+        return (
+            {name: n for name, n in cavaliers.items() if n},
+            {name: n for name, n in work_types.items() if n},
+        )
+
+    def series(self, edges):
+        cavaliers, work_types = self.base.series(edges)
+        periods = len(edges) - 1
+        for day in self.days:
+            period = bisect.bisect_right(edges, day) - 1
+            if not 0 <= period < periods:
+                continue
+            for series, delta in zip((cavaliers, work_types), self.corrections[day]):
+                for name, n in delta.items():
+                    series.setdefault(name, [0] * periods)[period] += n
+        return (
+            {name: values for name, values in cavaliers.items() if any(values)},
+            {name: values for name, values in work_types.items() if any(values)},
+        )
+
+
+def period_edges(start, end, granularity):
+    """Découper [start, end] en jours, semaines ISO ou mois.
+
+    Retourne les libellés des périodes et leurs bornes en ordinaux
+    (len(edges) == len(labels) + 1, la dernière borne étant end + 1 jour).
+    """
+    labels, edges = [], []
+    current = start
+    while current <= end:
+        if granularity == 'day':
+            label, following = current.isoformat(), current + timedelta(days=1)
+        elif granularity == 'week':
+            iso = current.isocalendar()
+            label = f"{iso[0]}-W{iso[1]:02d}"
+            following = current + timedelta(days=7 - current.weekday())
+        else:
+            label = current.strftime('%Y-%m')
+            following = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        labels.append(label)
+        edges.append(current.toordinal())
+        current = following
+    edges.append(end.toordinal() + 1)
+    return labels, edges
+
+
+def copy_cavaliers(cavaliers):
+    return [dict(c) if isinstance(c, dict) else c for c in cavaliers]
+
+
+# Couleur des cavaliers recréés (archivés) par la migration noms → identifiants
+ARCHIVED_COLOR = '#999999'
+
+
+def is_cavalier_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def next_cavalier_id(cavaliers):
+    """Identifiant libre suivant (les identifiants ne sont jamais réutilisés,
+    les cavaliers supprimés restant archivés)"""
+    ids = [c['id'] for c in cavaliers if isinstance(c, dict) and is_cavalier_id(c.get('id'))]
+    return max(ids, default=0) + 1
+
+
+def assign_cavalier_ids(cavaliers, assignments):
+    """Migration des noms vers des identifiants entiers stables.
+
+    Donne un identifiant aux cavaliers qui n'en ont pas et remplace les noms
+    des journées par l'identifiant du cavalier de ce nom. Un nom inconnu
+    (cavalier supprimé ou renommé depuis) devient un cavalier archivé, pour
+    que l'historique garde son nom. Retourne (cavaliers, assignments, modifié).
+    """
+    cavaliers = [dict(c) for c in cavaliers if isinstance(c, dict) and 'name' in c]
+    changed = False
+    next_id = next_cavalier_id(cavaliers)
+    seen = set()
+    for c in cavaliers:
+        if not is_cavalier_id(c.get('id')) or c['id'] in seen:
+            c['id'] = next_id
+            next_id += 1
+            changed = True
+        seen.add(c['id'])
+
+    # Un nom désigne d'abord un cavalier actif, sinon un archivé
+    by_name = {}
+    for c in sorted(cavaliers, key=lambda c: bool(c.get('archived'))):
+        by_name.setdefault(c['name'], c['id'])
+
+    converted = {}
+    for date, entry in assignments.items():
+        if not isinstance(entry, dict):
+            continue
+        ids = []
+        for rider in entry.get('cavaliers', []):
+            if is_cavalier_id(rider):
+                ids.append(rider)
+                continue
+            changed = True
+            name = str(rider)
+            if name not in by_name:
+                cavaliers.append({
+                    'id': next_id, 'name': name, 'color': ARCHIVED_COLOR,
+                    'start_date': '', 'end_date': '', 'archived': True
+                })
+                by_name[name] = next_id
+                next_id += 1
+            ids.append(by_name[name])
+        converted[date] = dict(entry, cavaliers=ids)
+    return cavaliers, converted, changed
+
+
+class CavalierTable:
+    """Cavaliers en cache et index d'intervalles sur leurs périodes d'activité.
+
+    Chaque cavalier a un identifiant entier stable (`id`), référencé par les
+    assignments. Un cavalier supprimé reste dans la liste avec `archived` :
+    l'historique le désigne encore, mais il n'est plus jamais actif.
+
+    Les dates de début/fin non vides, triées, découpent le calendrier en
+    segments : chaque date de coupure, et chaque intervalle ouvert entre deux
+    coupures, a un ensemble de cavaliers actifs constant, calculé une fois.
+    Trouver les actifs d'une date revient alors à une bisection. L'index est
+    construit à la première requête ; toute écriture des cavaliers remplace
+    la table, donc l'index.
+    """
+
+    def __init__(self, cavaliers):
+        self.cavaliers = cavaliers
+        self._points = None
+        self._slots = None
+        self._digest = None
+        self._by_id = None
+        self._lock = threading.Lock()
+
+    @property
+    def digest(self):
+        """Empreinte hexadécimale de la liste (calculée une fois par table)"""
+        with self._lock:
+            if self._digest is None:
+                self._digest = f"{content_digest(self.cavaliers):032x}"
+            return self._digest
+
+    def copy(self):
+        """Copie : les routes modifient les cavaliers avant de les réécrire"""
+        return copy_cavaliers(self.cavaliers)
+
+    def current(self):
+        """Cavaliers non archivés"""
+        return [c for c in self.cavaliers if isinstance(c, dict) and not c.get('archived')]
+
+    def by_id(self):
+        """{identifiant: cavalier}, archivés compris"""
+        with self._lock:
+            if self._by_id is None:
+                self._by_id = {
+                    c['id']: c for c in self.cavaliers
+                    if isinstance(c, dict) and is_cavalier_id(c.get('id'))
+                }
+            return self._by_id
+
+    def resolve(self, value):
+        """Identifiant d'un cavalier désigné par son identifiant ou son nom
+        (un actif avant un archivé), ou None s'il est inconnu"""
+        riders = self.by_id()
+        if is_cavalier_id(value):
+            return value if value in riders else None
+        if isinstance(value, str):
+            matches = [c for c in riders.values() if c.get('name') == value]
+            matches.sort(key=lambda c: bool(c.get('archived')))
+            return matches[0]['id'] if matches else None
+        return None
+
+    def _build(self):
+        riders = [c for c in self.cavaliers if isinstance(c, dict) and not c.get('archived')]
+        bounds = [(c.get('start_date', ''), c.get('end_date', '')) for c in riders]
+        points = sorted({d for pair in bounds for d in pair if d})
+
+        # Emplacement 2i : strictement entre points[i-1] et points[i]
+        # Emplacement 2i+1 : exactement points[i]
+        slots = []
+        for i in range(len(points) + 1):
+            lo = points[i - 1] if i > 0 else None
+            hi = points[i] if i < len(points) else None
+            slots.append(tuple(
+                c for c, (start, end) in zip(riders, bounds)
+                if (not start or (lo is not None and start <= lo))
+                and (not end or (hi is not None and end >= hi))
+            ))
+            if hi is not None:
+                slots.append(tuple(
+                    c for c, (start, end) in zip(riders, bounds)
+                    if (not start or start <= hi) and (not end or end >= hi)
+                ))
+        self._points, self._slots = points, slots
+
+    def active_on(self, date_str):
+        """Cavaliers actifs à une date YYYY-MM-DD"""
+        with self._lock:
+            if self._slots is None:
+                self._build()
+        i = bisect.bisect_left(self._points, date_str)
+        exact = i < len(self._points) and self._points[i] == date_str
+        return list(self._slots[2 * i + 1 if exact else 2 * i])
+
+    def active_between(self, start, end):
+        """Identifiants des cavaliers actifs pour chaque jour de `start` à `end` (dates) inclus"""
+        days = {}
+        current = start
+        while current <= end:
+            key = current.isoformat()
+            days[key] = [c.get('id') for c in self.active_on(key)]
+            current += timedelta(days=1)
+        return days
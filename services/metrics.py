@@ -0,0 +1,360 @@
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+WORKER_FILE = re.compile(r'^worker-(\d+)\.json$')
+# Intervalle d'écriture minimal du thread (METRICS_FLUSH_SECONDS=0)
+MIN_FLUSH_SECONDS = 0.1
+
+# Secondes ; la dernière case (+Inf) est implicite
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _alive(pid):
+    """Le processus `pid` existe-t-il encore ?"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Processus d'un autre utilisateur
+        pass
+    return True
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Valeurs d'une métrique par combinaison de valeurs des étiquettes"""
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        # Nouveau verrou : il a pu être pris par un autre thread au moment du fork
+        self._lock = threading.Lock()
+        self._values = {}
+
+
+class Counter(_Metric):
+    """Compteur croissant"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(total, samples):
+        for key, value in samples:
+            key = tuple(key)
+            total[key] = total.get(key, 0) + value
+
+    @staticmethod
+    def samples(total):
+        return [[list(key), value] for key, value in total.items()]
+
+    def render(self, total):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(total.items())]
+
+
+class Histogram(_Metric):
+    """Répartition de durées par cases cumulées (_bucket, _sum, _count)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), list(counts), total] for key, (counts, total) in self._values.items()]
+
+    @staticmethod
+    def merge(total, samples):
+        for key, counts, value in samples:
+            key = tuple(key)
+            entry = total.setdefault(key, [[0] * len(counts), 0.0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += value
+
+    @staticmethod
+    def samples(total):
+        return [[list(key), list(counts), value] for key, (counts, value) in total.items()]
+
+    def render(self, total):
+        lines = []
+        for key, (counts, value) in sorted(total.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(value)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Métriques du worker, agrégées entre workers au format texte Prometheus.
+
+    Chaque worker gunicorn écrit ses valeurs dans un fichier
+    `<dossier>/worker-<pid>.json`, depuis un thread (voir `start`) et à sa
+    sortie ; /metrics additionne tous les fichiers du dossier. Les valeurs des
+    workers arrêtés sont reportées dans `cumulative.json` (et leur fichier
+    supprimé) : les compteurs restent croissants, même si un nouveau worker
+    reprend le pid d'un ancien, tant que le dossier n'est pas vidé (au
+    déploiement).
+    """
+
+    CUMULATIVE_FILE = 'cumulative.json'
+
+    def __init__(self):
+        self._metrics = {}
+        self._directory = None
+        self._interval = None
+        self._exit_flush = False
+        self.reset()
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà déclarée : {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def dump(self):
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def reset(self):
+        """Repartir de zéro (processus issu d'un fork : les valeurs héritées
+        sont déjà comptées dans le fichier du parent, et son thread
+        d'écriture n'existe pas ici)"""
+        for metric in self._metrics.values():
+            metric.reset()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        # Contenu de notre fichier (None : pas encore écrit par ce processus)
+        self._written = None
+
+    def start(self, directory, interval):
+        """Écrire les valeurs toutes les `interval` secondes depuis un thread,
+        même sans requête, et à la sortie du processus (atexit : arrêt normal
+        d'un worker gunicorn). Sans effet si le thread tourne déjà."""
+        self._directory, self._interval = directory, interval
+        if not self._exit_flush:
+            # Hérité par les processus issus d'un fork
+            self._exit_flush = True
+            atexit.register(self._flush_at_exit)
+        if self._flusher is None:
+            with self._flush_lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+                    self._flusher.start()
+
+    def _run(self):
+        # Thread d'écriture périodique
+        while True:
+            time.sleep(max(self._interval, MIN_FLUSH_SECONDS))
+            try:
+                with self._flush_lock:
+                    self.flush(self._directory)
+            except OSError as e:
+                logger.warning("⚠️ Métriques non enregistrées (%s): %s", self._directory, e)
+
+    def _flush_at_exit(self):
+        # Sans attendre indéfiniment un thread interrompu en pleine écriture
+        if self._directory is None or not self._flush_lock.acquire(timeout=1):
+            return
+        try:
+            self.flush(self._directory)
+        except OSError as e:
+            logger.warning("⚠️ Métriques non enregistrées (%s): %s", self._directory, e)
+        finally:
+            self._flush_lock.release()
+
+    @contextmanager
+    def _locked(self, directory):
+        # Verrou inter-processus du report des workers arrêtés
+        fd = os.open(os.path.join(directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write(self, path, samples):
+        # Fichier temporaire renommé, sans fsync : une valeur perdue à
+        # l'arrêt n'a pas d'importance
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(samples)
+        os.replace(tmp, path)
+
+    def _retire(self, directory, paths):
+        """Reporter les valeurs des fichiers `paths` dans le cumul et les supprimer"""
+        with self._locked(directory):
+            paths = [path for path in paths if os.path.exists(path)]
+            if not paths:
+                return
+            cumulative = os.path.join(directory, self.CUMULATIVE_FILE)
+            totals = {name: {} for name in self._metrics}
+            for path in [cumulative] + paths:
+                try:
+                    samples = self._read(path)
+                except FileNotFoundError:
+                    continue
+                except ValueError as e:
+                    logger.warning("⚠️ Métriques illisibles ignorées (%s): %s", path, e)
+                    continue
+                for name, metric in self._metrics.items():
+                    metric.merge(totals[name], samples.get(name, []))
+            self._write(cumulative, json.dumps(
+                {name: metric.samples(totals[name]) for name, metric in self._metrics.items()},
+                separators=(',', ':')))
+            for path in paths:
+                os.remove(path)
+
+    def flush(self, directory):
+        """Écrire les valeurs du worker (rien si elles n'ont pas changé)"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"worker-{os.getpid()}.json")
+        samples = json.dumps(self.dump(), separators=(',', ':'))
+        if self._written is None:
+            # Fichier d'un ancien worker au même pid : le reporter d'abord
+            self._retire(directory, [path])
+        elif samples == self._written and os.path.exists(path):
+            return
+        self._write(path, samples)
+        self._written = samples
+
+    def collect(self, directory):
+        """Texte Prometheus des valeurs additionnées de tous les workers"""
+        with self._flush_lock:
+            self.flush(directory)
+
+        workers = {}
+        for path in glob.glob(os.path.join(directory, 'worker-*.json')):
+            match = WORKER_FILE.match(os.path.basename(path))
+            if match:
+                workers[path] = int(match.group(1))
+        dead = [path for path, pid in workers.items() if not _alive(pid)]
+        if dead:
+            self._retire(directory, dead)
+
+        totals = {name: {} for name in self._metrics}
+        for path in [os.path.join(directory, self.CUMULATIVE_FILE)] + sorted(set(workers) - set(dead)):
+            try:
+                samples = self._read(path)
+            except (OSError, ValueError):
+                continue
+            for name, metric in self._metrics.items():
+                metric.merge(totals[name], samples.get(name, []))
+
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(totals[name]))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+os.register_at_fork(after_in_child=REGISTRY.reset)
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', "Durée de traitement des requêtes",
+    ('blueprint', 'endpoint', 'method'))
+REQUESTS = REGISTRY.counter(
+    'http_requests_total', "Requêtes traitées, par code de réponse",
+    ('blueprint', 'endpoint', 'method', 'status'))
+REQUEST_ERRORS = REGISTRY.counter(
+    'http_request_errors_total', "Réponses en erreur serveur (5xx)",
+    ('blueprint', 'endpoint'))
+JSON_SECONDS = REGISTRY.counter(
+    'json_seconds_total', "Temps passé à parser / sérialiser du JSON",
+    ('operation', 'source'))
+JSON_OPERATIONS = REGISTRY.counter(
+    'json_operations_total', "Nombre de documents JSON parsés / sérialisés",
+    ('operation', 'source'))
+STORAGE_READ_BYTES = REGISTRY.counter(
+    'storage_read_bytes_total', "Octets lus dans les fichiers de données", ('file',))
+STORAGE_WRITTEN_BYTES = REGISTRY.counter(
+    'storage_written_bytes_total', "Octets écrits dans les fichiers de données", ('file',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', "Accès aux caches de lecture (hits, misses, reloads)",
+    ('cache', 'result'))
+WRITE_FLUSH_LAG = REGISTRY.histogram(
+    'write_flush_lag_seconds', "Délai entre une écriture et son enregistrement",
+    ('durability',))
+LOG_MESSAGES = REGISTRY.counter(
+    'log_messages_total', "Messages d'avertissement et d'erreur journalisés", ('level',))
+
+
+@contextmanager
+def timed_json(operation, source):
+    """Compter la durée d'un parse ('parse') ou d'une sérialisation ('serialize')"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        JSON_SECONDS.inc(time.perf_counter() - started, operation=operation, source=source)
+        JSON_OPERATIONS.inc(operation=operation, source=source)
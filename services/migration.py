@@ -0,0 +1,83 @@
+"""Migration ponctuelle des fichiers JSON vers la base SQLite.
+
+Usage : python -m services.migration [--force]
+Puis démarrer l'application avec STORAGE_BACKEND=sqlite (une base par
+cheval, celle du cheval par défaut dans SQLITE_FILE).
+
+python -m services.migration --ids convertit seulement, dans le stockage
+configuré, les noms de cavaliers des journées en identifiants (fait aussi
+automatiquement au démarrage de l'application).
+"""
+import argparse
+import sys
+from config import Config
+from services.data_service import DataService
+from services.horses import list_horses
+from services.indexes import assign_cavalier_ids
+from services.storage import create_storage
+
+
+def migrate_json_to_sqlite(config, force=False):
+    """Importer cavaliers, puis règles de récurrence et assignments JSON
+    (journaux compris) de chaque cheval dans sa base SQLite.
+
+    Refuse d'écraser une base qui contient déjà des assignments, sauf `force`.
+    Retourne le nombre de (cavaliers, dates) importés.
+    """
+    horses = [config.DEFAULT_HORSE] + sorted(
+        h['id'] for h in list_horses(config) if h['id'] != config.DEFAULT_HORSE)
+    storages = [(create_storage(config, horse, 'json'), create_storage(config, horse, 'sqlite'))
+                for horse in horses]
+
+    for source, target in storages:
+        # Fichiers d'avant les chevaux repris par le cheval par défaut
+        source.initialize([])
+        target.initialize([])
+        if target.read_assignments() and not force:
+            raise RuntimeError(f"La base {target.path} contient déjà des données (utiliser --force)")
+
+    # Fichiers éventuellement antérieurs aux identifiants de cavaliers
+    stable, stable_target = storages[0]
+    cavaliers = stable.read_cavaliers()
+    nb_dates = 0
+    for source, target in storages:
+        cavaliers, assignments, _ = assign_cavalier_ids(cavaliers, source.read_assignments())
+        assignments = {
+            date: {
+                'cavaliers': entry['cavaliers'],
+                'comment': entry.get('comment', ''),
+                'work_type': entry.get('work_type', ''),
+            }
+            for date, entry in assignments.items()
+        }
+        target.write_recurrences(source.read_recurrences())
+        target.write_assignments(assignments)
+        nb_dates += len(assignments)
+
+    stable_target.write_cavaliers(cavaliers)
+    return len(cavaliers), nb_dates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importer les fichiers JSON dans SQLite")
+    parser.add_argument('--force', action='store_true', help="écraser une base déjà remplie")
+    parser.add_argument('--ids', action='store_true',
+                        help="convertir les noms de cavaliers en identifiants dans le stockage configuré")
+    args = parser.parse_args(argv)
+
+    if args.ids:
+        DataService.init_files()
+        return 0
+
+    try:
+        nb_cavaliers, nb_dates = migrate_json_to_sqlite(Config, force=args.force)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ Migration terminée : {nb_cavaliers} cavaliers, {nb_dates} dates → {Config.SQLITE_FILE}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
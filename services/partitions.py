@@ -0,0 +1,171 @@
+from collections import Counter
+from datetime import date
+from services.indexes import _DIGEST_MASK
+
+
+def partition_key(date_str):
+    """Partition (année) d'une date YYYY-MM-DD"""
+    return date_str[:4]
+
+
+def split_by_partition(assignments):
+    """{année: {date: entrée}} d'un dict {date: entrée}"""
+    parts = {}
+    for date_str, entry in assignments.items():
+        parts.setdefault(partition_key(date_str), {})[date_str] = entry
+    return parts
+
+
+class _ViewLock:
+    """Verrou d'une `PartitionedTable` : tant qu'il est pris, les tables déjà
+    lues le sont aussi (par année croissante), et chaque table lue ensuite
+    à son tour. La vue ne sert qu'à une requête, donc à un seul thread."""
+
+    def __init__(self, view):
+        self.view = view
+        self.depth = 0
+        self.held = []
+
+    def hold(self, table):
+        table.lock.acquire()
+        self.held.append(table)
+
+    def __enter__(self):
+        self.depth += 1
+        if self.depth == 1:
+            for year in sorted(self.view._tables):
+                self.hold(self.view._tables[year])
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0:
+            while self.held:
+                self.held.pop().lock.release()
+        return False
+
+
+class PartitionedTable:
+    """Vue en lecture seule sur les tables d'un cheval découpées par année.
+
+    Même interface de lecture que `AssignmentTable` ; chaque année n'est
+    chargée (`load(année)`) qu'à la première lecture qui la concerne : une
+    plage, un mois ou des statistiques bornées ne touchent que leurs années.
+    Les empreintes étant des sommes, celle de la vue est la somme de celles
+    des années, identique à celle d'une table unique de même contenu.
+    """
+
+    def __init__(self, years, load):
+        self.years = list(years)
+        self._load = load
+        self._tables = {}
+        self.lock = _ViewLock(self)
+
+    def _table(self, year):
+        table = self._tables.get(year)
+        if table is None and year in self.years:
+            table = self._tables[year] = self._load(year)
+            if self.lock.depth:
+                self.lock.hold(table)
+        return table
+
+    def _between(self, start=None, end=None):
+        """Tables des années de la plage (bornes optionnelles), dans l'ordre"""
+        for year in self.years:
+            if (start and year < start[:4]) or (end and year > end[:4]):
+                continue
+            yield self._table(year)
+
+    def __len__(self):
+        return sum(len(table) for table in self._between())
+
+    def __contains__(self, date_str):
+        table = self._table(partition_key(date_str))
+        return table is not None and date_str in table
+
+    def get(self, date_str):
+        table = self._table(partition_key(date_str))
+        return table.get(date_str) if table is not None else None
+
+    @property
+    def digest(self):
+        total = sum(int(table.digest, 16) for table in self._between())
+        return f"{total & _DIGEST_MASK:032x}"
+
+    def month_digest(self, month):
+        table = self._table(partition_key(month))
+        return table.month_digest(month) if table is not None else f"{0:032x}"
+
+    def months(self):
+        return [month for table in self._between() for month in table.months()]
+
+    def copy(self):
+        return self.range()
+
+    def date_bounds(self):
+        """Première et dernière date : ne lit que les années extrêmes non vides"""
+        first = next((b for b in (self._table(y).date_bounds() for y in self.years) if b), None)
+        if first is None:
+            return None
+        last = next(b for b in (self._table(y).date_bounds() for y in reversed(self.years)) if b)
+        return first[0], last[1]
+
+    def items(self, start=None, end=None):
+        return [item for table in self._between(start, end) for item in table.items(start, end)]
+
+    def iter_items(self, start=None, end=None):
+        for table in self._between(start, end):
+            yield from table.iter_items(start, end)
+
+    def range(self, start=None, end=None):
+        result = {}
+        for table in self._between(start, end):
+            result.update(table.range(start, end))
+        return result
+
+    def stats(self, month=None):
+        if month is not None:
+            table = self._table(partition_key(month))
+            return table.stats(month) if table is not None else ({}, {})
+
+        cavaliers, work_types = Counter(), Counter()
+        for table in self._between():
+            year_cavaliers, year_work_types = table.stats()
+            cavaliers.update(year_cavaliers)
+            work_types.update(year_work_types)
+        return dict(cavaliers), dict(work_types)
+
+    def daily_counts(self):
+        return PartitionedDailyCounts(self)
+
+
+class PartitionedDailyCounts:
+    """Sommes cumulées par jour d'une `PartitionedTable` : chaque plage est
+    répondue par les sommes des seules années qu'elle couvre (chacune bornée
+    à ses propres dates), additionnées. Même interface que `DailyCounts`."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def _counts(self, first, last):
+        for table in self.table._between(first.isoformat(), last.isoformat()):
+            yield table.daily_counts()
+
+    def totals(self, start, end):
+        cavaliers, work_types = Counter(), Counter()
+        for counts in self._counts(start, end):
+            year_cavaliers, year_work_types = counts.totals(start, end)
+            cavaliers.update(year_cavaliers)
+            work_types.update(year_work_types)
+        return dict(cavaliers), dict(work_types)
+
+    def series(self, edges):
+        cavaliers, work_types = {}, {}
+        periods = len(edges) - 1
+        for counts in self._counts(date.fromordinal(edges[0]), date.fromordinal(edges[-1] - 1)):
+            for total, series in zip((cavaliers, work_types), counts.series(edges)):
+                for name, values in series.items():
+                    current = total.setdefault(name, [0] * periods)
+                    for k, n in enumerate(values):
+                        current[k] += n
+        return cavaliers, work_types
@@ -0,0 +1,314 @@
+import calendar
+import hashlib
+import heapq
+import logging
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
+from services.indexes import Assignment, CorrectedDailyCounts, content_digest
+
+logger = logging.getLogger(__name__)
+
+FREQUENCIES = ('weekly', 'daily')
+
+
+class RecurrenceRule:
+    """Règle de récurrence validée : journée type répétée certains jours de
+    la semaine toutes les `interval` semaines (semaines comptées à partir
+    de celle de `start`), ou tous les `interval` jours à partir de `start`"""
+
+    __slots__ = ('id', 'frequency', 'interval', 'weekdays', 'start', 'end', 'exceptions', 'entry')
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.frequency = data['frequency']
+        self.interval = data.get('interval') or 1
+        self.start = date.fromisoformat(data['start_date'])
+        self.end = date.fromisoformat(data['end_date']) if data.get('end_date') else None
+        # 0 = lundi ; par défaut le jour de la semaine de la première date
+        self.weekdays = tuple(sorted(set(data.get('weekdays') or [self.start.weekday()])))
+        self.exceptions = frozenset(data.get('exceptions') or ())
+        self.entry = Assignment.from_dict(data)
+
+    def covers(self, day):
+        """La règle produit-elle une journée à la date `day` ?"""
+        return next(self.days(day, day), None) is not None
+
+    def days(self, start, end):
+        """Générateur des dates (triées) de la règle entre `start` et `end` inclus"""
+        lo = max(start, self.start)
+        hi = min(end, self.end) if self.end else end
+        if lo > hi:
+            return
+
+        if self.frequency == 'daily':
+            step = timedelta(days=self.interval)
+            # Première occurrence >= lo
+            day = self.start + step * -(-(lo - self.start).days // self.interval)
+            while day <= hi:
+                if day.isoformat() not in self.exceptions:
+                    yield day
+                day += step
+            return
+
+        step = timedelta(weeks=self.interval)
+        week = self.start - timedelta(days=self.start.weekday())
+        # Dernière semaine retenue commençant au plus tard à lo
+        week += step * max(0, (lo - week).days // (7 * self.interval))
+        while week <= hi:
+            for weekday in self.weekdays:
+                day = week + timedelta(days=weekday)
+                if lo <= day <= hi and day.isoformat() not in self.exceptions:
+                    yield day
+            week += step
+
+
+def add_exceptions(recurrences, dates):
+    """Ajouter aux exceptions des règles enregistrées (dicts, modifiés sur
+    place) celles des `dates` qu'elles produisent"""
+    for data in recurrences:
+        if not isinstance(data, dict):
+            continue
+        rule = RecurrenceRule(data)
+        covered = [d for d in dates if rule.covers(date.fromisoformat(d))]
+        if covered:
+            data['exceptions'] = sorted(set(data.get('exceptions') or ()).union(covered))
+
+
+def _merge_entries(entries):
+    """Journée de plusieurs règles tombant le même jour : cavaliers réunis
+    (dans l'ordre des règles), premier type de travail, commentaires joints"""
+    if len(entries) == 1:
+        return entries[0]
+    cavaliers = list(dict.fromkeys(c for entry in entries for c in entry.cavaliers))
+    work_type = next((entry.work_type for entry in entries if entry.work_type), '')
+    comment = ' / '.join(entry.comment for entry in entries if entry.comment)
+    return Assignment(cavaliers, comment, work_type)
+
+
+class RecurrenceTable:
+    """Règles de récurrence enregistrées (liste de dicts, dans l'ordre de
+    création) et leur expansion.
+
+    Seules les règles sont stockées ; les journées sont produites à la
+    demande, pour la fenêtre demandée (`occurrences`), jamais matérialisées.
+    """
+
+    def __init__(self, recurrences):
+        self.recurrences = recurrences
+        self._rules = None
+        self._digest = None
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.recurrences)
+
+    @property
+    def digest(self):
+        """Empreinte hexadécimale des règles (calculée une fois par table)"""
+        with self._lock:
+            if self._digest is None:
+                self._digest = f"{content_digest(self.recurrences):032x}"
+            return self._digest
+
+    def copy(self):
+        return [dict(r) for r in self.recurrences]
+
+    def rules(self):
+        with self._lock:
+            if self._rules is None:
+                self._rules = [RecurrenceRule(r) for r in self.recurrences if isinstance(r, dict)]
+            return self._rules
+
+    def first_day(self):
+        """Première date couverte par une règle, ou None"""
+        return min((rule.start for rule in self.rules()), default=None)
+
+    def last_day(self):
+        """Dernière date couverte, None si aucune règle, date.max si une règle est sans fin"""
+        rules = self.rules()
+        if not rules:
+            return None
+        return max(rule.end or date.max for rule in rules)
+
+    def covering(self, dates):
+        """Celles des `dates` (YYYY-MM-DD) qu'au moins une règle produit"""
+        rules = self.rules()
+        return [d for d in dates if any(rule.covers(date.fromisoformat(d)) for rule in rules)]
+
+    def occurrences(self, start, end):
+        """Générateur des (date, `Assignment`) triés entre `start` et `end`
+        (dates incluses), les règles d'un même jour fusionnées"""
+        def stream(position, rule):
+            for day in rule.days(start, end):
+                yield day, position, rule.entry
+
+        streams = [stream(position, rule) for position, rule in enumerate(self.rules())]
+        for day, group in groupby(heapq.merge(*streams), key=itemgetter(0)):
+            yield day, _merge_entries([entry for _, _, entry in group])
+
+
+def _bound(value):
+    """Date d'une borne YYYY-MM-DD ; un jour au-delà de la fin du mois
+    (2025-02-31, accepté par `validate_date`) est ramené au dernier jour"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        year, month = int(value[:4]), int(value[5:7])
+        return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _stored_date(value):
+    """Date d'une clé enregistrée, ou None si elle ne se lit pas comme une
+    date (données antérieures à la validation stricte)"""
+    try:
+        return _bound(value)
+    except ValueError:
+        logger.warning("⚠️ Date enregistrée illisible ignorée : %s", value)
+        return None
+
+
+def _combine(*parts):
+    return hashlib.blake2b('-'.join(parts).encode(), digest_size=16).hexdigest()
+
+
+class Schedule:
+    """Journées effectives : les entrées de la table (écrites par
+    save_assignment) l'emportent, les autres dates prennent les occurrences
+    des règles de récurrence.
+
+    Même interface de lecture que `AssignmentTable` (`get`, `iter_items`,
+    `range`, `stats`, `digest`, `month_digest`, `date_bounds`) ; les
+    occurrences ne sont calculées que sur la fenêtre demandée. Sans borne de
+    fin, une règle s'arrête au plus tard à `horizon` : la dernière date de la
+    table, ou aujourd'hui si elle est passée.
+    """
+
+    def __init__(self, table, recurrences, today=None):
+        self.table = table
+        self.recurrences = recurrences
+        self.lock = table.lock
+        self.today = today or date.today()
+        self._horizon = None
+
+    @property
+    def horizon(self):
+        """Calculé à la demande : seules les règles qui dépassent aujourd'hui
+        en ont besoin"""
+        if self._horizon is None:
+            bounds = self.table.date_bounds()
+            last = _stored_date(bounds[1]) if bounds else None
+            self._horizon = max(last, self.today) if last else self.today
+        return self._horizon
+
+    def _open_ended(self):
+        return self.recurrences.last_day() == date.max
+
+    @property
+    def digest(self):
+        """Empreinte de la table, des règles et de l'horizon s'il borne une règle"""
+        if not self.recurrences:
+            return self.table.digest
+        parts = [self.table.digest, self.recurrences.digest]
+        if self._open_ended():
+            parts.append(self.horizon.isoformat())
+        return _combine(*parts)
+
+    def month_digest(self, month):
+        digest = self.table.month_digest(month)
+        if not self.recurrences:
+            return digest
+        return _combine(digest, self.recurrences.digest)
+
+    def _window(self, start, end):
+        """Bornes (dates) de l'expansion pour une plage de chaînes optionnelles"""
+        first, last = self.recurrences.first_day(), self.recurrences.last_day()
+        if first is None:
+            return None
+        lo = max(_bound(start), first) if start else first
+        if end:
+            hi = _bound(end)
+        else:
+            # horizon >= aujourd'hui : inutile de le calculer avant
+            hi = last if last <= self.today else min(last, self.horizon)
+        return (lo, hi) if lo <= hi else None
+
+    def occurrences(self, start=None, end=None):
+        """Générateur des (date, `Assignment`) des règles, hors dates de la table"""
+        window = self._window(start, end)
+        if window is None:
+            return
+        for day, entry in self.recurrences.occurrences(*window):
+            key = day.isoformat()
+            if key not in self.table:
+                yield key, entry
+
+    def get(self, date_str):
+        entry = self.table.get(date_str)
+        if entry is not None:
+            return entry
+        for _, entry in self.occurrences(date_str, date_str):
+            return entry.to_dict()
+        return None
+
+    def iter_items(self, start=None, end=None):
+        return heapq.merge(self.table.iter_items(start, end), self.occurrences(start, end), key=itemgetter(0))
+
+    def items(self, start=None, end=None):
+        return list(self.iter_items(start, end))
+
+    def range(self, start=None, end=None):
+        return {date_str: entry.to_dict() for date_str, entry in self.iter_items(start, end)}
+
+    def day_bounds(self):
+        """Comme `date_bounds`, en dates ; une borne enregistrée illisible est
+        ignorée (aujourd'hui s'il ne reste rien)"""
+        bounds = self.table.date_bounds()
+        window = self._window(None, None)
+        if bounds is None and window is None:
+            return None
+        days = [day for day in map(_stored_date, bounds or ()) if day] + list(window or ())
+        return (min(days), max(days)) if days else (self.today, self.today)
+
+    def date_bounds(self):
+        bounds = [b for b in (self.table.date_bounds(),) if b]
+        window = self._window(None, None)
+        if window is not None:
+            bounds.append(tuple(day.isoformat() for day in window))
+        if not bounds:
+            return None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
+
+    def stats(self, month=None):
+        """Comme `AssignmentTable.stats`, occurrences des règles comprises"""
+        cavaliers, work_types = (Counter(t) for t in self.table.stats(month))
+        if month is None:
+            start = end = None
+        else:
+            try:
+                year, number = int(month[:4]), int(month[5:7])
+                if len(month) != 7:
+                    raise ValueError(month)
+                last = calendar.monthrange(year, number)[1]
+            except ValueError:
+                return dict(cavaliers), dict(work_types)
+            start, end = f"{month}-01", f"{month}-{last:02d}"
+
+        for _, entry in self.occurrences(start, end):
+            cavaliers.update(entry.cavaliers)
+            if entry.work_type:
+                work_types[entry.work_type] += 1
+        return dict(cavaliers), dict(work_types)
+
+    def daily_counts(self, start, end):
+        """Sommes cumulées de la table corrigées des occurrences entre `start`
+        et `end` (dates) : exactes pour toute plage incluse dans celle-ci"""
+        corrections = {}
+        for date_str, entry in self.occurrences(start.isoformat(), end.isoformat()):
+            delta = corrections[date.fromisoformat(date_str).toordinal()] = (Counter(entry.cavaliers), Counter())
+            if entry.work_type:
+                delta[1][entry.work_type] += 1
+        counts = self.table.daily_counts()
+        return CorrectedDailyCounts(counts, corrections) if corrections else counts
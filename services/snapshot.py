@@ -0,0 +1,502 @@
+import bisect
+import heapq
+import json
+import mmap
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from datetime import date
+from services.indexes import (
+    _DIGEST_MASK, Assignment, AssignmentTable, CorrectedDailyCounts, DailyCounts, content_digest
+)
+
+MAGIC = b'HCSNAP01'
+_HEADER_LENGTH = struct.Struct('=I')
+# Par journée : début et nombre de ses identifiants de cavaliers, indice du
+# type de travail, début et longueur du commentaire (UTF-8)
+_RECORD = struct.Struct('=IHBxII')
+_ALIGN = 8
+_DIGEST_BYTES = 16
+
+
+class SnapshotError(ValueError):
+    """Instantané binaire illisible, ou données impossibles à y écrire"""
+
+
+def _padding(size):
+    return b'\0' * (-size % _ALIGN)
+
+
+def _ordinal(date_str):
+    """Ordinal d'une date YYYY-MM-DD, ou None si la chaîne n'est pas une date canonique"""
+    try:
+        day = date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+    return day.toordinal() if day.isoformat() == date_str else None
+
+
+def _month_number(month):
+    """Numéro d'un mois YYYY-MM (année * 12 + mois - 1)"""
+    if len(month) != 7 or month[4] != '-' or not (month[:4] + month[5:]).isdigit():
+        raise ValueError(f"Mois invalide : {month!r}")
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+
+def _encode_counts(cavaliers, work_types):
+    # Les identifiants de cavaliers sont des entiers : paires plutôt qu'objet JSON
+    return json.dumps({'cavaliers': sorted(cavaliers.items()), 'work_types': work_types},
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode_counts(data):
+    return Counter(dict(map(tuple, data['cavaliers']))), Counter(data['work_types'])
+
+
+def encode_snapshot(table, generation, source):
+    """Contenu binaire de l'instantané de `table` (une `AssignmentTable`).
+
+    Format : MAGIC, longueur puis en-tête JSON (génération, source, empreinte
+    et totaux de la table, position des sections), puis les sections
+    alignées sur 8 octets : ordinaux des dates (int32 triés), enregistrements
+    des journées, identifiants des cavaliers (int32), commentaires ; mois
+    (int32 triés), empreinte et compteurs de chaque mois ; sommes cumulées
+    par jour de chaque cavalier et type de travail (int32, voir
+    `DailyCounts`). Entiers dans l'ordre d'octets de la machine.
+    """
+    with table.lock:
+        items = table.items()
+        digest = table.digest
+        totals = table.stats()
+        months = []
+        for month in table.months():
+            cavaliers, work_types = table.stats(month)
+            months.append((_month_number(month), int(table.month_digest(month), 16), cavaliers, work_types))
+
+    work_types = ['']
+    work_type_index = {'': 0}
+    ordinals, ids = array('i'), array('i')
+    records, comments = bytearray(), bytearray()
+    for date_str, entry in items:
+        ordinal = _ordinal(date_str)
+        if ordinal is None:
+            raise SnapshotError(f"Date invalide : {date_str!r}")
+        if entry.work_type not in work_type_index:
+            work_type_index[entry.work_type] = len(work_types)
+            work_types.append(entry.work_type)
+        if len(work_types) > 256 or len(entry.cavaliers) > 0xFFFF:
+            raise SnapshotError(f"Journée trop grande pour l'instantané : {date_str}")
+        try:
+            comment = entry.comment.encode('utf-8')
+            records += _RECORD.pack(len(ids), len(entry.cavaliers), work_type_index[entry.work_type],
+                                    len(comments), len(comment))
+            ids.extend(entry.cavaliers)
+        except (AttributeError, TypeError, ValueError, OverflowError, struct.error) as e:
+            # Commentaire non textuel, identifiants hors int32... : JSON seul
+            raise SnapshotError(f"Journée {date_str} : {e}")
+        ordinals.append(ordinal)
+        comments += comment
+
+    # Compteurs de chaque mois : un petit document JSON lu à la demande
+    month_numbers, month_offsets = array('i'), array('i', [0])
+    month_digests, month_counts = bytearray(), bytearray()
+    for number, value, cavaliers, work_types_count in months:
+        month_numbers.append(number)
+        month_digests += value.to_bytes(_DIGEST_BYTES, 'big')
+        month_counts += _encode_counts(cavaliers, work_types_count)
+        month_offsets.append(len(month_counts))
+
+    daily = DailyCounts(dict(items))
+    sections = [('ordinals', ordinals.tobytes()), ('records', bytes(records)),
+                ('ids', ids.tobytes()), ('comments', bytes(comments)),
+                ('months', month_numbers.tobytes()), ('month_digests', bytes(month_digests)),
+                ('month_offsets', month_offsets.tobytes()), ('month_counts', bytes(month_counts))]
+    sections += [(f'cavalier:{key}', counts.tobytes()) for key, counts in daily.cavaliers.items()]
+    sections += [(f'work_type:{key}', counts.tobytes()) for key, counts in daily.work_types.items()]
+
+    positions, offset = {}, 0
+    for name, raw in sections:
+        positions[name] = (offset, len(raw))
+        offset += len(raw) + len(_padding(len(raw)))
+
+    header = json.dumps({
+        'generation': generation,
+        'source': source,
+        'byteorder': sys.byteorder,
+        'count': len(items),
+        'work_types': work_types,
+        'digest': digest,
+        'totals': json.loads(_encode_counts(*totals)),
+        'daily': {
+            'first': daily.first,
+            'length': daily.length,
+            'cavaliers': list(daily.cavaliers),
+            'work_types': list(daily.work_types),
+        },
+        'sections': positions,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    prefix = MAGIC + _HEADER_LENGTH.pack(len(header)) + header
+    parts = [prefix, _padding(len(prefix))]
+    for _, raw in sections:
+        parts += [raw, _padding(len(raw))]
+    return b''.join(parts)
+
+
+def _read_header(f):
+    prefix = f.read(len(MAGIC) + _HEADER_LENGTH.size)
+    if len(prefix) < len(MAGIC) + _HEADER_LENGTH.size or not prefix.startswith(MAGIC):
+        raise SnapshotError("En-tête d'instantané invalide")
+    length, = _HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+    try:
+        header = json.loads(f.read(length))
+    except ValueError as e:
+        raise SnapshotError(f"En-tête d'instantané invalide : {e}")
+    if header.get('byteorder') != sys.byteorder:
+        raise SnapshotError("Instantané écrit par une machine d'un autre boutisme")
+    return header, len(prefix) + length
+
+
+def read_header(path):
+    """En-tête d'un instantané (sans projeter les données), ou None s'il est absent ou illisible"""
+    try:
+        with open(path, 'rb') as f:
+            return _read_header(f)[0]
+    except (OSError, SnapshotError):
+        return None
+
+
+class MappedSnapshot:
+    """Instantané projeté en mémoire (lecture seule, sans copie).
+
+    Les pages du fichier sont partagées par tous les processus qui le
+    projettent, y compris les workers issus d'un fork du maître (gunicorn
+    --preload). Le fichier est remplacé par renommage : une projection reste
+    valide (ancienne génération) tant qu'elle est utilisée.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header, size = _read_header(f)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.generation = header['generation']
+        self.source = header['source']
+        self.count = header['count']
+        self.work_types = [sys.intern(w) for w in header['work_types']]
+        self.digest = int(header['digest'], 16)
+        self._totals = header['totals']
+        self._daily = header['daily']
+
+        start = size + len(_padding(size))
+        view = memoryview(self._mmap)
+        try:
+            self._sections = {
+                name: view[start + offset:start + offset + length]
+                for name, (offset, length) in header['sections'].items()
+            }
+            self.ordinals = self._sections['ordinals'].cast('i')
+            self.records = self._sections['records']
+            self.ids = self._sections['ids'].cast('i')
+            self.comments = self._sections['comments']
+            self.months = self._sections['months'].cast('i')
+            self._month_digests = self._sections['month_digests']
+            self._month_offsets = self._sections['month_offsets'].cast('i')
+            self._month_counts = self._sections['month_counts']
+        except (KeyError, TypeError, ValueError) as e:
+            raise SnapshotError(f"Sections d'instantané invalides : {e}")
+        if len(self.ordinals) != self.count or len(self.records) != self.count * _RECORD.size:
+            raise SnapshotError("Instantané tronqué")
+
+    @property
+    def size(self):
+        return len(self._mmap)
+
+    def totals(self):
+        """Séances par cavalier et par type de travail de tout l'instantané"""
+        return _decode_counts(self._totals)
+
+    def _month_index(self, month):
+        try:
+            number = _month_number(month)
+        except (TypeError, ValueError):
+            return -1
+        index = bisect.bisect_left(self.months, number)
+        return index if index < len(self.months) and self.months[index] == number else -1
+
+    def month_digest(self, month):
+        """Empreinte (entier) des journées d'un mois de l'instantané"""
+        index = self._month_index(month)
+        if index < 0:
+            return 0
+        return int.from_bytes(self._month_digests[index * _DIGEST_BYTES:(index + 1) * _DIGEST_BYTES], 'big')
+
+    def month_counts(self, month):
+        """Séances par cavalier et par type de travail d'un mois de l'instantané"""
+        index = self._month_index(month)
+        if index < 0:
+            return Counter(), Counter()
+        raw = self._month_counts[self._month_offsets[index]:self._month_offsets[index + 1]]
+        return _decode_counts(json.loads(bytes(raw)))
+
+    def month_names(self):
+        return [f"{number // 12:04d}-{number % 12 + 1:02d}" for number in self.months]
+
+    def daily_counts(self):
+        """Sommes cumulées par jour, lues dans la projection"""
+        daily = self._daily
+        return DailyCounts.from_arrays(
+            daily['first'], daily['length'],
+            {key: self._sections[f'cavalier:{key}'].cast('i') for key in daily['cavaliers']},
+            {key: self._sections[f'work_type:{key}'].cast('i') for key in daily['work_types']},
+        )
+
+    def date(self, index):
+        return date.fromordinal(self.ordinals[index]).isoformat()
+
+    def entry(self, index):
+        start, count, work_type, comment_start, comment_length = _RECORD.unpack_from(
+            self.records, index * _RECORD.size)
+        return Assignment(
+            self.ids[start:start + count],
+            str(self.comments[comment_start:comment_start + comment_length], 'utf-8'),
+            self.work_types[work_type],
+        )
+
+    def entries(self, lo, hi, as_dict=False):
+        """(date, journée) des indices `lo` à `hi`, décodées en un seul passage
+        (dictionnaires de l'API si `as_dict`)"""
+        ids, comments, work_types = self.ids, self.comments, self.work_types
+        fromordinal = date.fromordinal
+        records = _RECORD.iter_unpack(self.records[lo * _RECORD.size:hi * _RECORD.size])
+        result = []
+        for ordinal, (start, count, work_type, comment_start, comment_length) in zip(
+                self.ordinals[lo:hi], records):
+            comment = str(comments[comment_start:comment_start + comment_length], 'utf-8')
+            if as_dict:
+                entry = {'cavaliers': ids[start:start + count].tolist(),
+                         'comment': comment, 'work_type': work_types[work_type]}
+            else:
+                entry = Assignment(ids[start:start + count], comment, work_types[work_type])
+            result.append((fromordinal(ordinal).isoformat(), entry))
+        return result
+
+    def find(self, date_str):
+        """Position d'une date dans l'instantané, ou -1"""
+        ordinal = _ordinal(date_str)
+        if ordinal is None:
+            return -1
+        index = bisect.bisect_left(self.ordinals, ordinal)
+        return index if index < self.count and self.ordinals[index] == ordinal else -1
+
+    def bounds(self, start=None, end=None):
+        """Positions [lo, hi) des dates comprises entre `start` et `end` inclus
+        (comparaison de chaînes, comme `AssignmentTable.date_slice`)"""
+        key = lambda ordinal: date.fromordinal(ordinal).isoformat()
+        lo = bisect.bisect_left(self.ordinals, start, key=key) if start else 0
+        hi = bisect.bisect_right(self.ordinals, end, key=key) if end else self.count
+        return lo, max(lo, hi)
+
+
+class MappedAssignmentTable(AssignmentTable):
+    """`AssignmentTable` dont les journées sont lues dans un `MappedSnapshot`.
+
+    Les modifications postérieures à l'instantané (journal rejoué) sont
+    gardées à part : `_overlay` associe une date à sa nouvelle entrée, ou à
+    None si elle a été supprimée de l'instantané ; `_deltas` et
+    `_digest_deltas` les écarts des compteurs et empreintes de chaque mois,
+    ajoutés aux valeurs lues dans l'instantané. La mémoire du worker ne
+    dépend que du journal.
+    """
+
+    def __init__(self, snapshot):
+        self.lock = threading.RLock()
+        self.snapshot = snapshot
+        self._overlay = {}
+        self._added = []
+        self._size = snapshot.count
+        self._deltas = {}
+        self._digest = snapshot.digest
+        self._digest_deltas = {}
+        self._daily = None
+
+    def __len__(self):
+        return self._size
+
+    def _lookup(self, date):
+        if date in self._overlay:
+            return self._overlay[date]
+        index = self.snapshot.find(date)
+        return self.snapshot.entry(index) if index >= 0 else None
+
+    def __contains__(self, date):
+        with self.lock:
+            if date in self._overlay:
+                return self._overlay[date] is not None
+            return self.snapshot.find(date) >= 0
+
+    def get(self, date):
+        with self.lock:
+            record = self._lookup(date)
+        return record.to_dict() if record is not None else None
+
+    def put(self, date, entry):
+        entry = Assignment.from_dict(entry)
+        if entry is None:
+            return
+        with self.lock:
+            previous = self._lookup(date)
+            if previous is not None:
+                self._count(date, previous, -1)
+                self._hash(date, previous, -1)
+            else:
+                if self.snapshot.find(date) < 0:
+                    bisect.insort(self._added, date)
+                self._size += 1
+            self._overlay[date] = entry
+            self._count(date, entry, 1)
+            self._hash(date, entry, 1)
+            self._daily = None
+
+    def delete(self, date):
+        with self.lock:
+            previous = self._lookup(date)
+            if previous is None:
+                return
+            self._count(date, previous, -1)
+            self._hash(date, previous, -1)
+            self._size -= 1
+            if self.snapshot.find(date) >= 0:
+                self._overlay[date] = None
+            else:
+                del self._overlay[date]
+                del self._added[bisect.bisect_left(self._added, date)]
+            self._daily = None
+
+    def _count(self, date, entry, delta):
+        month = self._deltas.get(date[:7])
+        if month is None:
+            month = self._deltas[date[:7]] = {'cavaliers': Counter(), 'work_types': Counter()}
+        for cavalier in entry.cavaliers:
+            month['cavaliers'][cavalier] += delta
+        if entry.work_type:
+            month['work_types'][entry.work_type] += delta
+
+    def _hash(self, date, entry, sign):
+        h = sign * content_digest([date, entry.to_dict()])
+        self._digest = (self._digest + h) & _DIGEST_MASK
+        self._digest_deltas[date[:7]] = (self._digest_deltas.get(date[:7], 0) + h) & _DIGEST_MASK
+
+    def month_digest(self, month):
+        with self.lock:
+            value = self.snapshot.month_digest(month) + self._digest_deltas.get(month, 0)
+            return f"{value & _DIGEST_MASK:032x}"
+
+    def months(self):
+        with self.lock:
+            months = set(self.snapshot.month_names()) | set(self._deltas) | set(self._digest_deltas)
+            return sorted(m for m in months if int(self.month_digest(m), 16) or any(self.stats(m)))
+
+    def stats(self, month=None):
+        with self.lock:
+            if month is not None:
+                cavaliers, work_types = self.snapshot.month_counts(month)
+                deltas = [self._deltas[month]] if month in self._deltas else []
+            else:
+                cavaliers, work_types = self.snapshot.totals()
+                deltas = self._deltas.values()
+            for delta in deltas:
+                cavaliers.update(delta['cavaliers'])
+                work_types.update(delta['work_types'])
+            return (
+                {key: n for key, n in cavaliers.items() if n > 0},
+                {key: n for key, n in work_types.items() if n > 0},
+            )
+
+    def replace(self, assignments):
+        raise TypeError("Un instantané projeté ne se remplace pas : écrire un nouvel instantané")
+
+    def items(self, start=None, end=None, as_dict=False):
+        with self.lock:
+            lo, hi = self.snapshot.bounds(start, end)
+            base = self.snapshot.entries(lo, hi, as_dict)
+            if not self._overlay:
+                return base
+
+            a = bisect.bisect_left(self._added, start) if start else 0
+            b = bisect.bisect_right(self._added, end) if end else len(self._added)
+            added = [(date, None) for date in self._added[a:b]]
+
+            result = []
+            # Les dates ajoutées ne sont jamais dans l'instantané : pas d'égalité
+            for date, entry in heapq.merge(base, added, key=lambda item: item[0]):
+                if entry is None or date in self._overlay:
+                    entry = self._overlay[date]
+                    if entry is None:
+                        continue
+                    if as_dict:
+                        entry = entry.to_dict()
+                result.append((date, entry))
+            return result
+
+    def date_bounds(self):
+        with self.lock:
+            dates = [date for date in (self._first_base(), self._last_base()) if date]
+            if self._added:
+                dates += [self._added[0], self._added[-1]]
+            return (min(dates), max(dates)) if dates else None
+
+    def _first_base(self):
+        for index in range(self.snapshot.count):
+            date = self.snapshot.date(index)
+            if self._overlay.get(date, True) is not None:
+                return date
+        return None
+
+    def _last_base(self):
+        for index in range(self.snapshot.count - 1, -1, -1):
+            date = self.snapshot.date(index)
+            if self._overlay.get(date, True) is not None:
+                return date
+        return None
+
+    def copy(self):
+        return dict(self.items(as_dict=True))
+
+    def date_slice(self, start=None, end=None):
+        return [date for date, _ in self.items(start, end)]
+
+    def range(self, start=None, end=None):
+        return dict(self.items(start, end, as_dict=True))
+
+    def daily_counts(self):
+        """Sommes cumulées de l'instantané, corrigées des journées modifiées depuis"""
+        with self.lock:
+            if self._daily is None:
+                corrections = {}
+                for date, entry in self._overlay.items():
+                    ordinal = _ordinal(date)
+                    if ordinal is None:
+                        continue
+                    index = self.snapshot.find(date)
+                    delta = corrections[ordinal] = (Counter(), Counter())
+                    for record, sign in ((self.snapshot.entry(index) if index >= 0 else None, -1), (entry, 1)):
+                        if record is None:
+                            continue
+                        for cavalier in record.cavaliers:
+                            delta[0][cavalier] += sign
+                        if record.work_type:
+                            delta[1][record.work_type] += sign
+                self._daily = CorrectedDailyCounts(self.snapshot.daily_counts(), corrections)
+            return self._daily
+
+    def stats_info(self):
+        return {
+            'generation': self.snapshot.generation,
+            'mapped_bytes': self.snapshot.size,
+            'overlay': len(self._overlay),
+        }
+
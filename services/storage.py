@@ -0,0 +1,1026 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from services.indexes import AssignmentTable, CavalierTable, assign_cavalier_ids, copy_cavaliers
+from services.partitions import PartitionedTable, partition_key, split_by_partition
+from services.recurrence import RecurrenceTable
+from services.metrics import CACHE_REQUESTS, STORAGE_READ_BYTES, STORAGE_WRITTEN_BYTES, timed_json
+from services.snapshot import MappedAssignmentTable, MappedSnapshot, SnapshotError, encode_snapshot, read_header
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheCounters:
+    """Compteurs communs aux caches de lecture (monitoring)"""
+
+    # Étiquette "cache" de cache_requests_total
+    metric_name = 'cache'
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        CACHE_REQUESTS.inc(cache=self.metric_name, result=counter)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'entries': len(self._entries),
+            }
+
+
+class JsonFileCache(_CacheCounters):
+    """Cache par worker des fichiers JSON déjà parsés.
+
+    Une entrée est réutilisée tant que la signature (mtime_ns, taille, inode)
+    du fichier ne change pas, ce qui reste correct quand plusieurs workers
+    gunicorn écrivent dans les mêmes fichiers. Si le fichier a été modifié
+    juste avant sa lecture, la signature seule n'est pas fiable (résolution
+    de l'horloge du système de fichiers) : l'entrée est alors revalidée par
+    une empreinte du contenu, sans re-parser le JSON.
+    """
+
+    metric_name = 'json_files'
+
+    # Fenêtre pendant laquelle une signature est jugée ambiguë
+    RACY_WINDOW_NS = 1_000_000_000
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @classmethod
+    def _is_racy(cls, signature):
+        return time.time_ns() - signature[0] < cls.RACY_WINDOW_NS
+
+    @staticmethod
+    def _digest(raw):
+        return hashlib.blake2b(raw, digest_size=16).digest()
+
+    def get(self, path, parse):
+        """Retourner le contenu parsé de `path`, en ne relisant que si nécessaire"""
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+
+        raw = None
+        if entry is not None and entry['signature'] == signature:
+            if not entry['racy']:
+                self._count('hits')
+                return entry['data']
+
+            # Signature ambiguë : comparer le contenu plutôt que de re-parser
+            raw = _read_file(path)
+            if self._digest(raw) == entry['digest']:
+                entry['racy'] = self._is_racy(signature)
+                self._count('hits')
+                return entry['data']
+
+        if raw is None:
+            raw = _read_file(path)
+        with timed_json('parse', os.path.basename(path)):
+            data = parse(raw)
+        self._store(path, signature, raw, data)
+        self._count('misses' if entry is None else 'reloads')
+        return data
+
+    def put(self, path, raw, data):
+        """Enregistrer le contenu qui vient d'être écrit par ce worker"""
+        self._store(path, self._signature(path), raw, data)
+
+    def _store(self, path, signature, raw, data):
+        with self._lock:
+            self._entries[path] = {
+                'signature': signature,
+                'digest': self._digest(raw),
+                'racy': self._is_racy(signature),
+                'data': data,
+            }
+
+
+class VersionedCache(_CacheCounters):
+    """Cache par worker indexé par un numéro de version tenu par le stockage"""
+
+    metric_name = 'sqlite'
+
+    def get(self, key, version, load):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._count('hits')
+            return entry[1]
+
+        data = load()
+        with self._lock:
+            self._entries[key] = (version, data)
+        self._count('misses' if entry is None else 'reloads')
+        return data
+
+    def put(self, key, version, data):
+        """Enregistrer l'état complet qui vient d'être écrit en `version`"""
+        with self._lock:
+            self._entries[key] = (version, data)
+
+    def update(self, key, version, mutate):
+        """Appliquer une écriture locale au cache si aucune autre n'est intervenue"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version - 1:
+                mutate(entry[1])
+                self._entries[key] = (version, entry[1])
+            else:
+                self._entries.pop(key, None)
+
+
+def _parse_cavaliers(raw):
+    data = json.loads(raw)
+    return CavalierTable(data if isinstance(data, list) else [])
+
+
+def _parse_recurrences(raw):
+    data = json.loads(raw)
+    return RecurrenceTable(data if isinstance(data, list) else [])
+
+
+def _parse_assignments(raw):
+    data = json.loads(raw)
+    return data if isinstance(data, dict) else {}
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    STORAGE_READ_BYTES.inc(len(raw), file=os.path.basename(path))
+    return raw
+
+
+def _fsync_dir(path):
+    fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _replace_file(path, raw):
+    """Écrire `raw` dans un fichier temporaire puis le renommer sur `path`"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(path)
+    STORAGE_WRITTEN_BYTES.inc(len(raw), file=os.path.basename(path))
+
+
+def _journal_record(changes):
+    """Un enregistrement par sauvegarde : un lot tient sur une seule ligne,
+    il est donc rejoué entièrement ou pas du tout"""
+    if len(changes) == 1:
+        (date, entry), = changes.items()
+        if entry is None:
+            return {'op': 'del', 'date': date}
+        return {'op': 'put', 'date': date, 'entry': entry}
+    return {'op': 'batch', 'changes': changes}
+
+
+def _apply_journal_record(table, record):
+    op = record.get('op')
+    if op == 'put':
+        table.put(record['date'], record['entry'])
+    elif op == 'del':
+        table.delete(record['date'])
+    elif op == 'batch':
+        table.apply(record['changes'])
+
+
+class AssignmentsJournal(_CacheCounters):
+    """Instantané JSON des assignments + journal JSON-lines des modifications.
+
+    Une sauvegarde ajoute une ligne {"op": "put"|"del", "date": ..., "entry": ...}
+    (ou {"op": "batch", "changes": {date: entrée|null}} pour un lot) au journal au lieu de réécrire tout l'historique. La lecture rejoue le
+    journal sur l'instantané, de façon incrémentale d'un appel à l'autre : seules
+    les lignes ajoutées depuis la dernière lecture sont parsées. Au-delà de
+    `compact_bytes`, le journal est replié dans un nouvel instantané écrit à côté
+    puis renommé, et un journal vide le remplace.
+
+    Un verrou fcntl partagé protège lectures et ajouts (un ajout est un seul
+    write() en O_APPEND), le compactage prend le verrou exclusif.
+
+    Avec `mapped_file`, chaque compactage écrit aussi une nouvelle génération
+    d'instantané binaire (voir `services/snapshot.py`) que les workers
+    projettent en mémoire au lieu de parser assignments.json ; seul le
+    journal rejoué reste propre à chaque worker.
+    """
+
+    metric_name = 'journal'
+
+    def __init__(self, snapshot_file, journal_file, compact_bytes, mapped_file=None):
+        super().__init__()
+        self.snapshot_file = snapshot_file
+        self.mapped_file = mapped_file
+        self.journal_file = journal_file
+        self.lock_file = journal_file + '.lock'
+        self.compact_bytes = compact_bytes
+        self.replayed_records = 0
+        self._state = None
+        self._state_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, mode):
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            yield
+        finally:
+            os.close(fd)
+
+    def read(self):
+        """Instantané + journal rejoué, sous forme d'`AssignmentTable` partagée"""
+        with self._locked(fcntl.LOCK_SH):
+            return self._refresh()
+
+    def _refresh(self):
+        snapshot = _file_signature(self.snapshot_file)
+        journal = _file_signature(self.journal_file)
+        journal_ino = journal[2] if journal else None
+        journal_size = journal[1] if journal else 0
+
+        with self._state_lock:
+            state = self._state
+            # Un journal créé depuis la dernière lecture prolonge le même état
+            same_journal = state is not None and (
+                state['journal'] == journal_ino or (state['journal'] is None and state['offset'] == 0))
+            if same_journal and state['snapshot'] == snapshot and journal_size >= state['offset']:
+                self._count('hits')
+                if journal_size == state['offset']:
+                    return state['data']
+                data, offset = self._replay(state['data'], state['offset'])
+            else:
+                self._count('misses' if state is None else 'reloads')
+                data, offset = self._replay(self._load_snapshot(), 0)
+
+            self._state = {'snapshot': snapshot, 'journal': journal_ino, 'offset': offset, 'data': data}
+            return data
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_file):
+            return AssignmentTable()
+        if self.mapped_file:
+            table = self._map_snapshot()
+            if table is not None:
+                return table
+        raw = _read_file(self.snapshot_file)
+        with timed_json('parse', os.path.basename(self.snapshot_file)):
+            return AssignmentTable(_parse_assignments(raw))
+
+    def _replay(self, table, offset):
+        if not os.path.exists(self.journal_file):
+            return table, 0
+
+        with open(self.journal_file, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        STORAGE_READ_BYTES.inc(len(tail), file=os.path.basename(self.journal_file))
+
+        with timed_json('parse', os.path.basename(self.journal_file)):
+            for line in tail.splitlines(keepends=True):
+                # Ligne incomplète : un ajout est en cours (ou a été interrompu)
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    _apply_journal_record(table, json.loads(line))
+                    self.replayed_records += 1
+                except (ValueError, KeyError, AttributeError) as e:
+                    logger.warning("⚠️ Ligne de journal ignorée (%s): %s", self.journal_file, e)
+        return table, offset
+
+    def _map_snapshot(self):
+        """Projeter l'instantané binaire s'il correspond à assignments.json, sinon None"""
+        try:
+            snapshot = MappedSnapshot(self.mapped_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, SnapshotError) as e:
+            logger.warning("⚠️ Instantané ignoré (%s): %s", self.mapped_file, e)
+            return None
+        if snapshot.source != list(_file_signature(self.snapshot_file)):
+            return None
+        return MappedAssignmentTable(snapshot)
+
+    def _mapped_is_current(self):
+        if not self.mapped_file:
+            return True
+        header = read_header(self.mapped_file)
+        signature = _file_signature(self.snapshot_file)
+        return header is not None and signature is not None and header.get('source') == list(signature)
+
+    def append(self, records):
+        """Ajouter des enregistrements au journal (un seul write, puis fsync)"""
+        with timed_json('serialize', os.path.basename(self.journal_file)):
+            payload = b''.join(
+                json.dumps(r, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+                for r in records
+            )
+        with self._locked(fcntl.LOCK_SH):
+            fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload)
+                os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            STORAGE_WRITTEN_BYTES.inc(len(payload), file=os.path.basename(self.journal_file))
+            self._refresh()
+
+        if size > self.compact_bytes:
+            # Les enregistrements sont déjà dans le journal : un compactage en
+            # échec ne fait pas échouer l'écriture (retenté à la suivante)
+            try:
+                self.compact()
+            except Exception as e:
+                logger.exception("❌ Compactage en échec (%s): %s", self.journal_file, e)
+
+    def write(self, assignments):
+        """Remplacer tout l'historique (nouvel instantané, journal vidé)"""
+        with self._locked(fcntl.LOCK_EX):
+            self._write_snapshot(AssignmentTable(assignments))
+
+    def compact(self):
+        """Replier le journal dans l'instantané"""
+        with self._locked(fcntl.LOCK_EX):
+            journal = _file_signature(self.journal_file)
+            if (not journal or not journal[1]) and os.path.exists(self.snapshot_file) \
+                    and self._mapped_is_current():
+                return False
+            self._write_snapshot(self._refresh())
+        logger.info("✅ Journal compacté : %s", self.snapshot_file)
+        return True
+
+    def _write_snapshot(self, table):
+        # Appelé sous verrou exclusif. Un arrêt entre les deux renommages
+        # laisse un journal déjà inclus dans l'instantané : le rejouer ne
+        # change rien, chaque ligne portant l'état complet d'une date.
+        with timed_json('serialize', os.path.basename(self.snapshot_file)):
+            raw = json.dumps(table.copy(), ensure_ascii=False, indent=2).encode('utf-8')
+        _replace_file(self.snapshot_file, raw)
+        if self.mapped_file:
+            table = self._write_mapped(table)
+        _replace_file(self.journal_file, b'')
+        with self._state_lock:
+            self._state = {
+                'snapshot': _file_signature(self.snapshot_file),
+                'journal': _file_signature(self.journal_file)[2],
+                'offset': 0,
+                'data': table,
+            }
+
+    def _write_mapped(self, table):
+        # Nouvelle génération, liée à la version d'assignments.json qui vient
+        # d'être écrite ; retourne la table projetée (ou `table` en cas d'échec)
+        header = read_header(self.mapped_file)
+        generation = header['generation'] + 1 if header else 1
+        try:
+            raw = encode_snapshot(table, generation, list(_file_signature(self.snapshot_file)))
+        except SnapshotError as e:
+            logger.warning("⚠️ Instantané non écrit (%s): %s", self.mapped_file, e)
+            if os.path.exists(self.mapped_file):
+                os.remove(self.mapped_file)
+            return table
+        _replace_file(self.mapped_file, raw)
+        logger.info("✅ Instantané génération %d : %s", generation, self.mapped_file)
+        return MappedAssignmentTable(MappedSnapshot(self.mapped_file))
+
+    def stats(self):
+        stats = super().stats()
+        stats['entries'] = 1 if self._state is not None else 0
+        stats['replayed_records'] = self.replayed_records
+        if self._state is not None and isinstance(self._state['data'], MappedAssignmentTable):
+            stats['snapshot'] = self._state['data'].stats_info()
+        return stats
+
+
+class YearPartitions:
+    """Assignments d'un cheval découpés par année.
+
+    Chaque année est un `AssignmentsJournal` indépendant (<année>.json, son
+    journal <année>.journal.jsonl et, avec `shared_snapshot`, son instantané
+    binaire <année>.snapshot) : une écriture n'ajoute qu'au journal de son
+    année, un compactage ne réécrit que l'année concernée, et une lecture ne
+    relit que les années qu'elle demande (voir `PartitionedTable`).
+    """
+
+    PARTITION_FILE = re.compile(r'^(\d{4})\.(?:json|journal\.jsonl)$')
+
+    def __init__(self, directory, compact_bytes, shared_snapshot=False):
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self.shared_snapshot = shared_snapshot
+        self._journals = {}
+        self._years = None
+        self._lock = threading.Lock()
+
+    def snapshot_file(self, year):
+        return os.path.join(self.directory, f"{year}.json")
+
+    def journal(self, year):
+        with self._lock:
+            journal = self._journals.get(year)
+            if journal is None:
+                base = os.path.join(self.directory, year)
+                journal = self._journals[year] = AssignmentsJournal(
+                    base + '.json', base + '.journal.jsonl', self.compact_bytes,
+                    base + '.snapshot' if self.shared_snapshot else None
+                )
+            return journal
+
+    def years(self):
+        """Années ayant un instantané ou un journal, triées.
+
+        La liste est relue quand la signature du dossier change (une année
+        ajoutée y crée un fichier), ou si elle est trop récente pour en juger.
+        """
+        try:
+            st = os.stat(self.directory)
+        except FileNotFoundError:
+            return []
+        signature = (st.st_mtime_ns, st.st_ino)
+        with self._lock:
+            if self._years is not None and self._years[0] == signature:
+                return self._years[1]
+
+        years = sorted({m.group(1) for m in map(self.PARTITION_FILE.match, os.listdir(self.directory)) if m})
+        if not JsonFileCache._is_racy(signature):
+            with self._lock:
+                self._years = (signature, years)
+        return years
+
+    def table(self):
+        """Vue sur toutes les années, chacune lue à la demande"""
+        return PartitionedTable(self.years(), lambda year: self.journal(year).read())
+
+    def save(self, changes):
+        """Un ajout au journal de chaque année modifiée"""
+        os.makedirs(self.directory, exist_ok=True)
+        for year, part in sorted(split_by_partition(changes).items()):
+            self.journal(year).append([_journal_record(part)])
+
+    def write(self, assignments):
+        """Remplacer toutes les années (une année absente de `assignments` est vidée)"""
+        os.makedirs(self.directory, exist_ok=True)
+        parts = split_by_partition(assignments)
+        for year in sorted(set(parts) | set(self.years())):
+            self.journal(year).write(parts.get(year, {}))
+
+    def compact(self):
+        for year in self.years():
+            self.journal(year).compact()
+
+    def stats(self):
+        stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'replayed_records': 0}
+        snapshots = {}
+        with self._lock:
+            journals = dict(self._journals)
+        for year, journal in sorted(journals.items()):
+            for key, value in journal.stats().items():
+                if key == 'snapshot':
+                    snapshots[year] = value
+                else:
+                    stats[key] = stats.get(key, 0) + value
+        stats['partitions'] = len(journals)
+        if snapshots:
+            stats['snapshots'] = snapshots
+        return stats
+
+
+class JsonStorage:
+    """Stockage historique : fichiers JSON, un dossier par cheval.
+
+    Les cavaliers (fichier partagé par tous les chevaux) et les règles de
+    récurrence sont réécrits en entier (fichiers courts, écrits à côté puis
+    renommés) ; les assignments sont découpés par année, chaque année avec
+    son journal d'ajouts replié périodiquement (voir `YearPartitions`). Les
+    lectures passent par des caches invalidés sur la signature des fichiers.
+
+    `legacy_files` : (assignments.json, son journal, recurrences.json) d'avant
+    les chevaux, repris dans ce dossier à la première initialisation.
+    """
+
+    name = 'json'
+
+    def __init__(self, horse_dir, cavaliers_file, compact_bytes, shared_snapshot=False, legacy_files=None):
+        self.horse_dir = horse_dir
+        self.cavaliers_file = cavaliers_file
+        self.recurrences_file = os.path.join(horse_dir, 'recurrences.json')
+        self.legacy_files = legacy_files
+        self.cache = JsonFileCache()
+        self.partitions = YearPartitions(os.path.join(horse_dir, 'assignments'), compact_bytes, shared_snapshot)
+
+    def initialize(self, default_cavaliers):
+        """Créer les fichiers manquants (ou reprendre les fichiers d'avant les
+        chevaux), replier les journaux laissés au dernier arrêt et convertir
+        les noms de cavaliers en identifiants.
+
+        Retourne True si des données ont été converties.
+        """
+        if not os.path.exists(self.cavaliers_file):
+            self._dump(self.cavaliers_file, default_cavaliers)
+            logger.info("✅ Fichier créé : %s", self.cavaliers_file)
+
+        if not os.path.exists(self.recurrences_file):
+            legacy = self.legacy_files and self.legacy_files[2]
+            if legacy and os.path.exists(legacy):
+                _replace_file(self.recurrences_file, _read_file(legacy))
+                logger.info("✅ Règles reprises : %s → %s", legacy, self.recurrences_file)
+            else:
+                self._dump(self.recurrences_file, [])
+                logger.info("✅ Fichier créé : %s", self.recurrences_file)
+
+        if not os.path.isdir(self.partitions.directory):
+            self._create_partitions()
+
+        cavaliers, assignments, changed = assign_cavalier_ids(self.read_cavaliers(), self.read_assignments())
+        if changed:
+            # Nouvel instantané de chaque année (journal compris)
+            self.write_cavaliers(cavaliers)
+            self.partitions.write(assignments)
+            logger.info("✅ Cavaliers convertis en identifiants : %d cavaliers, %d dates",
+                        len(cavaliers), len(assignments))
+        else:
+            self.partitions.compact()
+        return changed
+
+    def _create_partitions(self):
+        # Années écrites dans un dossier temporaire renommé ensuite : une
+        # reprise interrompue est recommencée au démarrage suivant
+        assignments = {}
+        if self.legacy_files:
+            assignments_file, journal_file, _ = self.legacy_files
+            if os.path.exists(assignments_file) or os.path.exists(journal_file):
+                legacy = AssignmentsJournal(assignments_file, journal_file, self.partitions.compact_bytes)
+                assignments = legacy.read().copy()
+                logger.info("✅ Journées reprises : %s (%d dates)", assignments_file, len(assignments))
+
+        tmp = f"{self.partitions.directory}.{os.getpid()}.tmp"
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        YearPartitions(tmp, self.partitions.compact_bytes).write(assignments)
+        os.replace(tmp, self.partitions.directory)
+        _fsync_dir(self.partitions.directory)
+        logger.info("✅ Dossier créé : %s", self.partitions.directory)
+
+    def _dump(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with timed_json('serialize', os.path.basename(path)):
+            raw = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        _replace_file(path, raw)
+        return raw
+
+    def partition(self, date):
+        """Partition (année) des écritures d'une date"""
+        return partition_key(date)
+
+    def partition_keys(self):
+        return self.partitions.years()
+
+    def write_lock_file(self, dataset, partition=None):
+        """Fichier verrou des écritures d'un jeu de données ('cavaliers',
+        'recurrences' ou 'assignments', pour une année)"""
+        if dataset == 'cavaliers':
+            return self.cavaliers_file + '.lock'
+        if dataset == 'recurrences':
+            return self.recurrences_file + '.lock'
+        return self.partitions.snapshot_file(partition) + '.lock'
+
+    def cavaliers_table(self):
+        """Table partagée (lecture seule pour l'appelant)"""
+        if not os.path.exists(self.cavaliers_file):
+            logger.warning("⚠️ Fichier non trouvé : %s", self.cavaliers_file)
+            return CavalierTable([])
+        return self.cache.get(self.cavaliers_file, _parse_cavaliers)
+
+    def read_cavaliers(self):
+        return self.cavaliers_table().copy()
+
+    def write_cavaliers(self, cavaliers):
+        raw = self._dump(self.cavaliers_file, cavaliers)
+        self.cache.put(self.cavaliers_file, raw, CavalierTable(copy_cavaliers(cavaliers)))
+
+    def recurrences_table(self):
+        """Règles partagées (lecture seule pour l'appelant)"""
+        if not os.path.exists(self.recurrences_file):
+            return RecurrenceTable([])
+        return self.cache.get(self.recurrences_file, _parse_recurrences)
+
+    def read_recurrences(self):
+        return self.recurrences_table().copy()
+
+    def write_recurrences(self, recurrences):
+        raw = self._dump(self.recurrences_file, recurrences)
+        self.cache.put(self.recurrences_file, raw, RecurrenceTable(json.loads(raw)))
+
+    def assignments_table(self):
+        """Vue partagée sur les années (lecture seule pour l'appelant)"""
+        return self.partitions.table()
+
+    def read_assignments(self):
+        return self.assignments_table().copy()
+
+    def read_assignments_range(self, start, end):
+        return self.assignments_table().range(start, end)
+
+    def write_assignments(self, assignments):
+        self.partitions.write(assignments)
+
+    def save_assignments(self, changes):
+        """Créer/remplacer (ou supprimer si l'entrée vaut None) plusieurs dates,
+        en un seul ajout au journal de chaque année concernée"""
+        if changes:
+            self.partitions.save(changes)
+
+    def cache_stats(self):
+        stats = self.cache.stats()
+        for key, value in self.partitions.stats().items():
+            stats[key] = value if isinstance(value, dict) else stats.get(key, 0) + value
+        return stats
+
+    def file_info(self):
+        return {
+            'cavaliers': _path_info(self.cavaliers_file),
+            'recurrences': _path_info(self.recurrences_file),
+            'assignments': _path_info(self.partitions.directory),
+            'partitions': self.partitions.years(),
+        }
+
+
+class SqliteStorage:
+    """Stockage SQLite (mode WAL) : une ligne par date, les identifiants des
+    cavaliers d'une journée dans une table de jointure.
+
+    Une écriture d'une journée ne touche que ses lignes (tables WITHOUT ROWID,
+    donc triées par date sur le disque). Les lectures passent par une
+    `AssignmentTable` en cache, tenue à jour tant que le compteur de version
+    de la base ne signale pas d'écriture d'un autre processus.
+
+    Une base par cheval ; les cavaliers sont ceux de la base du cheval par
+    défaut (voir `DataService`).
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS cavaliers (
+            position INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            color TEXT NOT NULL DEFAULT '',
+            start_date TEXT NOT NULL DEFAULT '',
+            end_date TEXT NOT NULL DEFAULT '',
+            id INTEGER NOT NULL DEFAULT 0,
+            archived INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS assignments (
+            date TEXT PRIMARY KEY,
+            work_type TEXT NOT NULL DEFAULT '',
+            comment TEXT NOT NULL DEFAULT ''
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS assignment_cavaliers (
+            date TEXT NOT NULL REFERENCES assignments(date) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            cavalier_id INTEGER NOT NULL,
+            PRIMARY KEY (date, position)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_assignment_cavaliers_cavalier
+            ON assignment_cavaliers (cavalier_id, date);
+
+        CREATE TABLE IF NOT EXISTS recurrences (
+            position INTEGER PRIMARY KEY,
+            rule TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cache = VersionedCache()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        # Une connexion ne doit pas traverser un fork (workers gunicorn)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA foreign_keys = ON')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self, immediate=False):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def initialize(self, default_cavaliers):
+        """Créer le schéma (et les cavaliers par défaut sur une base neuve), et
+        convertir une base où les journées désignent les cavaliers par leur nom.
+
+        Retourne True si des données ont été converties.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.executescript(self.SCHEMA)
+        with self._transaction(immediate=True) as conn:
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('assignments_version', 0)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('cavaliers_version', 0)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('recurrences_version', 0)")
+            is_new = conn.execute("SELECT value FROM meta WHERE key = 'cavaliers_version'").fetchone()[0] == 0
+            changed = self._migrate_names(conn)
+        if is_new and not self.read_cavaliers():
+            self.write_cavaliers(default_cavaliers)
+            logger.info("✅ Base créée : %s", self.path)
+        return changed
+
+    def _migrate_names(self, conn):
+        # Base antérieure aux identifiants : colonnes id/archived ajoutées
+        # (à 0) et noms de la table assignment_riders
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(cavaliers)')}
+        if 'id' not in columns:
+            conn.execute('ALTER TABLE cavaliers ADD COLUMN id INTEGER NOT NULL DEFAULT 0')
+            conn.execute('ALTER TABLE cavaliers ADD COLUMN archived INTEGER NOT NULL DEFAULT 0')
+
+        legacy = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'assignment_riders'"
+        ).fetchone() is not None
+        missing_ids = conn.execute('SELECT 1 FROM cavaliers WHERE id = 0 LIMIT 1').fetchone() is not None
+        if not legacy and not missing_ids:
+            return False
+
+        cavaliers = [
+            {'name': name, 'color': color, 'start_date': start_date, 'end_date': end_date,
+             'id': cavalier_id or None, 'archived': bool(archived)}
+            for name, color, start_date, end_date, cavalier_id, archived in conn.execute(
+                'SELECT name, color, start_date, end_date, id, archived FROM cavaliers ORDER BY position')
+        ]
+        for c in cavaliers:
+            if not c['archived']:
+                del c['archived']
+
+        assignments = {}
+        if legacy:
+            for date, rider in conn.execute('SELECT date, rider FROM assignment_riders ORDER BY date, position'):
+                assignments.setdefault(date, {'cavaliers': []})['cavaliers'].append(rider)
+
+        cavaliers, assignments, _ = assign_cavalier_ids(cavaliers, assignments)
+        self._insert_cavaliers(conn, cavaliers)
+        conn.executemany(
+            'INSERT OR REPLACE INTO assignment_cavaliers (date, position, cavalier_id) VALUES (?, ?, ?)',
+            [(date, position, cavalier_id)
+             for date, entry in assignments.items()
+             for position, cavalier_id in enumerate(entry['cavaliers'])]
+        )
+        conn.execute('DROP TABLE IF EXISTS assignment_riders')
+        self._bump_version(conn, 'cavaliers_version')
+        self._bump_version(conn, 'assignments_version')
+        logger.info("✅ Cavaliers convertis en identifiants : %d cavaliers, %d dates",
+                    len(cavaliers), len(assignments))
+        return True
+
+    @staticmethod
+    def _version(conn, key):
+        return conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()[0]
+
+    @staticmethod
+    def _bump_version(conn, key):
+        conn.execute('UPDATE meta SET value = value + 1 WHERE key = ?', (key,))
+        return SqliteStorage._version(conn, key)
+
+    # --- Cavaliers ---
+
+    def cavaliers_table(self):
+        """Table partagée (lecture seule pour l'appelant)"""
+        conn = self._connection()
+        version = self._version(conn, 'cavaliers_version')
+        return self.cache.get('cavaliers', version, self._load_cavaliers)
+
+    def read_cavaliers(self):
+        return self.cavaliers_table().copy()
+
+    def _load_cavaliers(self):
+        with self._transaction() as conn:
+            rows = conn.execute(
+                'SELECT id, name, color, start_date, end_date, archived FROM cavaliers ORDER BY position'
+            ).fetchall()
+        cavaliers = []
+        for cavalier_id, name, color, start_date, end_date, archived in rows:
+            cavalier = {'id': cavalier_id, 'name': name, 'color': color, 'start_date': start_date, 'end_date': end_date}
+            if archived:
+                cavalier['archived'] = True
+            cavaliers.append(cavalier)
+        return CavalierTable(cavaliers)
+
+    @staticmethod
+    def _insert_cavaliers(conn, cavaliers):
+        conn.execute('DELETE FROM cavaliers')
+        conn.executemany(
+            'INSERT INTO cavaliers (position, id, name, color, start_date, end_date, archived) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [
+                (position, c['id'], c['name'], c.get('color', ''), c.get('start_date', ''),
+                 c.get('end_date', ''), int(bool(c.get('archived'))))
+                for position, c in enumerate(cavaliers)
+            ]
+        )
+
+    def write_cavaliers(self, cavaliers):
+        with self._transaction(immediate=True) as conn:
+            self._insert_cavaliers(conn, cavaliers)
+            version = self._bump_version(conn, 'cavaliers_version')
+        self.cache.put('cavaliers', version, CavalierTable(copy_cavaliers(cavaliers)))
+
+    # --- Règles de récurrence ---
+
+    def recurrences_table(self):
+        """Règles partagées (lecture seule pour l'appelant)"""
+        conn = self._connection()
+        version = self._version(conn, 'recurrences_version')
+        return self.cache.get('recurrences', version, self._load_recurrences)
+
+    def read_recurrences(self):
+        return self.recurrences_table().copy()
+
+    def _load_recurrences(self):
+        # Une règle par ligne, en JSON : jours, exceptions et cavaliers sont des listes
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT rule FROM recurrences ORDER BY position').fetchall()
+        return RecurrenceTable([json.loads(rule) for rule, in rows])
+
+    def write_recurrences(self, recurrences):
+        with self._transaction(immediate=True) as conn:
+            conn.execute('DELETE FROM recurrences')
+            conn.executemany(
+                'INSERT INTO recurrences (position, rule) VALUES (?, ?)',
+                [(position, json.dumps(rule, ensure_ascii=False)) for position, rule in enumerate(recurrences)]
+            )
+            version = self._bump_version(conn, 'recurrences_version')
+        self.cache.put('recurrences', version, RecurrenceTable([dict(r) for r in recurrences]))
+
+    # --- Assignments ---
+
+    def assignments_table(self):
+        """Table partagée (lecture seule pour l'appelant)"""
+        conn = self._connection()
+        version = self._version(conn, 'assignments_version')
+        return self.cache.get('assignments', version, self._load_assignments)
+
+    def read_assignments(self):
+        return self.assignments_table().copy()
+
+    def read_assignments_range(self, start, end):
+        return self.assignments_table().range(start, end)
+
+    def _load_assignments(self):
+        with self._transaction() as conn:
+            rows = conn.execute(
+                'SELECT date, work_type, comment FROM assignments ORDER BY date'
+            ).fetchall()
+            riders = conn.execute(
+                'SELECT date, cavalier_id FROM assignment_cavaliers ORDER BY date, position'
+            ).fetchall()
+
+        assignments = {
+            date: {'cavaliers': [], 'comment': comment, 'work_type': work_type}
+            for date, work_type, comment in rows
+        }
+        for date, cavalier_id in riders:
+            assignments[date]['cavaliers'].append(cavalier_id)
+        return AssignmentTable(assignments)
+
+    @staticmethod
+    def _upsert(conn, date, entry):
+        if entry is None:
+            conn.execute('DELETE FROM assignments WHERE date = ?', (date,))
+            return
+        conn.execute(
+            'INSERT INTO assignments (date, work_type, comment) VALUES (?, ?, ?) '
+            'ON CONFLICT (date) DO UPDATE SET work_type = excluded.work_type, comment = excluded.comment',
+            (date, entry.get('work_type', ''), entry.get('comment', ''))
+        )
+        conn.execute('DELETE FROM assignment_cavaliers WHERE date = ?', (date,))
+        conn.executemany(
+            'INSERT INTO assignment_cavaliers (date, position, cavalier_id) VALUES (?, ?, ?)',
+            [(date, position, cavalier_id) for position, cavalier_id in enumerate(entry.get('cavaliers', []))]
+        )
+
+    def save_assignments(self, changes):
+        """Créer/remplacer (ou supprimer si l'entrée vaut None) plusieurs dates,
+        dans une seule transaction"""
+        with self._transaction(immediate=True) as conn:
+            for date, entry in changes.items():
+                self._upsert(conn, date, entry)
+            version = self._bump_version(conn, 'assignments_version')
+        self.cache.update('assignments', version, lambda table: table.apply(changes))
+
+    def write_assignments(self, assignments):
+        with self._transaction(immediate=True) as conn:
+            conn.execute('DELETE FROM assignments')
+            for date, entry in assignments.items():
+                self._upsert(conn, date, entry)
+            version = self._bump_version(conn, 'assignments_version')
+        self.cache.put('assignments', version, AssignmentTable(assignments))
+
+    def partition(self, date):
+        """Une seule partition : une transaction ne verrouille de toute façon
+        que la base du cheval"""
+        return None
+
+    def partition_keys(self):
+        return [None]
+
+    def write_lock_file(self, dataset, partition=None):
+        """Fichier verrou des écritures d'un jeu de données ('cavaliers',
+        'recurrences' ou 'assignments')"""
+        return f"{self.path}.{dataset}.lock"
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def file_info(self):
+        return {'sqlite': _path_info(self.path)}
+
+
+def _path_info(path):
+    exists = os.path.exists(path)
+    return {
+        'exists': exists,
+        'path': path,
+        'readable': os.access(path, os.R_OK) if exists else False,
+        'writable': os.access(path, os.W_OK) if exists else False,
+    }
+
+
+def create_storage(config, horse, backend=None):
+    """Instancier le moteur de stockage d'un cheval (celui de la configuration
+    par défaut)"""
+    backend = backend or config.STORAGE_BACKEND
+    directory = os.path.join(config.HORSES_DIR, horse)
+    default = horse == config.DEFAULT_HORSE
+    if backend == 'sqlite':
+        return SqliteStorage(config.SQLITE_FILE if default else os.path.join(directory, 'planning.sqlite3'))
+    if backend == 'json':
+        return JsonStorage(
+            directory, config.CAVALIERS_FILE, config.JOURNAL_COMPACT_BYTES, config.SHARED_SNAPSHOT,
+            (config.ASSIGNMENTS_FILE, config.ASSIGNMENTS_JOURNAL_FILE, config.RECURRENCES_FILE) if default else None
+        )
+    raise ValueError(f"Moteur de stockage inconnu : {backend}")
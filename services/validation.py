@@ -1,3 +1,18 @@
+import re
+from datetime import date
+
+# Types de travail proposés par l'interface (templates/index.html)
+WORK_TYPES = ('longe', 'liberte', 'repos', 'plat', 'cso', 'balade', 'tap')
+
+# Formats stricts : les dates servent de clés triées et sont découpées
+# par position (année, mois)
+ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+ISO_MONTH = re.compile(r'^\d{4}-\d{2}$')
+
+# Identifiant d'un cheval : segment d'URL (/api/<cheval>/...) et nom de dossier
+HORSE_ID = re.compile(r'^[a-z0-9][a-z0-9_-]{0,31}$')
+
+
 class ValidationService:
     """Service pour valider les données"""
 
@@ -45,6 +60,33 @@ class ValidationService:
 
         return True, None
 
+    @staticmethod
+    def validate_iso_date(date_str):
+        """Valider une date réelle écrite exactement YYYY-MM-DD (vide acceptée)"""
+        if not date_str:
+            return True, None
+        if not isinstance(date_str, str) or not ISO_DATE.match(date_str):
+            return False, "Format de date invalide (YYYY-MM-DD attendu)"
+        valid, error = ValidationService.validate_date(date_str)
+        if not valid:
+            return False, error
+        try:
+            date.fromisoformat(date_str)
+        except ValueError:
+            return False, f"Date inexistante : {date_str}"
+        return True, None
+
+    @staticmethod
+    def validate_month(month_str):
+        """Valider un mois au format YYYY-MM"""
+        if not isinstance(month_str, str):
+            return False, "Le mois doit être une chaîne"
+
+        if not ISO_MONTH.match(month_str):
+            return False, "Format de mois invalide (YYYY-MM attendu)"
+
+        return ValidationService.validate_date(month_str + '-01')
+
     @staticmethod
     def validate_date_range(start_date, end_date):
         """Valider une plage de dates"""
@@ -52,6 +94,22 @@ class ValidationService:
             return False, "La date de fin doit être après la date de début"
         return True, None
 
+    @staticmethod
+    def validate_work_type(work_type):
+        """Valider un type de travail (vide accepté)"""
+        if not work_type:
+            return True, None
+        if not isinstance(work_type, str) or work_type not in WORK_TYPES:
+            return False, f"Type de travail inconnu : {work_type}"
+        return True, None
+
+    @staticmethod
+    def validate_horse_id(horse_id):
+        """Valider l'identifiant d'un cheval (minuscules, chiffres, - et _)"""
+        if not isinstance(horse_id, str) or not HORSE_ID.match(horse_id):
+            return False, "Identifiant de cheval invalide (a-z, 0-9, - et _, 32 caractères au plus)"
+        return True, None
+
     @staticmethod
     def validate_cavalier_data(data):
         """Valider toutes les données d'un cavalier"""
@@ -0,0 +1,257 @@
+import atexit
+import fcntl
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from services.metrics import WRITE_FLUSH_LAG
+
+logger = logging.getLogger(__name__)
+
+
+class WriteRejected(Exception):
+    """Modification refusée au vu de l'état courant (relu sous verrou)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+# Modes d'enregistrement (voir Config.DURABILITY)
+DURABILITIES = ('sync', 'batched', 'async')
+
+
+class _Ticket:
+    __slots__ = ('mutation', 'result', 'error', 'done', 'queued')
+
+    def __init__(self, mutation):
+        self.mutation = mutation
+        self.result = None
+        self.error = None
+        self.done = False
+        self.queued = time.monotonic()
+
+
+class WriteCoordinator:
+    """Chemin d'écriture d'un jeu de données, sûr entre workers gunicorn.
+
+    Une écriture prend un verrou fcntl exclusif, relit l'état courant sous ce
+    verrou (`load`), y applique la modification (`apply`) puis enregistre une
+    seule fois (`persist` : fichier temporaire renommé + fsync, ou transaction).
+    Deux workers ne peuvent donc plus écraser mutuellement leurs modifications.
+
+    Les écritures qui arrivent pendant qu'un enregistrement est en cours dans
+    le même worker sont mises en file : le prochain meneur les applique toutes
+    dans l'ordre d'arrivée et ne fait qu'un enregistrement pour le groupe.
+    `apply` doit laisser l'état intact quand il lève une exception, pour qu'une
+    modification refusée n'affecte pas les autres du groupe.
+
+    `publish(state)`, facultatif, est appelé sous le verrou après chaque
+    enregistrement (flux des modifications) ; son échec n'annule pas l'écriture.
+
+    `durability` : avec 'sync', le thread de la requête enregistre lui-même.
+    Avec 'batched' et 'async', un thread du worker enregistre les écritures
+    en attente `flush_interval` secondes après la première d'entre elles ;
+    'batched' attend cet enregistrement (plus d'écritures par fsync), 'async'
+    retourne aussitôt (écritures perdues si le processus est tué avant,
+    voir `flush_on_exit`). Un enregistrement différé qui échoue est retenté
+    au suivant.
+    """
+
+    def __init__(self, lock_file, load, apply, persist, publish=None, durability='sync', flush_interval=0):
+        if durability not in DURABILITIES:
+            raise ValueError(f"Mode d'enregistrement inconnu : {durability}")
+        self.lock_file = lock_file
+        self._load = load
+        self._apply = apply
+        self._persist = persist
+        self._publish = publish
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._queue = []
+        self._committing = False
+        self._flusher = None
+        self.commits = 0
+        self.writes = 0
+        self.lag = 0.0
+
+    @contextmanager
+    def exclusive(self):
+        """Verrou inter-processus de ce jeu de données"""
+        os.makedirs(os.path.dirname(self.lock_file) or '.', exist_ok=True)
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def submit(self, mutation):
+        """Appliquer `mutation` et attendre qu'elle soit enregistrée.
+
+        Retourne le résultat de `apply`, ou relève son exception (en mode
+        'async' : None, sans attendre l'enregistrement).
+        """
+        return self.result(self.enqueue(mutation))
+
+    def enqueue(self, mutation):
+        """Mettre `mutation` en file sans attendre l'enregistrement différé
+        (en mode 'sync', l'enregistrer aussitôt) ; voir `result`"""
+        ticket = _Ticket(mutation)
+        with self._cond:
+            self._queue.append(ticket)
+            if self.durability != 'sync':
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._run, name=f"flush:{os.path.basename(self.lock_file)}", daemon=True)
+                    self._flusher.start()
+                self._cond.notify_all()
+                return ticket
+
+            while self._committing and not ticket.done:
+                self._cond.wait()
+            if not ticket.done:
+                # Ce thread devient meneur pour tout ce qui attend
+                self._committing = True
+                group, self._queue = self._queue, []
+
+        if not ticket.done:
+            try:
+                self._commit(group)
+            finally:
+                with self._cond:
+                    self._committing = False
+                    self._cond.notify_all()
+        return ticket
+
+    def result(self, ticket):
+        """Attendre l'enregistrement d'une modification mise en file (sauf en
+        mode 'async') ; retourne le résultat de `apply` ou relève son exception"""
+        if self.durability == 'async':
+            return None
+        with self._cond:
+            while not ticket.done:
+                self._cond.wait()
+        if ticket.error is not None:
+            raise ticket.error
+        return ticket.result
+
+    def _run(self):
+        # Thread d'enregistrement différé ('batched' et 'async')
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                wait = self._queue[0].queued + self.flush_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            if self.flush() is not None:
+                # Échec (disque plein...) : ne pas retenter en boucle
+                time.sleep(max(self.flush_interval, 1))
+
+    def flush(self):
+        """Enregistrer sans attendre les écritures en attente (et attendre
+        celui en cours) ; retourne l'exception d'un échec, sinon None"""
+        with self._cond:
+            while self._committing:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            self._committing = True
+            group, self._queue = self._queue, []
+
+        error = None
+        try:
+            error = self._commit(group)
+        finally:
+            with self._cond:
+                if error is not None and self.durability == 'async':
+                    # Personne n'attend ces écritures : les garder pour le suivant
+                    logger.error("❌ Enregistrement différé en échec (%s), %d écritures retenues : %s",
+                                 self.lock_file, len(group), error)
+                    retry = [ticket for ticket in group if ticket.error is error]
+                    for ticket in retry:
+                        ticket.error, ticket.done = None, False
+                    self._queue[:0] = retry
+                self._committing = False
+                self._cond.notify_all()
+        return error
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue) + (1 if self._committing else 0)
+
+    def _commit(self, group):
+        """Enregistrer un groupe ; retourne l'exception qui l'a fait échouer
+        en entier (verrou ou enregistrement), sinon None"""
+        try:
+            with self.exclusive():
+                state = self._load()
+                applied = []
+                for ticket in group:
+                    try:
+                        ticket.result = self._apply(state, ticket.mutation)
+                        applied.append(ticket)
+                    except Exception as e:
+                        ticket.error = e
+                if applied:
+                    self._persist(state)
+                    self.commits += 1
+                    self.writes += len(applied)
+                    self.lag = time.monotonic() - min(t.queued for t in applied)
+                    WRITE_FLUSH_LAG.observe(self.lag, durability=self.durability)
+                    self.publish(state)
+        except Exception as e:
+            for ticket in group:
+                if ticket.error is None:
+                    ticket.error = e
+            return e
+        finally:
+            with self._cond:
+                for ticket in group:
+                    ticket.done = True
+
+    def publish(self, state):
+        """Signaler un enregistrement (appelé sous le verrou exclusif)"""
+        if self._publish is None:
+            return
+        try:
+            self._publish(state)
+        except Exception as e:
+            logger.warning("⚠️ Modification enregistrée mais non publiée (%s): %s", self.lock_file, e)
+
+    def stats(self):
+        return {
+            'commits': self.commits,
+            'writes': self.writes,
+            'durability': self.durability,
+            'pending': self.pending(),
+            'lag_ms': round(self.lag * 1000, 1),
+        }
+
+
+def flush_on_exit(flush):
+    """Appeler `flush` à la sortie du processus, y compris sur SIGTERM/SIGINT.
+
+    Le gestionnaire de signal ne fait que terminer le processus proprement
+    (celui déjà installé, p. ex. par gunicorn, ou SystemExit) : `flush` est
+    appelé par atexit, hors du gestionnaire, qui a pu interrompre un thread
+    tenant un verrou.
+    """
+    atexit.register(flush)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(signum)
+        if previous in (signal.SIG_IGN, None):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            if callable(previous):
+                return previous(signum, frame)
+            raise SystemExit(128 + signum)
+        signal.signal(signum, handler)
@@ -1,5 +1,5 @@
 const API_URL = '/api';
-let editingIndex = null;
+let editingId = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     loadCavaliers();
@@ -38,7 +38,8 @@ document.addEventListener('DOMContentLoaded', function() {
 async function loadCavaliers() {
     try {
         const response = await fetch(API_URL + '/cavaliers');
-        const cavaliers = await response.json();
+        // Les cavaliers supprimés restent archivés pour l'historique
+        const cavaliers = (await response.json()).filter(c => !c.archived);
 
         const list = document.getElementById('cavaliersList');
         list.innerHTML = '';
@@ -50,7 +51,7 @@ async function loadCavaliers() {
 
         const today = new Date().toISOString().split('T')[0];
 
-        cavaliers.forEach((cavalier, index) => {
+        cavaliers.forEach(cavalier => {
             const li = document.createElement('li');
 
             // Info principale
@@ -65,7 +66,7 @@ async function loadCavaliers() {
             colorPicker.className = 'cavalier-color-indicator';
             colorPicker.value = cavalier.color || '#667eea';
             colorPicker.title = 'Changer la couleur';
-            colorPicker.addEventListener('change', () => updateCavalierColor(index, colorPicker.value));
+            colorPicker.addEventListener('change', () => updateCavalierColor(cavalier.id, colorPicker.value));
 
             const name = document.createElement('span');
             name.textContent = cavalier.name;
@@ -88,12 +89,12 @@ async function loadCavaliers() {
             const editBtn = document.createElement('button');
             editBtn.className = 'edit-btn';
             editBtn.textContent = '📅 Dates';
-            editBtn.addEventListener('click', () => openEditModal(index, cavalier));
+            editBtn.addEventListener('click', () => openEditModal(cavalier));
 
             const deleteBtn = document.createElement('button');
             deleteBtn.className = 'delete-btn';
             deleteBtn.textContent = 'Supprimer';
-            deleteBtn.addEventListener('click', () => deleteCavalier(index));
+            deleteBtn.addEventListener('click', () => deleteCavalier(cavalier.id));
 
             actions.appendChild(editBtn);
             actions.appendChild(deleteBtn);
@@ -162,8 +163,8 @@ function formatDate(dateStr) {
     return date.toLocaleDateString('fr-FR', { day: 'numeric', month: 'long', year: 'numeric' });
 }
 
-function openEditModal(index, cavalier) {
-    editingIndex = index;
+function openEditModal(cavalier) {
+    editingId = cavalier.id;
     document.getElementById('editCavalierName').textContent = cavalier.name;
     document.getElementById('editStartDate').value = cavalier.start_date || '';
     document.getElementById('editEndDate').value = cavalier.end_date || '';
@@ -181,7 +182,7 @@ async function saveEdit() {
             return;
         }
 
-        const response = await fetch(API_URL + '/cavaliers/' + editingIndex, {
+        const response = await fetch(API_URL + '/cavaliers/' + editingId, {
             method: 'PUT',
             headers: {
                 'Content-Type': 'application/json'
@@ -259,13 +260,13 @@ async function addCavalier() {
     }
 }
 
-async function deleteCavalier(index) {
+async function deleteCavalier(id) {
     if (!confirm('Voulez-vous vraiment supprimer ce cavalier ?')) {
         return;
     }
 
     try {
-        const response = await fetch(API_URL + '/cavaliers/' + index, {
+        const response = await fetch(API_URL + '/cavaliers/' + id, {
             method: 'DELETE'
         });
 
@@ -282,9 +283,9 @@ async function deleteCavalier(index) {
     }
 }
 
-async function updateCavalierColor(index, color) {
+async function updateCavalierColor(id, color) {
     try {
-        const response = await fetch(API_URL + '/cavaliers/' + index, {
+        const response = await fetch(API_URL + '/cavaliers/' + id, {
             method: 'PUT',
             headers: {
                 'Content-Type': 'application/json'
@@ -3,12 +3,16 @@ let currentDate = new Date();
 let selectedDate = null;
 let allAssignments = {};
 let allCavaliers = [];
-let colorByName = new Map();
+let cavalierById = new Map();
+let activeByDate = {};
+let changeStream = null;
 
 // ===== INITIALISATION =====
 document.addEventListener('DOMContentLoaded', function() {
     initializeApp();
     setupEventListeners();
+    // Le flux démarre avant le chargement : aucune modification n'est manquée
+    startLiveUpdates();
     loadData();
 });
 
@@ -19,15 +23,8 @@ function initializeApp() {
 }
 
 function setupEventListeners() {
-    document.getElementById('prevMonth').addEventListener('click', () => {
-        currentDate.setMonth(currentDate.getMonth() - 1);
-        renderCalendar();
-    });
-
-    document.getElementById('nextMonth').addEventListener('click', () => {
-        currentDate.setMonth(currentDate.getMonth() + 1);
-        renderCalendar();
-    });
+    document.getElementById('prevMonth').addEventListener('click', () => changeMonth(-1));
+    document.getElementById('nextMonth').addEventListener('click', () => changeMonth(1));
 
     const modal = document.getElementById('modal');
     const closeBtn = document.querySelector('.close');
@@ -74,8 +71,7 @@ function setupEventListeners() {
 async function loadData() {
     showLoading();
     try {
-        await loadCavaliers();
-        await loadAssignments();
+        await loadMonth();
     } catch (error) {
         console.error('Erreur lors du chargement des données:', error);
         showToast('❌ Erreur de chargement des données');
@@ -84,18 +80,92 @@ async function loadData() {
     }
 }
 
-async function loadCavaliers() {
-    const resp = await fetch(API_URL + '/cavaliers');
-    if (!resp.ok) throw new Error('Erreur réseau cavaliers');
-    allCavaliers = await resp.json();
-    colorByName = new Map(allCavaliers.map(c => [c.name, c.color]));
+// Vue du mois affiché en une seule requête : cavaliers, journées et
+// cavaliers actifs de chaque jour de la grille
+async function loadMonth() {
+    const year = currentDate.getFullYear();
+    const month = currentDate.getMonth() + 1;
+    const resp = await fetch(API_URL + '/calendar/' + year + '/' + month);
+    if (!resp.ok) throw new Error('Erreur réseau calendrier');
+    const data = await resp.json();
+
+    allCavaliers = data.cavaliers;
+    cavalierById = new Map(allCavaliers.map(c => [c.id, c]));
+
+    Object.keys(allAssignments).forEach(dateKey => {
+        if (dateKey >= data.from && dateKey <= data.to) delete allAssignments[dateKey];
+    });
+    Object.assign(allAssignments, data.assignments);
+
+    activeByDate = {};
+    Object.entries(data.active).forEach(([dateKey, ids]) => {
+        activeByDate[dateKey] = ids.map(id => cavalierById.get(id)).filter(Boolean);
+    });
+    renderCalendar();
 }
 
-async function loadAssignments() {
-    const resp = await fetch(API_URL + '/assignments');
-    if (!resp.ok) throw new Error('Erreur réseau assignments');
-    allAssignments = await resp.json();
+async function changeMonth(delta) {
+    currentDate.setDate(1);
+    currentDate.setMonth(currentDate.getMonth() + delta);
     renderCalendar();
+    try {
+        await loadMonth();
+    } catch (error) {
+        console.error('Erreur lors du chargement des données:', error);
+        showToast('❌ Erreur de chargement des données');
+    }
+}
+
+// Applique la réponse d'un POST /assignments?return=entry
+function applySavedEntry(data) {
+    if (data.entry) {
+        allAssignments[data.date] = data.entry;
+    } else {
+        delete allAssignments[data.date];
+    }
+}
+
+// ===== MISES À JOUR EN DIRECT =====
+// Les modifications des autres utilisateurs arrivent par SSE ; le navigateur
+// se reconnecte seul en reprenant après le dernier événement reçu.
+function startLiveUpdates() {
+    if (!window.EventSource || changeStream) return;
+    changeStream = new EventSource(API_URL + '/changes/stream');
+    changeStream.addEventListener('change', (e) => applyChange(JSON.parse(e.data)));
+    changeStream.addEventListener('reset', () => loadData());
+}
+
+function applyChange(change) {
+    if (change.dataset === 'assignments' && change.changes) {
+        Object.entries(change.changes).forEach(([dateKey, entry]) => {
+            if (entry) {
+                allAssignments[dateKey] = entry;
+            } else {
+                delete allAssignments[dateKey];
+            }
+        });
+        renderCalendar();
+        if (isModalOpen() && selectedDate in change.changes) {
+            displayAssignedCavaliers();
+            loadCavalierButtons();
+        }
+    } else if (change.dataset === 'cavaliers' && change.cavaliers) {
+        allCavaliers = change.cavaliers;
+        cavalierById = new Map(allCavaliers.map(c => [c.id, c]));
+        loadMonth().then(() => {
+            if (isModalOpen()) loadCavalierButtons();
+        }).catch(error => console.error('Erreur:', error));
+    } else if (change.dataset === 'recurrences') {
+        // Journées répétées : la vue du mois les développe côté serveur
+        loadMonth().catch(error => console.error('Erreur:', error));
+    } else if (change.reset) {
+        loadData();
+    }
+}
+
+function isModalOpen() {
+    const modal = document.getElementById('modal');
+    return modal && modal.style.display === 'block';
 }
 
 // ===== UTILITAIRES =====
@@ -106,8 +176,19 @@ function getDateKey(year, month, day) {
     return year + '-' + monthStr + '-' + dayStr;
 }
 
-function getCavalierColor(name) {
-    return colorByName.get(name) || '#667eea';
+function toDateKey(date) {
+    return getDateKey(date.getFullYear(), date.getMonth(), date.getDate());
+}
+
+// Les journées désignent les cavaliers par identifiant
+function getCavalierColor(id) {
+    const cavalier = cavalierById.get(id);
+    return (cavalier && cavalier.color) || '#667eea';
+}
+
+function getCavalierName(id) {
+    const cavalier = cavalierById.get(id);
+    return cavalier ? cavalier.name : '#' + id;
 }
 
 function getWorkTypeIcon(workType) {
@@ -258,13 +339,13 @@ function createDayElement(day, isOtherMonth, year, month, container) {
                 badge.style.borderLeft = '4px solid ' + getCavalierColor(cavalier);
 
                 const nameSpan = document.createElement('span');
-                nameSpan.textContent = cavalier;
-                nameSpan.title = cavalier;
+                nameSpan.textContent = getCavalierName(cavalier);
+                nameSpan.title = getCavalierName(cavalier);
                 badge.appendChild(nameSpan);
 
                 const removeBtn = document.createElement('button');
                 removeBtn.className = 'remove-btn';
-                removeBtn.setAttribute('aria-label', `Retirer ${cavalier}`);
+                removeBtn.setAttribute('aria-label', `Retirer ${getCavalierName(cavalier)}`);
                 removeBtn.textContent = '×';
                 removeBtn.onclick = function(event) {
                     event.stopPropagation();
@@ -350,7 +431,7 @@ function renderMobileList() {
                     const cavalierDiv = document.createElement('div');
                     cavalierDiv.className = 'list-cavalier';
                     cavalierDiv.style.borderLeft = '4px solid ' + getCavalierColor(cavalier);
-                    cavalierDiv.textContent = cavalier;
+                    cavalierDiv.textContent = getCavalierName(cavalier);
                     detailsCol.appendChild(cavalierDiv);
                 });
             }
@@ -419,10 +500,13 @@ function closeModal() {
 // ===== CAVALIERS BUTTONS =====
 async function loadCavalierButtons() {
     try {
-        const response = await fetch(API_URL + '/cavaliers/active?date=' + selectedDate);
-        if (!response.ok) throw new Error('Erreur réseau');
+        let cavaliers = activeByDate[selectedDate];
+        if (!cavaliers) {
+            const response = await fetch(API_URL + '/cavaliers/active?date=' + selectedDate);
+            if (!response.ok) throw new Error('Erreur réseau');
+            cavaliers = await response.json();
+        }
 
-        const cavaliers = await response.json();
         const buttonsDiv = document.getElementById('cavalierButtons');
         buttonsDiv.innerHTML = '';
 
@@ -434,7 +518,7 @@ async function loadCavalierButtons() {
         const assignedCavaliers = allAssignments[selectedDate]?.cavaliers || [];
 
         cavaliers.forEach(cavalier => {
-            const isAssigned = assignedCavaliers.includes(cavalier.name);
+            const isAssigned = assignedCavaliers.includes(cavalier.id);
 
             const button = document.createElement('button');
             button.className = 'cavalier-btn';
@@ -446,7 +530,7 @@ async function loadCavalierButtons() {
             button.setAttribute('aria-pressed', isAssigned ? 'true' : 'false');
 
             if (!isAssigned) {
-                button.addEventListener('click', () => addCavalierToDay(cavalier.name));
+                button.addEventListener('click', () => addCavalierToDay(cavalier.id));
             }
 
             buttonsDiv.appendChild(button);
@@ -476,13 +560,13 @@ function displayAssignedCavaliers() {
         item.style.borderLeft = '4px solid ' + getCavalierColor(cavalier);
 
         const nameSpan = document.createElement('span');
-        nameSpan.textContent = cavalier;
+        nameSpan.textContent = getCavalierName(cavalier);
         item.appendChild(nameSpan);
 
         const removeIcon = document.createElement('span');
         removeIcon.className = 'remove-icon';
         removeIcon.setAttribute('role', 'button');
-        removeIcon.setAttribute('aria-label', `Retirer ${cavalier}`);
+        removeIcon.setAttribute('aria-label', `Retirer ${getCavalierName(cavalier)}`);
         removeIcon.textContent = '×';
         removeIcon.onclick = () => removeCavalierFromDay(selectedDate, index);
         item.appendChild(removeIcon);
@@ -514,7 +598,7 @@ async function addCavalierToDay(cavalier) {
 
         cavaliers.push(cavalier);
 
-        const response = await fetch(API_URL + '/assignments', {
+        const response = await fetch(API_URL + '/assignments?return=entry', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -529,7 +613,7 @@ async function addCavalierToDay(cavalier) {
         const data = await response.json();
 
         if (data.success) {
-            allAssignments = data.assignments;
+            applySavedEntry(data);
             displayAssignedCavaliers();
             loadCavalierButtons();
             renderCalendar();
@@ -562,7 +646,7 @@ async function removeCavalierFromDay(date, index) {
 
         cavaliers.splice(index, 1);
 
-        const response = await fetch(API_URL + '/assignments', {
+        const response = await fetch(API_URL + '/assignments?return=entry', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -577,7 +661,7 @@ async function removeCavalierFromDay(date, index) {
         const data = await response.json();
 
         if (data.success) {
-            allAssignments = data.assignments;
+            applySavedEntry(data);
             if (selectedDate === date) {
                 displayAssignedCavaliers();
                 loadCavalierButtons();
@@ -602,7 +686,7 @@ async function saveComment() {
         const cavaliers = allAssignments[selectedDate]?.cavaliers || [];
         const work_type = allAssignments[selectedDate]?.work_type || '';
 
-        const response = await fetch(API_URL + '/assignments', {
+        const response = await fetch(API_URL + '/assignments?return=entry', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -617,7 +701,7 @@ async function saveComment() {
         const data = await response.json();
 
         if (data.success) {
-            allAssignments = data.assignments;
+            applySavedEntry(data);
             renderCalendar();
             showToast('💾 Commentaire enregistré');
         } else {
@@ -640,7 +724,7 @@ async function saveWorkType() {
         const cavaliers = allAssignments[selectedDate]?.cavaliers || [];
         const comment = allAssignments[selectedDate]?.comment || '';
 
-        const response = await fetch(API_URL + '/assignments', {
+        const response = await fetch(API_URL + '/assignments?return=entry', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -655,7 +739,7 @@ async function saveWorkType() {
         const data = await response.json();
 
         if (data.success) {
-            allAssignments = data.assignments;
+            applySavedEntry(data);
             renderCalendar();
             showToast('✅ Type de travail enregistré');
         } else {
@@ -77,15 +77,19 @@ function displayCavalierStats(stats, cavaliersData) {
     // Trier par nombre de séances décroissant
     const sorted = Object.entries(stats).sort((a, b) => b[1] - a[1]);
 
-    sorted.forEach(([cavalier, count]) => {
+    // Les statistiques sont indexées par identifiant de cavalier
+    const byId = new Map(cavaliersData.map(c => [String(c.id), c]));
+
+    sorted.forEach(([cavalierId, count]) => {
         const item = document.createElement('div');
         item.className = 'stat-item';
 
         const left = document.createElement('div');
         left.className = 'stat-item-left';
 
-        const cavalierData = cavaliersData.find(c => c.name === cavalier);
+        const cavalierData = byId.get(cavalierId);
         const color = cavalierData ? cavalierData.color : '#667eea';
+        const cavalier = cavalierData ? cavalierData.name : '#' + cavalierId;
 
         const colorDiv = document.createElement('div');
         colorDiv.className = 'stat-color';
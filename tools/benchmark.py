@@ -0,0 +1,439 @@
+"""Mesure des performances des routes sur des données générées.
+
+Usage : python -m tools.benchmark [--backend sqlite] [--riders 50 --years 20]
+            [--durability async] [--requests 200] [--output benchmark.json] [--compare ancien.json]
+
+Les données (voir tools/generate_data.py) sont écrites dans un dossier
+temporaire vers lequel pointe Config ; les données réelles ne sont pas
+touchées. Chaque route est appelée via le client de test Flask :
+
+- charge "read" : chaque lecture, `--requests` fois ;
+- charge "write" : chaque écriture, `--requests` fois ;
+- charge "mixed" : lectures et écritures tirées au hasard (10 % d'écritures).
+
+Pour chaque route : latences p50/p95/p99/moyenne (ms) et requêtes/s.
+Le scénario "concurrent" lance `--writers` processus qui écrivent en même
+temps (comme des workers gunicorn) puis vérifie qu'aucune écriture n'a été
+perdue. Les résultats sont enregistrés en JSON ; --compare signale les
+routes plus lentes qu'un résultat précédent.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from config import Config
+from tools.generate_data import WORK_TYPES, generate, write_data
+
+# Écritures du scénario concurrent : dates libres dans les données générées
+CONCURRENT_YEAR = 2099
+MIXED_WRITE_RATIO = 0.1
+# --compare : écart signalé au-delà de ce rapport
+REGRESSION_RATIO = 1.2
+
+
+def configure(data_dir, backend, shared_snapshot=False, durability='sync'):
+    """Faire pointer Config vers `data_dir` (à appeler avant d'importer l'application)"""
+    Config.DATA_DIR = data_dir
+    Config.ASSIGNMENTS_FILE = os.path.join(data_dir, 'assignments.json')
+    Config.CAVALIERS_FILE = os.path.join(data_dir, 'cavaliers.json')
+    Config.RECURRENCES_FILE = os.path.join(data_dir, 'recurrences.json')
+    Config.ASSIGNMENTS_JOURNAL_FILE = os.path.join(data_dir, 'assignments.journal.jsonl')
+    Config.HORSES_DIR = os.path.join(data_dir, 'horses')
+    Config.SHARED_SNAPSHOT = shared_snapshot
+    Config.SQLITE_FILE = os.path.join(data_dir, 'planning.sqlite3')
+    Config.CHANGES_LOG_FILE = os.path.join(data_dir, 'changes.jsonl')
+    Config.METRICS_DIR = os.path.join(data_dir, 'metrics')
+    Config.STORAGE_BACKEND = backend
+    Config.DURABILITY = durability
+
+
+def reset_worker():
+    """Oublier le stockage du processus (après fork : comme un nouveau worker)"""
+    from services.data_service import DataService
+    DataService._horses = None
+    DataService._cavaliers = None
+    DataService._changes = None
+
+
+class Context:
+    """Paramètres tirés au hasard pour construire les requêtes"""
+
+    def __init__(self, cavaliers, assignments, seed):
+        self.rng = random.Random(seed)
+        self.ids = [c['id'] for c in cavaliers]
+        dates = sorted(assignments)
+        self.first = date.fromisoformat(dates[0])
+        self.last = date.fromisoformat(dates[-1])
+        # Règle de récurrence modifiée par 'recurrence_update' (voir `prepare`)
+        self.recurrence_id = None
+
+    def day(self):
+        return self.first + timedelta(days=self.rng.randrange((self.last - self.first).days + 1))
+
+    def entry(self, day):
+        return {
+            'date': day.isoformat(),
+            'cavaliers': self.rng.sample(self.ids, min(len(self.ids), self.rng.randint(1, 3))),
+            'comment': '',
+            'work_type': self.rng.choice(WORK_TYPES),
+        }
+
+
+def _window(ctx, days):
+    start = ctx.day()
+    return start.isoformat(), (start + timedelta(days=days)).isoformat()
+
+
+def _range_args(ctx, days):
+    start, end = _window(ctx, days)
+    return f"from={start}&to={end}"
+
+
+def _rule(ctx):
+    # Règle hebdomadaire sur toute la période des données générées
+    return {
+        'frequency': 'weekly',
+        'weekdays': ctx.rng.sample(range(7), ctx.rng.randint(1, 3)),
+        'start_date': ctx.first.isoformat(),
+        'end_date': ctx.last.isoformat(),
+        'cavaliers': [ctx.rng.choice(ctx.ids)],
+        'work_type': ctx.rng.choice(WORK_TYPES),
+    }
+
+
+def _import_body(ctx, rows):
+    # Fichier JSON-lines de `rows` journées (corps brut, pas du JSON)
+    return ''.join(json.dumps(ctx.entry(ctx.day())) + '\n' for _ in range(rows)).encode('utf-8')
+
+
+def prepare(client, ctx):
+    """Données des routes ajoutées depuis : une règle de récurrence et un
+    second cheval (pour /api/horses/load)"""
+    response = client.post('/api/recurrences', json=_rule(ctx))
+    ctx.recurrence_id = response.get_json()['recurrence']['id']
+    client.post('/api/horses', json={'id': 'bench', 'name': 'Bench'})
+    client.post('/api/bench/assignments/batch', json={'changes': [ctx.entry(ctx.day()) for _ in range(50)]})
+
+
+# nom -> (méthode, fonction(ctx) -> (url, corps JSON))
+READS = {
+    'assignments_all': ('GET', lambda ctx: ('/api/assignments', None)),
+    'assignments_month': ('GET', lambda ctx: (f"/api/assignments?month={ctx.day().strftime('%Y-%m')}", None)),
+    'assignments_range': ('GET', lambda ctx: (f"/api/assignments?{_range_args(ctx, 41)}", None)),
+    'cavaliers': ('GET', lambda ctx: ('/api/cavaliers', None)),
+    'cavaliers_active_date': ('GET', lambda ctx: (f"/api/cavaliers/active?date={ctx.day().isoformat()}", None)),
+    'cavaliers_active_range': ('GET', lambda ctx: (f"/api/cavaliers/active?{_range_args(ctx, 41)}", None)),
+    'stats_all': ('GET', lambda ctx: ('/api/stats', None)),
+    'stats_month': ('GET', lambda ctx: (ctx.day().strftime('/api/stats?month=%m&year=%Y'), None)),
+    'stats_range': ('GET', lambda ctx: (f"/api/stats/range?{_range_args(ctx, 365)}&granularity=week", None)),
+    'calendar_month': ('GET', lambda ctx: (ctx.day().strftime('/api/calendar/%Y/%m'), None)),
+    'changes_since': ('GET', lambda ctx: ('/api/changes?since=0', None)),
+    'system_cache': ('GET', lambda ctx: ('/api/system/cache', None)),
+    'metrics': ('GET', lambda ctx: ('/metrics', None)),
+    'export_csv': ('GET', lambda ctx: (f"/api/export.csv?{_range_args(ctx, 365)}", None)),
+    'export_ics': ('GET', lambda ctx: (f"/api/export.ics?{_range_args(ctx, 41)}", None)),
+    'recurrences': ('GET', lambda ctx: ('/api/recurrences', None)),
+    'history_date': ('GET', lambda ctx: (f"/api/history?date={ctx.day().isoformat()}", None)),
+    'assignments_as_of': ('GET', lambda ctx: (
+        f"/api/assignments?as_of={time.time() - ctx.rng.randrange(60)}&{_range_args(ctx, 41)}", None)),
+    'horses': ('GET', lambda ctx: ('/api/horses', None)),
+    'horses_load': ('GET', lambda ctx: (f"/api/horses/load?{_range_args(ctx, 365)}", None)),
+}
+
+WRITES = {
+    'assignment_save': ('POST', lambda ctx: ('/api/assignments?return=entry', ctx.entry(ctx.day()))),
+    'assignment_batch': ('POST', lambda ctx: (
+        '/api/assignments/batch',
+        {'changes': [ctx.entry(ctx.day()) for _ in range(10)]}
+    )),
+    'cavalier_update': ('PUT', lambda ctx: (
+        f"/api/cavaliers/{ctx.rng.choice(ctx.ids)}",
+        {'color': '#%06x' % ctx.rng.randrange(0x1000000)}
+    )),
+    'recurrence_update': ('PUT', lambda ctx: (f"/api/recurrences/{ctx.recurrence_id}", _rule(ctx))),
+    'import_jsonl': ('POST', lambda ctx: ('/api/import?format=jsonl', _import_body(ctx, 10))),
+}
+
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (`values` triées)"""
+    if not values:
+        return None
+    rank = min(len(values), max(1, math.ceil(pct / 100 * len(values)))) - 1
+    return values[rank]
+
+
+def summarize(latencies, errors):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(total / len(latencies) * 1000, 3),
+        'rps': round(len(latencies) / total, 1) if total else None,
+    }
+
+
+def call(client, endpoint, ctx):
+    """Exécuter une requête ; retourne (durée en s, succès)"""
+    method, build = endpoint
+    url, body = build(ctx)
+    # Corps brut (fichier importé) ou JSON
+    payload = {'data': body} if isinstance(body, bytes) else {'json': body}
+    started = time.perf_counter()
+    response = client.open(url, method=method, **payload)
+    response.get_data()
+    return time.perf_counter() - started, response.status_code < 400
+
+
+def run_workload(client, endpoints, ctx, requests, warmup, plan=None):
+    """Appeler chaque route `requests` fois (ou suivre `plan`, une liste de
+    noms) ; retourne les résultats par route et le débit global"""
+    for name, endpoint in endpoints.items():
+        for _ in range(warmup):
+            call(client, endpoint, ctx)
+
+    if plan is None:
+        plan = [name for name in endpoints for _ in range(requests)]
+    latencies = {name: [] for name in endpoints}
+    errors = dict.fromkeys(endpoints, 0)
+
+    started = time.perf_counter()
+    for name in plan:
+        elapsed, ok = call(client, endpoints[name], ctx)
+        latencies[name].append(elapsed)
+        if not ok:
+            errors[name] += 1
+    wall = time.perf_counter() - started
+
+    return {
+        'requests': len(plan),
+        'elapsed_s': round(wall, 3),
+        'rps': round(len(plan) / wall, 1) if wall else None,
+        'endpoints': {name: summarize(values, errors[name]) for name, values in latencies.items() if values},
+    }
+
+
+def mixed_plan(ctx, requests):
+    """Suite de noms de routes : MIXED_WRITE_RATIO d'écritures"""
+    reads, writes = list(READS), list(WRITES)
+    total = requests * (len(reads) + len(writes))
+    return [ctx.rng.choice(writes if ctx.rng.random() < MIXED_WRITE_RATIO else reads) for _ in range(total)]
+
+
+def _concurrent_writer(index, writes, barrier, results):
+    reset_worker()
+    from app import create_app
+    client = create_app().test_client()
+    first = date(CONCURRENT_YEAR, 1, 1) + timedelta(days=index * writes)
+    rider_ids = [c['id'] for c in client.get('/api/cavaliers').get_json() if not c.get('archived')]
+    rng = random.Random(index)
+    errors = 0
+
+    barrier.wait()
+    started = time.perf_counter()
+    for k in range(writes):
+        # Une date propre à chaque écriture : elle doit être présente à la fin
+        response = client.post('/api/assignments?return=entry', json={
+            'date': (first + timedelta(days=k)).isoformat(),
+            'cavaliers': [rng.choice(rider_ids)],
+            'work_type': rng.choice(WORK_TYPES),
+        })
+        errors += response.status_code >= 400
+        # Liste des cavaliers relue et réécrite à chaque ajout
+        if k % 5 == 0:
+            response = client.post('/api/cavaliers', json={'name': f"Bench {index}-{k}", 'color': '#123456'})
+            errors += response.status_code >= 400
+    # Arrêt du worker (un processus multiprocessing ne passe pas par atexit)
+    from services.data_service import DataService
+    DataService.flush()
+    results.put((index, time.perf_counter() - started, errors))
+
+
+def run_concurrent(writers, writes):
+    """`writers` processus écrivent en parallèle ; compte les écritures perdues"""
+    # Plus d'écriture différée en cours au fork (un verrou tenu y resterait pris)
+    from services.data_service import DataService
+    DataService.flush()
+    mp = multiprocessing.get_context('fork')
+    barrier = mp.Barrier(writers)
+    results = mp.Queue()
+    processes = [mp.Process(target=_concurrent_writer, args=(i, writes, barrier, results))
+                 for i in range(writers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+
+    # Relire depuis le stockage, comme un nouveau worker
+    reset_worker()
+    assignments = DataService.read_assignments()
+    names = {c['name'] for c in DataService.read_cavaliers()}
+
+    expected_dates = [(date(CONCURRENT_YEAR, 1, 1) + timedelta(days=i * writes + k)).isoformat()
+                      for i in range(writers) for k in range(writes)]
+    expected_names = [f"Bench {i}-{k}" for i in range(writers) for k in range(0, writes, 5)]
+    lost_dates = [d for d in expected_dates if d not in assignments]
+    lost_names = [n for n in expected_names if n not in names]
+    total = len(expected_dates) + len(expected_names)
+
+    return {
+        'writers': writers,
+        'writes': total,
+        'errors': sum(errors for _, _, errors in outcomes),
+        'elapsed_s': round(wall, 3),
+        'writes_per_s': round(total / max(elapsed for _, elapsed, _ in outcomes), 1),
+        'lost_assignments': len(lost_dates),
+        'lost_cavaliers': len(lost_names),
+        'lost_examples': (lost_dates + lost_names)[:10],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=Config.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    """Lignes signalant les routes dont p50 ou p95 a augmenté de plus de REGRESSION_RATIO"""
+    lines = []
+    for key in ('backend', 'data'):
+        if previous.get(key) != results[key]:
+            lines.append(f"⚠️ {key} différent : {previous.get(key)} → {results[key]} (comparaison peu significative)")
+    for workload, current in results['workloads'].items():
+        before = previous.get('workloads', {}).get(workload, {}).get('endpoints', {})
+        for name, stats in current['endpoints'].items():
+            old = before.get(name)
+            if not old:
+                continue
+            for key in ('p50_ms', 'p95_ms'):
+                if old.get(key) and stats[key] > old[key] * REGRESSION_RATIO:
+                    lines.append(f"⚠️ {workload}/{name} {key} : {old[key]} → {stats[key]} "
+                                 f"(x{stats[key] / old[key]:.2f})")
+    return lines
+
+
+def print_report(results):
+    for workload, data in results['workloads'].items():
+        print(f"\n== {workload} : {data['requests']} requêtes, {data['rps']} req/s")
+        print(f"{'route':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'erreurs':>9}")
+        for name, stats in data['endpoints'].items():
+            print(f"{name:<26}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+                  f"{stats['rps']:>10}{stats['errors']:>9}")
+    concurrent = results.get('concurrent')
+    if concurrent:
+        status = '✅' if not concurrent['lost_assignments'] and not concurrent['lost_cavaliers'] else '❌'
+        print(f"\n{status} Écritures concurrentes : {concurrent['writers']} processus, "
+              f"{concurrent['writes']} écritures, {concurrent['lost_assignments']} journées et "
+              f"{concurrent['lost_cavaliers']} cavaliers perdus")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesurer les performances des routes sur des données générées")
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--shared-snapshot', action='store_true',
+                        help="moteur json : instantané binaire projeté en mémoire (SHARED_SNAPSHOT)")
+    parser.add_argument('--durability', choices=['sync', 'batched', 'async'], default='sync',
+                        help="enregistrement des journées (voir Config.DURABILITY)")
+    parser.add_argument('--riders', type=int, default=50)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--per-day', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help="requêtes par route et par charge")
+    parser.add_argument('--warmup', type=int, default=5, help="requêtes non mesurées par route")
+    parser.add_argument('--workloads', default='read,write,mixed',
+                        help="charges à exécuter parmi read, write, mixed")
+    parser.add_argument('--writers', type=int, default=4, help="processus du scénario concurrent (0 : ignoré)")
+    parser.add_argument('--writes', type=int, default=50, help="écritures par processus concurrent")
+    parser.add_argument('--output', default='benchmark.json', help="fichier de résultats JSON")
+    parser.add_argument('--compare', help="résultats précédents à comparer")
+    args = parser.parse_args(argv)
+
+    workloads = [w for w in args.workloads.split(',') if w]
+    unknown = set(workloads) - {'read', 'write', 'mixed'}
+    if unknown:
+        print(f"❌ Charge inconnue : {', '.join(sorted(unknown))}")
+        return 1
+
+    data_dir = tempfile.mkdtemp(prefix='horse-calendar-bench-')
+    try:
+        cavaliers, assignments = generate(args.riders, args.years, args.per_day, seed=args.seed)
+        write_data(data_dir, cavaliers, assignments)
+        configure(data_dir, args.backend, args.shared_snapshot, args.durability)
+        if args.backend == 'sqlite':
+            from services.migration import migrate_json_to_sqlite
+            migrate_json_to_sqlite(Config)
+
+        from app import create_app
+        client = create_app().test_client()
+        ctx = Context(cavaliers, assignments, args.seed)
+        prepare(client, ctx)
+
+        results = {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'backend': args.backend,
+            'shared_snapshot': args.shared_snapshot,
+            'durability': args.durability,
+            'data': {'riders': len(cavaliers), 'dates': len(assignments), 'years': args.years},
+            'requests': args.requests,
+            'workloads': {},
+        }
+        everything = {**READS, **WRITES}
+        for workload in workloads:
+            if workload == 'read':
+                results['workloads'][workload] = run_workload(client, READS, ctx, args.requests, args.warmup)
+            elif workload == 'write':
+                results['workloads'][workload] = run_workload(client, WRITES, ctx, args.requests, args.warmup)
+            else:
+                results['workloads'][workload] = run_workload(
+                    client, everything, ctx, args.requests, 0, mixed_plan(ctx, args.requests))
+
+        if args.writers > 0:
+            results['concurrent'] = run_concurrent(args.writers, args.writes)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print_report(results)
+    print(f"\n✅ Résultats enregistrés : {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print(line)
+        if not regressions:
+            print(f"✅ Pas de régression par rapport à {args.compare}")
+
+    concurrent = results.get('concurrent')
+    if concurrent and (concurrent['lost_assignments'] or concurrent['lost_cavaliers']):
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Build des fichiers statiques : empreinte dans le nom et précompression.
+
+Usage : python -m tools.build_static
+Copie chaque fichier de static/ en static/dist/<nom>.<empreinte>.<ext>, avec
+ses versions .gz (et .br si le module brotli est installé), et écrit
+static/dist/manifest.json ({"script.js": "dist/script.1a2b3c4d5e.js"}).
+Au rendu des templates, url_for('static', filename=...) pointe alors vers
+le fichier empreinté, servi avec un cache « immutable » (routes/assets.py).
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from config import Config
+from services.compression import BUILD_LEVELS, ENCODINGS, SUFFIXES, compress
+
+MANIFEST = 'manifest.json'
+# Caractères hexadécimaux de l'empreinte gardés dans le nom
+DIGEST_LENGTH = 10
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.html', '.svg', '.json', '.txt', '.map'}
+
+
+def fingerprinted_name(path, data):
+    root, ext = os.path.splitext(path)
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()[:DIGEST_LENGTH]
+    return f"{root}.{digest}{ext}"
+
+
+def build(static_dir, out_dir):
+    """Construire `out_dir` à partir des fichiers de `static_dir` ; retourne le manifeste"""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    prefix = os.path.relpath(out_dir, static_dir).replace(os.sep, '/')
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        # Ne pas reprendre le résultat d'un build précédent
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != out_dir)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            target = fingerprinted_name(relative, data)
+            path = os.path.join(out_dir, target)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            if os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS:
+                for encoding in ENCODINGS:
+                    packed = compress(data, encoding, BUILD_LEVELS)
+                    # Inutile si la compression ne fait rien gagner
+                    if len(packed) < len(data):
+                        with open(path + SUFFIXES[encoding], 'wb') as f:
+                            f.write(packed)
+            manifest[relative] = f"{prefix}/{target}"
+
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Empreinter et précompresser les fichiers statiques")
+    parser.add_argument('--static', default=os.path.join(Config.BASE_DIR, 'static'), help="dossier source")
+    parser.add_argument('--out', default=Config.STATIC_BUILD_DIR, help="dossier de sortie (dans --static)")
+    args = parser.parse_args(argv)
+
+    static_dir, out_dir = os.path.abspath(args.static), os.path.abspath(args.out)
+    if os.path.dirname(out_dir) != static_dir:
+        print("❌ --out doit être un sous-dossier direct de --static (servi sous /static/)")
+        return 1
+
+    manifest = build(static_dir, out_dir)
+    print(f"✅ {len(manifest)} fichiers → {out_dir} (encodages : {', '.join(ENCODINGS)})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
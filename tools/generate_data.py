@@ -0,0 +1,121 @@
+"""Génération de données de test réalistes (cavaliers et journées).
+
+Usage : python -m tools.generate_data --riders 50 --years 20 --out /tmp/planning
+Écrit cavaliers.json et assignments.json (cavaliers désignés par identifiant)
+dans le dossier indiqué, à utiliser comme DATA_DIR ou pour les benchmarks.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+WORK_TYPES = ['longe', 'liberte', 'repos', 'plat', 'cso', 'balade', 'tap']
+# Répartition observée : beaucoup de plat et de balades, peu de longe/TAP
+WORK_WEIGHTS = [8, 6, 10, 25, 15, 20, 6]
+FIRST_NAMES = [
+    'Adeline', 'Anne', 'Capucine', 'Claire', 'Camille', 'Chloé', 'Emma', 'Inès',
+    'Jeanne', 'Julie', 'Léa', 'Lucie', 'Manon', 'Margot', 'Marie', 'Mathilde',
+    'Pauline', 'Sarah', 'Sophie', 'Zoé', 'Hugo', 'Louis', 'Paul', 'Théo',
+]
+COMMENTS = [
+    'Jument en forme', 'Boiterie légère', 'Maréchal ferrant', 'Vétérinaire',
+    'Travail sur le pas', 'Sortie en extérieur', 'Concours le week-end', 'Pluie, manège',
+]
+
+
+def _rider_name(index):
+    name = FIRST_NAMES[index % len(FIRST_NAMES)]
+    if index >= len(FIRST_NAMES):
+        name += f" {index // len(FIRST_NAMES) + 1}"
+    return name
+
+
+def generate_cavaliers(nb_riders, first_day, last_day, rng):
+    """Liste de cavaliers ; environ un tiers présents sur toute la période,
+    les autres sur une fenêtre de quelques mois à quelques années"""
+    span = (last_day - first_day).days
+    cavaliers = []
+    for index in range(nb_riders):
+        start_date = end_date = ''
+        if rng.random() > 0.35:
+            start = rng.randrange(span)
+            length = rng.randint(90, 8 * 365)
+            start_date = (first_day + timedelta(days=start)).isoformat()
+            if start + length < span:
+                end_date = (first_day + timedelta(days=start + length)).isoformat()
+        cavaliers.append({
+            'id': index + 1,
+            'name': _rider_name(index),
+            'color': '#%06x' % rng.randrange(0x1000000),
+            'start_date': start_date,
+            'end_date': end_date,
+        })
+    return cavaliers
+
+
+def generate_assignments(cavaliers, first_day, last_day, per_day, rng):
+    """Journées de `first_day` à `last_day` : 1 à 2 × `per_day` cavaliers
+    parmi les actifs du jour, un type de travail, parfois un commentaire"""
+    bounds = [(c['id'], c['start_date'], c['end_date']) for c in cavaliers]
+    assignments = {}
+    day = first_day
+    while day <= last_day:
+        iso = day.isoformat()
+        # Quelques jours sans rien de noté
+        if rng.random() < 0.9:
+            active = [i for i, start, end in bounds
+                      if (not start or start <= iso) and (not end or iso <= end)]
+            work_type = rng.choices(WORK_TYPES, WORK_WEIGHTS)[0]
+            count = 0 if work_type == 'repos' else min(len(active), rng.randint(1, 2 * per_day - 1))
+            assignments[iso] = {
+                'cavaliers': sorted(rng.sample(active, count)),
+                'comment': rng.choice(COMMENTS) if rng.random() < 0.1 else '',
+                'work_type': work_type,
+            }
+        day += timedelta(days=1)
+    return assignments
+
+
+def generate(nb_riders=50, years=20, per_day=3, start_year=None, seed=0):
+    """Retourne (cavaliers, assignments) couvrant `years` années complètes"""
+    rng = random.Random(seed)
+    if start_year is None:
+        start_year = date.today().year - years + 1
+    first_day = date(start_year, 1, 1)
+    last_day = date(start_year + years - 1, 12, 31)
+    cavaliers = generate_cavaliers(nb_riders, first_day, last_day, rng)
+    return cavaliers, generate_assignments(cavaliers, first_day, last_day, per_day, rng)
+
+
+def write_data(directory, cavaliers, assignments):
+    """Écrire cavaliers.json et assignments.json dans `directory`"""
+    os.makedirs(directory, exist_ok=True)
+    for name, data in (('cavaliers.json', cavaliers), ('assignments.json', assignments)):
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Générer des cavaliers et journées de test")
+    parser.add_argument('--riders', type=int, default=50, help="nombre de cavaliers")
+    parser.add_argument('--years', type=int, default=20, help="nombre d'années couvertes")
+    parser.add_argument('--per-day', type=int, default=3, help="nombre moyen de cavaliers par jour")
+    parser.add_argument('--start-year', type=int, help="première année (défaut : pour finir cette année)")
+    parser.add_argument('--seed', type=int, default=0, help="graine du générateur (reproductible)")
+    parser.add_argument('--out', required=True, help="dossier de sortie")
+    args = parser.parse_args(argv)
+
+    if args.riders < 1 or args.years < 1 or args.per_day < 1:
+        print("❌ --riders, --years et --per-day doivent être positifs")
+        return 1
+
+    cavaliers, assignments = generate(args.riders, args.years, args.per_day, args.start_year, args.seed)
+    write_data(args.out, cavaliers, assignments)
+    print(f"✅ {len(cavaliers)} cavaliers, {len(assignments)} dates → {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())